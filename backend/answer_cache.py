@@ -0,0 +1,203 @@
+import re
+import zlib
+import threading
+import importlib.util
+from collections import OrderedDict
+
+# Similarity matching is optional (exact matching still works) and NumPy is
+# only imported when the first vector is built, keeping it off the startup path
+HAS_NUMPY = importlib.util.find_spec('numpy') is not None
+np = None
+
+
+def load_numpy():
+    """Import NumPy on first use"""
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+    return np
+
+DEFAULT_THRESHOLD = 0.85
+DEFAULT_MAX_RECIPES = 256
+DEFAULT_ENTRIES_PER_RECIPE = 64
+DEFAULT_DIMENSIONS = 1024
+
+# Words that carry no meaning for matching ("can I make this vegan" == "make it vegan")
+FILLER_WORDS = {
+    'a', 'an', 'the', 'i', 'you', 'me', 'my', 'we', 'it', 'is', 'are', 'be', 'do', 'does', 'to', 'for',
+    'of', 'can', 'could', 'would', 'should', 'please', 'this', 'recipe', 'dish', 'make',
+}
+
+# Weight of the word bigrams, the only features that see word order; at 1.0 the
+# order-free words and trigrams dominate and "butter instead of oil" matches
+# "oil instead of butter"
+ORDER_WEIGHT = 2.0
+
+
+def normalize_question(question):
+    """Lowercase a question and reduce it to its words, so punctuation and spacing don't matter"""
+    return ' '.join(re.findall(r"[a-z0-9]+", question.lower()))
+
+
+def is_context_dependent(history, summary=None):
+    """
+    Whether an answer would depend on a session's own conversation
+
+    The question prompt carries the session's history and summary, which can
+    hold anything the user said ("I'm allergic to peanuts"), so only answers
+    to a conversation's first question are shared with other sessions.
+    """
+    return bool(history or summary)
+
+
+def question_vector(normalized, dimensions=DEFAULT_DIMENSIONS):
+    """
+    Embed a normalized question as a unit-length hashed n-gram vector
+
+    Features are the meaningful words, word bigrams (weighted by
+    ORDER_WEIGHT) and character trigrams, hashed into `dimensions` buckets
+    with a sign bit to reduce collisions.
+    """
+    words = normalized.split()
+    words = [word for word in words if word not in FILLER_WORDS] or words
+    features = [(word, 1.0) for word in words]
+    features.extend((f"{first} {second}", ORDER_WEIGHT) for first, second in zip(words, words[1:]))
+    for word in words:
+        padded = f" {word} "
+        features.extend((padded[i:i + 3], 1.0) for i in range(len(padded) - 2))
+
+    np = load_numpy()
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for feature, weight in features:
+        digest = zlib.crc32(feature.encode('utf-8'))
+        vector[digest % dimensions] += weight if digest & 0x80000000 else -weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class RecipeAnswers:
+    """Answers cached for one recipe, with a lazily rebuilt similarity matrix"""
+
+    __slots__ = ('answers', 'vectors', 'matrix', 'keys')
+
+    def __init__(self):
+        self.answers = OrderedDict()  # normalized question -> answer
+        self.vectors = {}             # normalized question -> vector
+        self.matrix = None
+        self.keys = None
+
+
+class AnswerCache:
+    """
+    Per-recipe cache of answers to user questions, shared by all sessions.
+
+    Questions are matched exactly after normalization and, when NumPy is
+    installed, by cosine similarity of hashed n-gram vectors against the
+    other questions asked about the same recipe. Both recipes and the
+    answers within each recipe are evicted least recently used first.
+    Set threshold above 1 to disable similarity matching.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, max_recipes=DEFAULT_MAX_RECIPES,
+                 entries_per_recipe=DEFAULT_ENTRIES_PER_RECIPE, dimensions=DEFAULT_DIMENSIONS):
+        self.threshold = threshold
+        self.max_recipes = max_recipes
+        self.entries_per_recipe = entries_per_recipe
+        self.dimensions = dimensions
+        self.similarity = HAS_NUMPY and threshold <= 1
+        self._recipes = OrderedDict()  # recipe key -> RecipeAnswers
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def get(self, recipe_key, question):
+        """
+        Look up a cached answer
+
+        Args:
+            recipe_key (str): Identifies the recipe (and model) the answer is for
+            question (str): The user's question
+
+        Returns:
+            tuple: (answer, score) with score 1.0 for exact matches, or None on a miss
+        """
+        normalized = normalize_question(question)
+        with self._lock:
+            entry = self._recipes.get(recipe_key)
+            if entry is None or not normalized:
+                self.misses += 1
+                return None
+            self._recipes.move_to_end(recipe_key)
+
+            answer = entry.answers.get(normalized)
+            if answer is not None:
+                entry.answers.move_to_end(normalized)
+                self.exact_hits += 1
+                return answer, 1.0
+
+            if self.similarity and entry.answers:
+                np = load_numpy()
+                if entry.matrix is None:
+                    entry.keys = list(entry.vectors)
+                    entry.matrix = np.stack([entry.vectors[key] for key in entry.keys])
+                scores = entry.matrix @ question_vector(normalized, self.dimensions)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    match = entry.keys[best]
+                    entry.answers.move_to_end(match)
+                    self.similar_hits += 1
+                    return entry.answers[match], float(scores[best])
+
+            self.misses += 1
+            return None
+
+    def set(self, recipe_key, question, answer):
+        """Store the answer to a question about a recipe"""
+        normalized = normalize_question(question)
+        if not normalized or not answer:
+            return
+        vector = question_vector(normalized, self.dimensions) if self.similarity else None
+        with self._lock:
+            entry = self._recipes.get(recipe_key)
+            if entry is None:
+                entry = self._recipes[recipe_key] = RecipeAnswers()
+                while len(self._recipes) > self.max_recipes:
+                    self._recipes.popitem(last=False)
+            self._recipes.move_to_end(recipe_key)
+
+            entry.answers[normalized] = answer
+            entry.answers.move_to_end(normalized)
+            if vector is not None:
+                entry.vectors[normalized] = vector
+            while len(entry.answers) > self.entries_per_recipe:
+                evicted, _ = entry.answers.popitem(last=False)
+                entry.vectors.pop(evicted, None)
+            entry.matrix = None
+
+    def record_bypass(self):
+        with self._lock:
+            self.bypassed += 1
+
+    def stats(self):
+        """Return hit/miss counters and the current size"""
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            lookups = hits + self.misses
+            return {
+                'hits': hits,
+                'exact_hits': self.exact_hits,
+                'similar_hits': self.similar_hits,
+                'misses': self.misses,
+                'bypassed': self.bypassed,
+                'hit_ratio': hits / lookups if lookups else 0.0,
+                'recipes': len(self._recipes),
+                'answers': sum(len(entry.answers) for entry in self._recipes.values()),
+                'similarity': self.similarity,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._recipes.clear()
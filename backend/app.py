@@ -1,8 +1,20 @@
 import asyncio
-from flask import Flask, request, jsonify
+import time
+import threading
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit
-from recipe_chatbot import RecipeChatBot
+from flask_socketio import SocketIO, emit, join_room, leave_room
+from recipe_chatbot import RecipeChatBot, preload
+from llm_backends import DEFAULT_MODEL, get_backend
+from stream_runtime import StreamRuntime, RuntimeBusyError
+from stream_emitter import ChunkCoalescer
+from session_store import create_session_store
+from session_manager import SessionManager
+from session_tokens import SessionTokens
+import metrics
+from metrics import Counter, Gauge
+from stream_registry import StreamRegistry
+from replay_buffer import ReplayBuffers
 import os
 from dotenv import load_dotenv
 import uuid
@@ -18,67 +30,248 @@ app = Flask(__name__)
 CORS(app, supports_credentials=True, origins=allowed_origins)
 
 # Configure SocketIO for both addresses
-socketio = SocketIO(app, cors_allowed_origins=allowed_origins, async_mode='threading')
+# With several workers, SOCKETIO_MESSAGE_QUEUE (e.g. redis://...) lets any worker emit to any client
+socketio = SocketIO(app, cors_allowed_origins=allowed_origins, async_mode='threading',
+                    message_queue=os.getenv('SOCKETIO_MESSAGE_QUEUE'))
+
+# Chatbot state lives in the session store so any worker can serve a reconnect
+session_store = create_session_store()
+WORKER_ID = uuid.uuid4().hex
+
+# Sessions are issued by the server and claimed with a signed token; every worker needs the same SESSION_SECRET
+session_tokens = SessionTokens(os.getenv('SESSION_SECRET'))
+
+# Track active streams per client, per user (using IP as user identifier) and per session
+streams = StreamRegistry()
+
+# Sequence-numbered frames of recent streams, so a client whose socket dropped can
+# resume from its last frame while generation carries on; STREAM_RESUME_GRACE=0
+# stops streams on disconnect as before
+replays = ReplayBuffers(
+    max_bytes=int(os.getenv('REPLAY_BUFFER_MAX_BYTES', 16 * 1024 * 1024)),
+    grace=float(os.getenv('STREAM_RESUME_GRACE', 60)),
+)
+
+# Resident chatbot instances per session: idle or least recently used ones are
+# spilled to the session store and rehydrated on their next message
+chatbot_instances = SessionManager(
+    session_store,
+    lambda state: RecipeChatBot.from_state(state) if state else RecipeChatBot(),
+    max_sessions=int(os.getenv('MAX_SESSIONS', 1000)),
+    idle_ttl=float(os.getenv('SESSION_IDLE_TTL', 30 * 60)),
+    spill=os.getenv('SESSION_SPILL', '1') != '0',
+    in_use=streams.has_session,
+)
+chatbot_instances.start_sweeper(float(os.getenv('SESSION_SWEEP_INTERVAL', 60)))
+client_sessions = {}  # Socket ID -> session ID sent by the client on connect
+client_conversations = {}  # Conversation room each client has joined, if any
+
+# Persistent event loops shared by every streaming handler
+runtime = StreamRuntime(
+    loops=int(os.getenv('STREAM_RUNTIME_LOOPS', 1)),
+    max_concurrent=int(os.getenv('MAX_CONCURRENT_GENERATIONS', 32)),
+    max_pending=int(os.getenv('MAX_PENDING_GENERATIONS', 128)),
+)
+
+# Gauges sampled when /metrics is scraped
+Gauge('active_streams', 'Streams currently registered').set_function(lambda: streams.stats()['active'])
+Counter('streams_stopped_total', 'Streams stopped before completing').set_function(lambda: streams.stats()['stopped'])
+Gauge('stream_runtime_running', 'Generations running on the stream runtime').set_function(
+    lambda: runtime.stats()['running'])
+Gauge('stream_runtime_pending', 'Generations waiting for a runtime slot').set_function(
+    lambda: runtime.stats()['pending'])
+Gauge('socket_emit_queue_depth', 'Packets queued for delivery across Socket.IO connections').set_function(
+    lambda: sum(socket.queue.qsize() for socket in list(socketio.server.eio.sockets.values())))
+Gauge('connected_clients', 'Connected Socket.IO clients').set_function(lambda: len(client_sessions))
+Gauge('replay_buffer_bytes', 'Bytes of streamed frames kept for resuming').set_function(
+    lambda: replays.stats()['bytes'])
+Gauge('detached_streams', 'Streams generating for a disconnected client').set_function(
+    lambda: replays.stats()['detached'])
+Counter('stream_resumes_total', 'Streams resumed after a reconnect').set_function(
+    lambda: replays.stats()['resumed'])
+Gauge('resident_sessions', 'Chatbot sessions held in memory').set_function(lambda: len(chatbot_instances))
+def session_memory_bytes():
+    """Session bytes held in this process: resident sessions plus an in-process store's spilled state"""
+    stats = chatbot_instances.stats()
+    return stats['resident_bytes'] + stats['store_bytes']
+
+Gauge('resident_session_bytes', 'Approximate recipe and history bytes held in memory').set_function(
+    session_memory_bytes)
+
+def warm_up():
+    """Preload lazily imported dependencies and open LLM connections on every runtime loop"""
+    start = time.perf_counter()
+    try:
+        preload()
+        backend = get_backend(DEFAULT_MODEL)
+        connections = int(os.getenv('LLM_WARMUP_CONNECTIONS', 2))
+        futures = runtime.run_on_every_loop(lambda: backend.warmup(connections))
+        opened = sum(future.result(timeout=30) for future in futures)
+        print(f"Warm-up finished in {time.perf_counter() - start:.2f}s ({opened} LLM connections open)")
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
 
-# Initialize the chatbot instances per client
-chatbot_instances = {}
+# Warm up in the background so the server accepts sockets straight away
+if os.getenv('LLM_WARMUP', '0') == '1':
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
 
-# Track active streaming tasks per user (using IP as user identifier)
-active_streams = {}
-user_active_streams = {}  # Track all streams per user IP
-active_tasks = {}  # Track asyncio tasks for proper cancellation
+def session_for(client_id):
+    """Session a client belongs to: the one its session token proved on connect, else its socket ID"""
+    return client_sessions.get(client_id, client_id)
 
 def get_or_create_chatbot(client_id):
-    """Get or create a chatbot instance for the specific client"""
-    if client_id not in chatbot_instances:
-        chatbot_instances[client_id] = RecipeChatBot()
-        print(f"Created new chatbot instance for client: {client_id}")
-    return chatbot_instances[client_id]
+    """Get or create a chatbot instance for the specific client, restoring saved session state"""
+    return chatbot_instances.get(session_for(client_id))
+
+def save_session(client_id, session_id=None):
+    """Write a client's chatbot state (or session_id's, if given) to the session store"""
+    session_id = session_id or session_for(client_id)
+    try:
+        chatbot_instances.save(session_id)
+    except Exception as e:
+        print(f"Error saving session {session_id}: {e}")
+
+def notify_stopped(handles, message="Stream stopped", reason=None):
+    """Tell clients that their streams were stopped from elsewhere"""
+    for handle in handles:
+        payload = {"message": message, "stopped": True}
+        if reason:
+            payload["reason"] = reason
+        socketio.emit('response', payload, room=handle.client_id)
+
+def stop_session_streams(session_id, current_client_id=None):
+    """Stop the streams of every other client connected with the same session"""
+    stopped = streams.stop_session(session_id, except_client=current_client_id)
+    for handle in stopped:
+        print(f"Stopped stream for client {handle.client_id} (session {session_id})")
+    notify_stopped(stopped)
+
+def broadcast_stop(action, **fields):
+    """Ask the other workers to stop matching streams"""
+    try:
+        session_store.publish(dict(fields, action=action, origin=WORKER_ID))
+    except Exception as e:
+        print(f"Error publishing {action}: {e}")
+
+def handle_control_message(message):
+    """Apply a stop signal published by another worker"""
+    if message.get('origin') == WORKER_ID:
+        return
+    if message.get('action') == 'stop_user':
+        stop_user_other_streams(message['user'], message['client'])
+    elif message.get('action') == 'stop_session':
+        stop_session_streams(message['session'])
+
+session_store.subscribe(handle_control_message)
 
 def stop_user_other_streams(user_ip, current_client_id):
     """Stop all active streams for a user except the current one"""
-    if user_ip in user_active_streams:
-        for client_id in list(user_active_streams[user_ip]):
-            if client_id != current_client_id and client_id in active_streams:
-                active_streams[client_id]['stopped'] = True
-                print(f"Stopped stream for client {client_id} (user {user_ip}) due to new session")
-                
-                # Cancel the asyncio task properly
-                if client_id in active_tasks:
-                    try:
-                        active_tasks[client_id].cancel()
-                        del active_tasks[client_id]
-                        print(f"Cancelled task for client {client_id}")
-                    except Exception as e:
-                        print(f"Error cancelling task for client {client_id}: {e}")
-                
-                # Emit stop signal to that client
-                socketio.emit('response', {
-                    "message": "Stream stopped - new session started in another tab", 
-                    "stopped": True,
-                    "reason": "new_session"
-                }, room=client_id)
-
-def add_user_stream(user_ip, client_id):
-    """Add a client to user's active streams"""
-    if user_ip not in user_active_streams:
-        user_active_streams[user_ip] = set()
-    user_active_streams[user_ip].add(client_id)
-
-def remove_user_stream(user_ip, client_id):
-    """Remove a client from user's active streams"""
-    if user_ip in user_active_streams:
-        user_active_streams[user_ip].discard(client_id)
-        if not user_active_streams[user_ip]:  # If no more streams for this user
-            del user_active_streams[user_ip]
+    stopped = streams.stop_user(user_ip, except_client=current_client_id)
+    for handle in stopped:
+        print(f"Stopped stream for client {handle.client_id} (user {user_ip}) due to new session")
+    # Emit stop signal to those clients
+    notify_stopped(stopped, "Stream stopped - new session started in another tab", "new_session")
+
+def stream_room(client_id):
+    """Room a client's streamed output goes to: its conversation room if joined, else only its own session"""
+    return client_conversations.get(client_id, client_id)
+
+def start_stream(client_id, message_id):
+    """Register a client's new stream, stopping the same user's streams in other tabs and workers"""
+    user_ip = request.remote_addr
+    stream, displaced = streams.register(client_id, user_ip, session_for(client_id), message_id)
+    for handle in displaced:
+        print(f"Stopped stream for client {handle.client_id} (user {user_ip}) due to new session")
+    notify_stopped(displaced, "Stream stopped - new session started in another tab", "new_session")
+    broadcast_stop('stop_user', user=user_ip, client=client_id)
+    return stream
+
+# What the LLM scheduler's per-user budgets and fair shares are keyed by: 'user' (client IP) or 'session'
+LLM_FAIRNESS_KEY = os.getenv('LLM_FAIRNESS_KEY', 'user')
+
+def scheduling_key(stream):
+    """Key a stream's LLM calls are rate limited and fair-queued by"""
+    if LLM_FAIRNESS_KEY == 'session':
+        return stream.session_id
+    return stream.user_key or stream.session_id
+
+def emit_frame(event, payload, room):
+    socketio.emit(event, payload, room=room)
+
+def open_replay(stream, event):
+    """Replay buffer for a new stream; its frames go to the client's stream room"""
+    return replays.open(stream.message_id, event, stream.session_id, stream_room(stream.client_id), stream)
+
+def end_stream(stream, replay):
+    """Bookkeeping once a stream task ends, including for a client that never came back"""
+    replay.finish()
+    streams.finish(stream)
+    save_session(stream.client_id, stream.session_id)
+    if replay.detached_at is not None and stream.session_id not in client_sessions.values():
+        chatbot_instances.release(stream.session_id)
+
+background_tasks = set()  # Conversation summaries running after their answer was delivered
+
+async def summarize_session(session_id, chatbot):
+    """Fold a long conversation's older turns into its summary, then save the session and unpin it"""
+    try:
+        if await chatbot.summarize_history():
+            save_session(None, session_id)
+    except Exception as e:
+        print(f"Error summarizing session {session_id}: {e}")
+    finally:
+        chatbot_instances.unpin(session_id)
+
+def summarize_in_background(session_id, chatbot):
+    """
+    Start summarize_session on the current runtime loop, outside the generation caps
+
+    The session is pinned until the summary is saved, so neither an eviction
+    nor the release after a disconnect leaves the summary on a dropped instance.
+    """
+    chatbot_instances.pin(session_id)
+    task = asyncio.get_running_loop().create_task(summarize_session(session_id, chatbot))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+def submit_stream(stream, replay, coro, event):
+    """Run a streaming coroutine on the shared runtime, rejecting it when the server is saturated"""
+    try:
+        stream.attach(runtime.submit(stream.client_id, coro))
+        return True
+    except RuntimeBusyError:
+        print(f"Runtime saturated, rejecting stream for client {stream.client_id}: {runtime.stats()}")
+        streams.finish(stream)
+        replay.finish()
+        emit(event, {"error": "Server is busy, please try again in a moment", "busy": True,
+                     "messageId": stream.message_id})
+        return False
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/session', methods=['POST'])
+def create_session():
+    """Issue a new session; the client passes its token as auth.session_token on every connect"""
+    session_id, token = session_tokens.issue()
+    return jsonify({"session_id": session_id, "session_token": token})
 
 @socketio.on('connect')
-def handle_connect():
+def handle_connect(auth=None):
     """Handle new client connections"""
     client_id = request.sid
-    print(f"Client connected: {client_id}")
-    # Create a new chatbot instance for this client
+    token = (auth or {}).get('session_token')
+    session_id = session_tokens.verify(token)
+    if session_id is None:
+        # No valid token: a fresh session, never one the client merely names
+        session_id, token = session_tokens.issue()
+    client_sessions[client_id] = session_id
+    print(f"Client connected: {client_id} (session {session_id})")
+    # Create (or restore) the chatbot instance for this client's session
     get_or_create_chatbot(client_id)
+    emit('session', {"session_id": session_id, "session_token": token})
 
 @socketio.on('disconnect')
 def handle_disconnect():
@@ -86,23 +279,23 @@ def handle_disconnect():
     client_id = request.sid
     print(f"Client disconnected: {client_id}")
     
-    # Cancel any active tasks
-    if client_id in active_tasks:
-        try:
-            active_tasks[client_id].cancel()
-            del active_tasks[client_id]
-            print(f"Cancelled task for disconnected client {client_id}")
-        except Exception as e:
-            print(f"Error cancelling task for disconnected client {client_id}: {e}")
+    # Keep a running stream generating into its replay buffer for the grace
+    # period so a reconnect can resume it; otherwise cancel it
+    stream = streams.get(client_id)
+    replay = replays.get(stream.message_id) if stream is not None else None
+    detached = replays.grace > 0 and replay is not None and not replay.done
+    if detached:
+        replay.detach()
+        print(f"Detached stream {stream.message_id} of disconnected client {client_id}")
+    elif streams.stop_client(client_id, reason='disconnected'):
+        print(f"Cancelled task for disconnected client {client_id}")
     
-    # Clean up chatbot instance
-    if client_id in chatbot_instances:
-        del chatbot_instances[client_id]
-    # Clean up active streams
-    if client_id in active_streams:
-        del active_streams[client_id]
-    user_ip = request.remote_addr
-    remove_user_stream(user_ip, client_id)
+    # Spill the chatbot instance once no connection uses its session; the state stays in the store.
+    # A detached stream still needs it and releases it when it ends
+    session_id = client_sessions.pop(client_id, client_id)
+    if not detached and session_id not in client_sessions.values():
+        chatbot_instances.release(session_id)
+    client_conversations.pop(client_id, None)
 
 @socketio.on('generate_text')
 def generate_text(data):
@@ -115,65 +308,52 @@ def generate_text(data):
     # Create a unique ID for this generation task
     message_id = str(uuid.uuid4())
     client_id = request.sid
-    user_ip = request.remote_addr
-    add_user_stream(user_ip, client_id)
-    stop_user_other_streams(user_ip, client_id)
-    active_streams[client_id] = {'stopped': False}
-
-    def run_async_generator():
+    stream = start_stream(client_id, message_id)
+    replay = open_replay(stream, 'response')
+
+    def send(event, payload):
+        replay.publish(event, payload, emit_frame)
+
+    def report_queue(status):
+        # Position feedback while the LLM call waits for a slot
+        send('queue_status', dict(status, messageId=message_id))
+
+    async def stream_words():
+        coalescer = ChunkCoalescer(lambda text: send('response', {
+            "data": text,
+            "streaming": True,
+            "messageId": message_id
+        }))
+        chatbot = None
         try:
-            async def stream_words():
-                try:
-                    def check_stop():
-                        return active_streams.get(client_id, {}).get('stopped', False)
-                    
-                    chatbot = get_or_create_chatbot(client_id)
-                    async for word in chatbot.ask_question_stream(prompt, stop_callback=check_stop):
-                        if active_streams.get(client_id, {}).get('stopped', False):
-                            break
-                        socketio.emit('response', {
-                            "data": word,
-                            "streaming": True,
-                            "messageId": message_id
-                        })
-                        await asyncio.sleep(0.1)
-
-                    if not active_streams.get(client_id, {}).get('stopped', False):
-                        socketio.emit('response', {"complete": True, "messageId": message_id})
-
-                except asyncio.CancelledError:
-                    print(f"Stream task cancelled for client: {client_id}")
-                    socketio.emit('response', {"stopped": True, "messageId": message_id})
-                    raise  # Re-raise to properly handle cancellation
-                except Exception as e:
-                    print(f"Error in stream_text: {str(e)}")
-                    socketio.emit('response', {"error": str(e), "messageId": message_id})
-
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            task = loop.create_task(stream_words())
-            active_tasks[client_id] = task
-
-            try:
-                loop.run_until_complete(task)
-            except asyncio.CancelledError:
-                print(f"Task properly cancelled for client: {client_id}")
-            finally:
-                loop.close()
-                if client_id in active_streams:
-                    del active_streams[client_id]
-                if client_id in active_tasks:
-                    del active_tasks[client_id]
-
+            chatbot = chatbot_instances.get(stream.session_id)
+            async for word in chatbot.ask_question_stream(prompt, stop_callback=stream.stopped,
+                                                          user=scheduling_key(stream), on_queue=report_queue):
+                if stream.stopped():
+                    break
+                coalescer.add(word)
+
+            if not stream.stopped():
+                coalescer.flush()
+                send('response', {"complete": True, "messageId": message_id})
+
+        except asyncio.CancelledError:
+            print(f"Stream task cancelled for client: {stream.client_id}")
+            send('response', {"stopped": True, "messageId": message_id})
+            raise  # Re-raise to properly handle cancellation
         except Exception as e:
             print(f"Error in stream_text: {str(e)}")
-            socketio.emit('response', {"error": str(e), "messageId": message_id})
-            if client_id in active_streams:
-                del active_streams[client_id]
-            if client_id in active_tasks:
-                del active_tasks[client_id]
-
-    socketio.start_background_task(run_async_generator)
+            send('response', {"error": str(e), "messageId": message_id})
+        finally:
+            coalescer.close()
+            # The answer is out; summarizing older turns happens off the critical path. It starts
+            # (and pins the session) while the stream still holds the session in memory
+            if chatbot is not None and chatbot.needs_summary():
+                summarize_in_background(stream.session_id, chatbot)
+            end_stream(stream, replay)
+
+    if not submit_stream(stream, replay, stream_words(), 'response'):
+        return
     # Return the message ID to the client immediately
     emit('response', {"messageId": message_id, "status": "started"})
 
@@ -187,87 +367,96 @@ def fetch_recipe_stream(data):
     # Create a unique ID for this recipe fetch task
     message_id = str(uuid.uuid4())
     client_id = request.sid
-    user_ip = request.remote_addr
-    add_user_stream(user_ip, client_id)
-    stop_user_other_streams(user_ip, client_id)
-    active_streams[client_id] = {'stopped': False}
-
-    def run_async_stream():
+    stream = start_stream(client_id, message_id)
+    replay = open_replay(stream, 'recipe_stream')
+
+    def send(event, payload):
+        replay.publish(event, payload, emit_frame)
+
+    def report_queue(status):
+        # Position feedback while the LLM call waits for a slot
+        send('queue_status', dict(status, messageId=message_id))
+
+    async def stream_recipe():
+        coalescer = ChunkCoalescer(lambda text: send('recipe_stream', {
+            "data": text,
+            "streaming": True,
+            "messageId": message_id
+        }))
         try:
-            async def stream_recipe():
-                try:
-                    def check_stop():
-                        return active_streams.get(client_id, {}).get('stopped', False)
-                    
-                    chatbot = get_or_create_chatbot(client_id)
-                    async for chunk in chatbot.fetch_recipe(video_url=video_url, stop_callback=check_stop):
-                        if active_streams.get(client_id, {}).get('stopped', False):
-                            break
-                        socketio.emit('recipe_stream', {
-                            "data": chunk,
-                            "streaming": True,
-                            "messageId": message_id
-                        })
-
-                        await asyncio.sleep(0.05)
-
-                    if not active_streams.get(client_id, {}).get('stopped', False):
-                        socketio.emit('recipe_stream', {"complete": True, "messageId": message_id})
-
-                except asyncio.CancelledError:
-                    print(f"Recipe stream task cancelled for client: {client_id}")
-                    socketio.emit('recipe_stream', {"stopped": True, "messageId": message_id})
-                    raise  # Re-raise to properly handle cancellation
-                except Exception as e:
-                    print(f"Error in fetch_recipe_stream: {str(e)}")
-                    socketio.emit('recipe_stream', {"error": str(e), "messageId": message_id})
-
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            task = loop.create_task(stream_recipe())
-            active_tasks[client_id] = task
-
-            try:
-                loop.run_until_complete(task)
-            except asyncio.CancelledError:
-                print(f"Recipe task properly cancelled for client: {client_id}")
-            finally:
-                loop.close()
-                if client_id in active_streams:
-                    del active_streams[client_id]
-                if client_id in active_tasks:
-                    del active_tasks[client_id]
-
+            chatbot = chatbot_instances.get(stream.session_id)
+            def emit_section(name, content):
+                # Flush buffered text first so the section never overtakes its own chunks
+                coalescer.flush()
+                send('recipe_section', {
+                    "section": name,
+                    "content": content,
+                    "messageId": message_id
+                })
+
+            async for chunk in chatbot.fetch_recipe(video_url=video_url, stop_callback=stream.stopped, on_section=emit_section,
+                                                    user=scheduling_key(stream), on_queue=report_queue):
+                if stream.stopped():
+                    break
+                coalescer.add(chunk)
+
+            if not stream.stopped():
+                coalescer.flush()
+                send('recipe_stream', {"complete": True, "messageId": message_id})
+
+        except asyncio.CancelledError:
+            print(f"Recipe stream task cancelled for client: {stream.client_id}")
+            send('recipe_stream', {"stopped": True, "messageId": message_id})
+            raise  # Re-raise to properly handle cancellation
         except Exception as e:
             print(f"Error in fetch_recipe_stream: {str(e)}")
-            socketio.emit('recipe_stream', {"error": str(e), "messageId": message_id})
-            if client_id in active_streams:
-                del active_streams[client_id]
-            if client_id in active_tasks:
-                del active_tasks[client_id]
+            send('recipe_stream', {"error": str(e), "messageId": message_id})
+        finally:
+            coalescer.close()
+            end_stream(stream, replay)
 
-    socketio.start_background_task(run_async_stream)
+    if not submit_stream(stream, replay, stream_recipe(), 'recipe_stream'):
+        return
     # Return the message ID to the client immediately
     emit('recipe_stream', {"messageId": message_id, "status": "started"})
 
+@socketio.on('resume_stream')
+def resume_stream(data):
+    """
+    Continue a stream after a reconnect: replay its frames after lastSeq, then follow it live
+
+    The client must connect with the session token of the stream; an
+    acknowledgement with "resumed" and the stream's "lastSeq" comes first.
+    """
+    message_id = (data or {}).get('messageId')
+    last_seq = int((data or {}).get('lastSeq') or 0)
+    client_id = request.sid
+    replay = replays.get(message_id) if message_id else None
+    if replay is None or replay.session_id != session_for(client_id):
+        emit('response', {"messageId": message_id, "resumed": False,
+                          "error": "Stream is no longer available to resume"})
+        return
+    if not replay.done and replay.stream is not None:
+        streams.move(replay.stream, client_id, request.remote_addr)
+    if replay.resume(last_seq, stream_room(client_id), emit_frame) is None:
+        emit(replay.event, {"messageId": message_id, "resumed": False,
+                            "error": "Stream is no longer available to resume"})
+        return
+    print(f"Client {client_id} resumed stream {message_id} after frame {last_seq}")
+
 @socketio.on('stop_stream')
 def stop_stream():
     """Stop any active streaming for this client"""
     try:
         client_id = request.sid
-        if client_id in active_streams:
-            active_streams[client_id]['stopped'] = True
+        # The session's stream may run on another connection or another worker
+        session_id = session_for(client_id)
+        stop_session_streams(session_id, client_id)
+        broadcast_stop('stop_session', session=session_id)
+        # Mark the stream stopped and cancel its task if it exists
+        if streams.stop_client(client_id):
             print(f"Stop stream requested for client: {client_id}")
             
-            # Cancel the task if it exists
-            if client_id in active_tasks:
-                try:
-                    active_tasks[client_id].cancel()
-                    del active_tasks[client_id]
-                    print(f"Cancelled task for client {client_id}")
-                except Exception as e:
-                    print(f"Error cancelling task for client {client_id}: {e}")
-            
             # Send confirmation back to client
             emit('response', {"message": "Stream stopped", "stopped": True})
             print(f"Stream stop confirmation sent to client: {client_id}")
@@ -279,6 +468,37 @@ def stop_stream():
         print(f"Error stopping stream: {str(e)}")
         emit('response', {"error": f"Failed to stop stream: {str(e)}"})
 
+@socketio.on('join_conversation')
+def join_conversation(data):
+    """
+    Join the room of this client's own session so several tabs can watch the same stream
+
+    The room is derived from the session the client's token proved on
+    connect; a conversation_id naming any other session is rejected.
+    """
+    client_id = request.sid
+    session_id = session_for(client_id)
+    conversation_id = (data or {}).get('conversation_id')
+    if conversation_id and conversation_id != session_id:
+        emit('response', {"error": "Not allowed to join this conversation"})
+        return
+    previous = client_conversations.get(client_id)
+    if previous:
+        leave_room(previous)
+    room = f"conversation:{session_id}"
+    join_room(room)
+    client_conversations[client_id] = room
+    print(f"Client {client_id} joined {room}")
+
+@socketio.on('leave_conversation')
+def leave_conversation():
+    """Stop receiving another tab's streams; output goes back to this session only"""
+    client_id = request.sid
+    room = client_conversations.pop(client_id, None)
+    if room:
+        leave_room(room)
+        print(f"Client {client_id} left {room}")
+
 @socketio.on('reset_conversation')
 def reset_conversation():
     """Reset the conversation history for new chat sessions"""
@@ -286,6 +506,7 @@ def reset_conversation():
         client_id = request.sid
         chatbot = get_or_create_chatbot(client_id)
         chatbot.reset_conversation()
+        save_session(client_id)
         print("Conversation history reset")
         # Don't emit a response for this event as it's not needed
     except Exception as e:
@@ -0,0 +1,227 @@
+"""
+Batch recipe ingestion for pre-warming the recipe library.
+
+    python recipe_chatbot.py batch urls.txt -o recipes.jsonl --concurrency 8 --rate 2
+    python batch_ingest.py urls.txt -o recipes.jsonl
+
+Each input line is a YouTube video URL (blank lines and # comments are
+skipped; playlist URLs are expanded when yt-dlp is installed). Results are
+appended to a JSONL file that doubles as the checkpoint: re-running the same
+command skips every video already ingested successfully.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+import recipe_chatbot
+from recipe_chatbot import PROMPT_VERSION, LLMError, extract_recipe, recipe_cache
+from recipe_cache import make_cache_key
+from recipe_model import Recipe
+from transcripts import extract_video_id
+from llm_backends import DEFAULT_MODEL, get_backend
+
+
+class RateLimiter:
+    """Async token bucket allowing `rate` acquisitions per second with bursts of up to `burst`"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.rate:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def expand_playlist(url):
+    """
+    Expand a playlist URL into video URLs using yt-dlp, if it is installed
+
+    Returns:
+        list: Video URLs, or [url] unchanged when it is not a playlist or yt-dlp is missing
+    """
+    if 'list=' not in url or 'v=' in url:
+        return [url]
+    try:
+        import yt_dlp
+    except ImportError:
+        print(f"yt-dlp is not installed, skipping playlist {url}")
+        return []
+    with yt_dlp.YoutubeDL({'extract_flat': True, 'quiet': True}) as ydl:
+        info = ydl.extract_info(url, download=False)
+    return [f"https://www.youtube.com/watch?v={entry['id']}" for entry in info.get('entries') or [] if entry.get('id')]
+
+
+def read_urls(path):
+    """Read URLs from a file (or '-' for stdin), expanding playlists"""
+    handle = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        urls = []
+        for line in handle:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                urls.extend(expand_playlist(line))
+        return urls
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def load_checkpoint(output_path):
+    """Return the video IDs already ingested successfully into output_path"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding='utf-8') as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Partially written line from an interrupted run
+            if record.get('status') == 'ok':
+                done.add(record['video_id'])
+    return done
+
+
+async def ingest_video(url, video_id, model=DEFAULT_MODEL, lang='en'):
+    """
+    Fetch the transcript and extract the recipe for one video, going through the recipe cache
+
+    Returns:
+        dict: JSONL record describing the result
+    """
+    start = time.perf_counter()
+    record = {'video_id': video_id, 'url': url, 'model': model, 'prompt_version': PROMPT_VERSION}
+    cache_key = make_cache_key(video_id, lang, PROMPT_VERSION, get_backend(model).output_model(model))
+    markdown = recipe_cache.get(cache_key)
+    record['cached'] = markdown is not None
+
+    if markdown is None:
+        transcript_data = await recipe_chatbot.transcript_fetcher.fetch(url, lang=lang)
+        if 'error' in transcript_data or len(transcript_data['full_text']) < 50:
+            record.update(status='error', error=transcript_data.get('error', 'Transcript too short'),
+                          seconds=round(time.perf_counter() - start, 3))
+            return record
+        record['transcript_type'] = transcript_data['type']
+        chunks = [chunk async for chunk in extract_recipe(transcript_data['full_text'], model=model)]
+        markdown = ''.join(chunks)
+        errors = [chunk for chunk in chunks if isinstance(chunk, LLMError)]
+        if not markdown or errors:
+            record.update(status='error', error=errors[0] if errors else 'Empty LLM response',
+                          seconds=round(time.perf_counter() - start, 3))
+            return record
+        recipe_cache.set(cache_key, markdown)
+
+    record.update(
+        status='ok',
+        recipe=Recipe.from_markdown(markdown).to_dict(),
+        markdown=markdown,
+        seconds=round(time.perf_counter() - start, 3),
+    )
+    return record
+
+
+async def ingest_videos(urls, output_path, concurrency=4, rate=1.0, model=DEFAULT_MODEL, lang='en',
+                        progress_every=10):
+    """
+    Ingest many videos with bounded concurrency, rate limiting and resumable JSONL output
+
+    Args:
+        urls (list): YouTube video URLs
+        output_path (str): JSONL file to append results to (also the checkpoint)
+        concurrency (int): Maximum videos processed at once
+        rate (float): Maximum videos started per second (0 disables the limiter)
+        model (str): LLM model used for extraction
+        lang (str): Preferred transcript language
+        progress_every (int): Print throughput after this many videos
+
+    Returns:
+        dict: Summary with counts and throughput in videos per minute
+    """
+    done = load_checkpoint(output_path)
+    pending = []
+    seen = set(done)
+    invalid = 0
+    for url in urls:
+        video_id = extract_video_id(url)
+        if not video_id:
+            invalid += 1
+            continue
+        if video_id not in seen:
+            seen.add(video_id)
+            pending.append((url, video_id))
+
+    print(f"Batch ingest: {len(pending)} to process, {len(done)} already done, {invalid} invalid URLs")
+    limiter = RateLimiter(rate, burst=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {'ok': 0, 'error': 0}
+    start = time.perf_counter()
+
+    with open(output_path, 'a', encoding='utf-8') as output:
+        async def worker(url, video_id):
+            async with semaphore:
+                await limiter.acquire()
+                try:
+                    record = await ingest_video(url, video_id, model=model, lang=lang)
+                except Exception as e:
+                    record = {'video_id': video_id, 'url': url, 'status': 'error', 'error': str(e)}
+            output.write(json.dumps(record, ensure_ascii=False) + '\n')
+            output.flush()
+            counts[record['status']] += 1
+            processed = counts['ok'] + counts['error']
+            if progress_every and processed % progress_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"{processed}/{len(pending)} videos, {processed / elapsed * 60:.1f} videos/min")
+
+        await asyncio.gather(*(worker(url, video_id) for url, video_id in pending))
+
+    elapsed = time.perf_counter() - start
+    processed = counts['ok'] + counts['error']
+    summary = {
+        'processed': processed,
+        'ok': counts['ok'],
+        'errors': counts['error'],
+        'skipped': len(done),
+        'invalid': invalid,
+        'seconds': round(elapsed, 2),
+        'videos_per_minute': round(processed / elapsed * 60, 2) if elapsed and processed else 0.0,
+        'cache': recipe_cache.stats(),
+    }
+    print(f"Batch ingest finished: {json.dumps(summary)}")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='recipe_chatbot.py batch', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help="File with one video or playlist URL per line, or '-' for stdin")
+    parser.add_argument('-o', '--output', default='recipes.jsonl', help="JSONL output / checkpoint file")
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help="Videos processed at once")
+    parser.add_argument('-r', '--rate', type=float, default=1.0, help="Videos started per second (0 = unlimited)")
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--lang', default='en')
+    args = parser.parse_args(argv)
+
+    urls = read_urls(args.input)
+    summary = asyncio.run(ingest_videos(urls, args.output, concurrency=args.concurrency, rate=args.rate,
+                                        model=args.model, lang=args.lang))
+    return 0 if summary['errors'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
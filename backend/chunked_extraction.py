@@ -0,0 +1,116 @@
+import re
+from collections import Counter
+
+from prompt_builder import count_tokens
+from recipe_model import Recipe
+
+DEFAULT_WINDOW_TOKENS = 6000
+DEFAULT_OVERLAP_TOKENS = 200
+
+# Steps this similar (Jaccard over their words) are the same step seen twice in an overlap
+STEP_SIMILARITY = 0.8
+
+_NON_WORD = re.compile(r'[^a-z0-9 ]+')
+
+
+def split_transcript(text, window_tokens=DEFAULT_WINDOW_TOKENS, overlap_tokens=DEFAULT_OVERLAP_TOKENS):
+    """
+    Split a cleaned transcript into overlapping windows of about window_tokens
+
+    The whole text is counted once and windows are cut by characters at that
+    density, on word boundaries, so a long transcript is never tokenized
+    window by window. Consecutive windows share about overlap_tokens so an
+    ingredient or step cut at a boundary appears whole in one of them.
+
+    Args:
+        text (str): Cleaned transcript
+        window_tokens (int): Token budget of each window
+        overlap_tokens (int): Tokens repeated at the start of the next window
+
+    Returns:
+        list: Window texts; a single element when the transcript fits in one window
+    """
+    tokens = count_tokens(text)
+    if tokens <= window_tokens:
+        return [text]
+    chars_per_token = len(text) / tokens
+    window_chars = max(int(window_tokens * chars_per_token), 1)
+    overlap_chars = min(int(overlap_tokens * chars_per_token), window_chars // 2)
+
+    windows = []
+    start = 0
+    while start < len(text):
+        end = start + window_chars
+        if end >= len(text):
+            windows.append(text[start:])
+            break
+        boundary = text.rfind(' ', start, end)
+        if boundary > start:
+            end = boundary
+        windows.append(text[start:end])
+        if overlap_chars:
+            # Start the next window on the first word inside the overlap, or mid-word if there is none
+            next_start = max(end - overlap_chars, start + 1)
+            boundary = text.find(' ', next_start, end)
+            start = boundary + 1 if boundary != -1 else next_start
+        else:
+            start = end + 1 if text[end] == ' ' else end
+    return windows
+
+
+def _normalize(text):
+    return ' '.join(_NON_WORD.sub(' ', text.lower()).split())
+
+
+def ingredient_key(ingredient):
+    """Name an ingredient is deduplicated on: lowercase words without punctuation or plural s"""
+    words = _normalize(ingredient.name).split()
+    return ' '.join(word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
+                    for word in words)
+
+
+def _similar_step(words, seen):
+    for other in seen:
+        union = len(words | other)
+        if union and len(words & other) / union >= STEP_SIMILARITY:
+            return True
+    return False
+
+
+def merge_recipes(recipes):
+    """
+    Merge partial recipes extracted from consecutive transcript windows
+
+    Ingredients are deduplicated by name, keeping the first mention unless a
+    later one adds the quantity it lacked; steps are kept in window order
+    with repeats from overlapping windows dropped. The title is the one most
+    windows agree on.
+
+    Args:
+        recipes (iterable): Recipe objects in transcript order
+
+    Returns:
+        Recipe: The merged recipe
+    """
+    titles = Counter()
+    ingredients = {}
+    steps = []
+    seen_steps = []
+    for recipe in recipes:
+        if recipe.title:
+            titles[recipe.title] += 1
+        for ingredient in recipe.ingredients:
+            key = ingredient_key(ingredient)
+            if not key:
+                continue
+            existing = ingredients.get(key)
+            if existing is None or (existing.quantity is None and ingredient.quantity is not None):
+                # dict keeps the position of the first mention when a later one replaces it
+                ingredients[key] = ingredient
+        for step in recipe.steps:
+            words = set(_normalize(step).split())
+            if words and not _similar_step(words, seen_steps):
+                seen_steps.append(words)
+                steps.append(step)
+    title = titles.most_common(1)[0][0] if titles else ''
+    return Recipe(title=title, ingredients=list(ingredients.values()), steps=steps)
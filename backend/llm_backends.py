@@ -0,0 +1,221 @@
+import os
+import time
+import asyncio
+import threading
+
+from llm_pool import get_pool
+
+TOGETHER_BASE_URL = "https://api.together.xyz/v1"
+
+DEFAULT_MODEL = os.getenv('RECIPECHAT_MODEL', "meta-llama/Llama-3.3-70B-Instruct-Turbo-Free")
+
+STUB_RECIPE = """**Title**: Stub Tomato Pasta
+
+**Ingredients**:
+- 200 g spaghetti
+- 2 tbsp olive oil
+- 3 cloves garlic
+- 400 g canned tomatoes
+- 1 tsp salt
+
+**Procedure**:
+- Boil the spaghetti in salted water until al dente.
+- Fry the garlic in olive oil for one minute.
+- Add the tomatoes and simmer for ten minutes.
+- Toss the pasta with the sauce and serve.
+"""
+
+STUB_ANSWER = (
+    "Simmer the sauce for ten to twelve minutes until it thickens, stirring occasionally so it does not "
+    "catch. Taste and adjust the salt before tossing it with the drained pasta, and loosen it with a splash "
+    "of the pasta water if it looks too thick."
+)
+
+
+class LLMBackend:
+    """
+    Interface every LLM backend implements.
+
+    complete() returns the whole answer; stream() is an async generator of
+    text chunks. Both raise on failure; callers turn errors into messages.
+    """
+
+    def complete(self, prompt, model, max_tokens=1500):
+        raise NotImplementedError
+
+    async def stream(self, prompt, model, max_tokens=1500):
+        raise NotImplementedError
+        yield  # pragma: no cover - makes this an async generator
+
+    async def warmup(self, connections=2):
+        """
+        Prepare the running loop for requests (e.g. open connections) ahead of the first one
+
+        Returns:
+            int: Number of connections opened
+        """
+        return 0
+
+    def output_model(self, model):
+        """
+        Name of the model that actually produces the output for model, used in cache keys
+
+        Returns:
+            str: model for backends that serve it as named
+        """
+        return model
+
+
+class TogetherBackend(LLMBackend):
+    """
+    Together AI backend speaking the OpenAI-compatible chat completions API
+    through the shared keep-alive connection pool. The API key is only
+    required when a request is made, so importing never needs it.
+    """
+
+    def __init__(self, api_key=None, base_url=None, pool=None):
+        self._api_key = api_key
+        self.base_url = (base_url or os.getenv('TOGETHER_BASE_URL') or TOGETHER_BASE_URL).rstrip('/')
+        self.pool = pool or get_pool()
+
+    def _headers(self):
+        api_key = self._api_key or os.getenv('TOGETHER_API_KEY')
+        if not api_key:
+            raise ValueError("TOGETHER_API_KEY not found in environment variables")
+        return {"Authorization": f"Bearer {api_key}"}
+
+    async def warmup(self, connections=2):
+        try:
+            headers = self._headers()
+        except ValueError as e:
+            print(f"LLM warm-up skipped: {e}")
+            return 0
+        return await self.pool.warmup(f"{self.base_url}/models", connections, headers=headers)
+
+    def _payload(self, prompt, model, max_tokens, stream):
+        return {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "stream": stream,
+        }
+
+    def complete(self, prompt, model, max_tokens=1500):
+        response = self.pool.post_json(
+            f"{self.base_url}/chat/completions",
+            self._payload(prompt, model, max_tokens, stream=False),
+            headers=self._headers()
+        )
+        return response["choices"][0]["message"]["content"].strip()
+
+    async def stream(self, prompt, model, max_tokens=1500):
+        events = self.pool.stream_events(
+            f"{self.base_url}/chat/completions",
+            self._payload(prompt, model, max_tokens, stream=True),
+            headers=self._headers()
+        )
+        try:
+            async for event in events:
+                choices = event.get("choices")
+                if not choices:
+                    continue
+                yield (choices[0].get("delta") or {}).get("content") or ""
+        finally:
+            # Release the pooled connection even when the consumer stops early
+            await events.aclose()
+
+
+def split_tokens(text):
+    """Split text into word-sized tokens that join back to the original text"""
+    tokens = []
+    start = 0
+    for index, char in enumerate(text):
+        if char in ' \n' and index > start:
+            tokens.append(text[start:index])
+            start = index
+    tokens.append(text[start:])
+    return [token for token in tokens if token]
+
+
+class StubBackend(LLMBackend):
+    """
+    Deterministic local backend for load testing without network access.
+
+    Replays a fixed token stream after first_token_delay seconds at
+    tokens_per_second. responses is either a string, a list of tokens, or a
+    callable taking the prompt and returning either; by default extraction
+    prompts get STUB_RECIPE and everything else STUB_ANSWER.
+    """
+
+    def __init__(self, responses=None, tokens_per_second=50.0, first_token_delay=0.3):
+        self.responses = responses
+        self.tokens_per_second = tokens_per_second
+        self.first_token_delay = first_token_delay
+        self.calls = 0
+
+    def tokens_for(self, prompt):
+        response = self.responses
+        if callable(response):
+            response = response(prompt)
+        if response is None:
+            response = STUB_RECIPE if "Recipe transcript:" in prompt else STUB_ANSWER
+        if isinstance(response, str):
+            return split_tokens(response)
+        return list(response)
+
+    def output_model(self, model):
+        # Canned output must never be cached under a real model's name
+        return model if model.startswith('stub') else f"stub:{model}"
+
+    def complete(self, prompt, model, max_tokens=1500):
+        self.calls += 1
+        return ''.join(self.tokens_for(prompt)[:max_tokens]).strip()
+
+    async def stream(self, prompt, model, max_tokens=1500):
+        self.calls += 1
+        tokens = self.tokens_for(prompt)[:max_tokens]
+        await asyncio.sleep(self.first_token_delay)
+        start = time.monotonic()
+        for index, token in enumerate(tokens):
+            yield token
+            if self.tokens_per_second:
+                # Sleep to a schedule rather than a fixed interval so timer overshoot does not accumulate
+                delay = start + (index + 1) / self.tokens_per_second - time.monotonic()
+                await asyncio.sleep(max(delay, 0))
+
+
+_together_backend = None
+_stub_backends = {}
+_backend_lock = threading.Lock()
+
+
+def get_backend(model):
+    """
+    Pick the backend for a model name
+
+    "stub", or "stub:<tokens_per_second>:<first_token_delay>", selects a
+    StubBackend; anything else goes to the shared TogetherBackend. Setting
+    LLM_BACKEND=stub routes every model to the stub.
+
+    Args:
+        model (str): Model name as passed to RecipeChatBot
+
+    Returns:
+        LLMBackend: Backend instance shared by all callers of that model
+    """
+    if os.getenv('LLM_BACKEND') == 'stub' and not model.startswith('stub'):
+        model = os.getenv('LLM_STUB_MODEL', 'stub')
+
+    global _together_backend
+    with _backend_lock:
+        if model.startswith('stub'):
+            if model not in _stub_backends:
+                parts = model.split(':')
+                tokens_per_second = float(parts[1]) if len(parts) > 1 and parts[1] else 50.0
+                first_token_delay = float(parts[2]) if len(parts) > 2 and parts[2] else 0.3
+                _stub_backends[model] = StubBackend(tokens_per_second=tokens_per_second,
+                                                    first_token_delay=first_token_delay)
+            return _stub_backends[model]
+        if _together_backend is None:
+            _together_backend = TogetherBackend()
+        return _together_backend
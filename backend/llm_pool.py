@@ -0,0 +1,239 @@
+import os
+import json
+import asyncio
+import threading
+import weakref
+
+# aiohttp and requests are imported when the first session is created, so
+# importing the backend does not pay for the HTTP stacks
+
+
+class LLMPoolConfig:
+    """Connection pool settings, read from the environment by default"""
+
+    def __init__(self, pool_size=None, limit_per_host=None, connect_timeout=None, read_timeout=None,
+                 first_token_timeout=None, keepalive=None):
+        self.pool_size = pool_size or int(os.getenv('LLM_POOL_SIZE', 100))
+        self.limit_per_host = limit_per_host or int(os.getenv('LLM_POOL_PER_HOST', 32))
+        self.connect_timeout = connect_timeout or float(os.getenv('LLM_CONNECT_TIMEOUT', 10))
+        # Longest allowed gap between two reads on an open stream
+        self.read_timeout = read_timeout or float(os.getenv('LLM_READ_TIMEOUT', 60))
+        self.first_token_timeout = first_token_timeout or float(os.getenv('LLM_FIRST_TOKEN_TIMEOUT', 30))
+        self.keepalive = keepalive or float(os.getenv('LLM_KEEPALIVE', 60))
+
+
+class LLMClientPool:
+    """
+    Shared, keep-alive HTTP connection pool for OpenAI-compatible LLM APIs.
+
+    Async calls use one aiohttp session per event loop (sessions are bound to
+    the loop that created them), all configured with the same connector
+    limits and timeouts. Sync calls share one pooled requests.Session.
+    stats() exposes request and connection counters for pool utilisation.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or LLMPoolConfig()
+        self._sessions = weakref.WeakKeyDictionary()  # loop -> aiohttp.ClientSession
+        self._sync_session = None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.waiting_for_connection = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.first_token_timeouts = 0
+
+    def _trace_config(self):
+        import aiohttp
+
+        trace = aiohttp.TraceConfig()
+
+        async def on_queued_start(session, context, params):
+            self._add('waiting_for_connection', 1)
+
+        async def on_queued_end(session, context, params):
+            self._add('waiting_for_connection', -1)
+
+        async def on_create_end(session, context, params):
+            self._add('connections_created', 1)
+
+        async def on_reuse(session, context, params):
+            self._add('connections_reused', 1)
+
+        trace.on_connection_queued_start.append(on_queued_start)
+        trace.on_connection_queued_end.append(on_queued_end)
+        trace.on_connection_create_end.append(on_create_end)
+        trace.on_connection_reuseconn.append(on_reuse)
+        return trace
+
+    def _add(self, counter, amount):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def session(self):
+        """Return the aiohttp session for the running event loop, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            import aiohttp
+
+            connector = aiohttp.TCPConnector(
+                limit=self.config.pool_size,
+                limit_per_host=self.config.limit_per_host,
+                keepalive_timeout=self.config.keepalive,
+                ttl_dns_cache=300,
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=None,
+                sock_connect=self.config.connect_timeout,
+                sock_read=self.config.read_timeout,
+            )
+            session = aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                            trace_configs=[self._trace_config()])
+            self._sessions[loop] = session
+        return session
+
+    def sync_session(self):
+        """Return the shared requests.Session used for blocking calls"""
+        with self._lock:
+            if self._sync_session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                # pool_connections is the number of per-host pools kept, pool_maxsize the connections in each;
+                # together they mirror the aiohttp connector's limit and limit_per_host
+                hosts = max(1, -(-self.config.pool_size // self.config.limit_per_host))
+                adapter = HTTPAdapter(pool_connections=hosts, pool_maxsize=self.config.limit_per_host,
+                                      pool_block=True)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._sync_session = session
+            return self._sync_session
+
+    def _enter(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def post_json(self, url, payload, headers=None):
+        """Blocking JSON POST through the pooled requests.Session"""
+        self._enter()
+        try:
+            response = self.sync_session().post(
+                url, json=payload, headers=headers,
+                timeout=(self.config.connect_timeout, self.config.read_timeout)
+            )
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+            return response.json()
+        finally:
+            self._exit()
+
+    async def stream_events(self, url, payload, headers=None):
+        """
+        POST a streaming request and yield each server-sent event as parsed JSON
+
+        Raises:
+            asyncio.TimeoutError: If no event arrives within first_token_timeout
+            RuntimeError: On a non-200 response
+        """
+        self._enter()
+        try:
+            async with self.session().post(url, json=payload, headers=headers) as response:
+                if response.status != 200:
+                    body = await response.text()
+                    raise RuntimeError(f"HTTP {response.status}: {body[:200]}")
+                lines = response.content.__aiter__()
+                waiting_for_first = True
+                finished = False
+                while True:
+                    try:
+                        if waiting_for_first:
+                            line = await asyncio.wait_for(lines.__anext__(), self.config.first_token_timeout)
+                        else:
+                            line = await lines.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        self._add('first_token_timeouts', 1)
+                        raise
+                    if finished or not line.startswith(b'data:'):
+                        continue
+                    data = line[5:].strip()
+                    if data == b'[DONE]':
+                        # Keep reading to the end of the body so the connection can be reused
+                        finished = True
+                        continue
+                    waiting_for_first = False
+                    yield json.loads(data)
+        finally:
+            self._exit()
+
+    async def warmup(self, url, connections=2, headers=None):
+        """
+        Open keep-alive connections to url's host on the running loop's session
+
+        Sends `connections` concurrent HEAD requests so each one needs its own
+        connection (DNS, TCP and TLS); they stay in the pool for the first
+        real requests. The response status does not matter.
+
+        Returns:
+            int: Number of requests that completed
+        """
+        session = self.session()
+
+        async def connect():
+            async with session.head(url, headers=headers, allow_redirects=False) as response:
+                await response.read()
+
+        results = await asyncio.gather(*(connect() for _ in range(connections)), return_exceptions=True)
+        failures = [result for result in results if isinstance(result, Exception)]
+        if failures:
+            print(f"LLM warm-up: {len(failures)} of {connections} connections failed: {failures[0]!r}")
+        return connections - len(failures)
+
+    def stats(self):
+        """Return pool utilisation counters"""
+        with self._lock:
+            reused = self.connections_reused
+            total = reused + self.connections_created
+            return {
+                'pool_size': self.config.pool_size,
+                'limit_per_host': self.config.limit_per_host,
+                'requests': self.requests,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'utilization': self.in_flight / self.config.pool_size,
+                'waiting_for_connection': self.waiting_for_connection,
+                'connections_created': self.connections_created,
+                'connections_reused': reused,
+                'reuse_ratio': reused / total if total else 0.0,
+                'first_token_timeouts': self.first_token_timeouts,
+            }
+
+    async def aclose(self):
+        """Close the session owned by the running loop"""
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide LLM connection pool shared by every backend"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = LLMClientPool()
+        return _shared_pool
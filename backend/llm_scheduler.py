@@ -0,0 +1,242 @@
+import time
+import asyncio
+import threading
+import itertools
+from contextlib import asynccontextmanager
+
+# Lanes in priority order: short interactive answers go before long extractions,
+# and both before background work such as conversation summaries
+LANES = ('chat', 'extraction', 'background')
+
+
+class RateLimitedError(Exception):
+    """Raised when a user has used up their request budget for longer than the scheduler will wait"""
+
+
+class TokenBucket:
+    """Request budget of one user: burst requests at once, refilled at rate per second"""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now, cost=1):
+        """
+        Take cost tokens, going into debt if needed
+
+        Returns:
+            float: Seconds until the debt is repaid (0 if the tokens were available)
+        """
+        self.refill(now)
+        self.tokens -= cost
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class _Waiter:
+    __slots__ = ('lane', 'user', 'tag', 'order', 'loop', 'event', 'on_queue', 'position', 'granted')
+
+    def __init__(self, lane, user, tag, order, on_queue):
+        self.lane = lane
+        self.user = user
+        self.tag = tag
+        self.order = order
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+        self.on_queue = on_queue
+        self.position = 0
+        self.granted = False
+
+
+class LLMScheduler:
+    """
+    Admission control in front of upstream LLM calls.
+
+    Each user (any hashable key; None means an internal caller with no
+    budget) draws one token per call from a TokenBucket and waits for the
+    refill when it runs dry, up to max_wait seconds. At most max_concurrent
+    calls run upstream at once, and lane_limits caps each lane so part of
+    the capacity is always left for chat. Calls waiting for a slot are
+    served by lane priority and, within a lane, by start-time fair queuing
+    over users: a user with many queued calls gets one turn for every turn
+    of each other waiting user instead of holding the queue.
+
+    Waiters may live on different event loops; they are woken with
+    call_soon_threadsafe, as in SingleFlight. Queued callers get their
+    position through on_queue.
+    """
+
+    def __init__(self, max_concurrent=32, lane_limits=None, user_rate=1.0, user_burst=10, max_wait=30):
+        self.max_concurrent = max_concurrent
+        self.lane_limits = dict(lane_limits or {})
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._waiting = {lane: [] for lane in LANES}
+        self._running = {lane: 0 for lane in LANES}
+        self._virtual_time = {lane: 0 for lane in LANES}
+        self._next_tag = {lane: {} for lane in LANES}  # lane -> user -> start tag of the user's next call
+        self._order = itertools.count()
+        self.admitted = 0
+        self.queued = 0
+        self.rate_limited = 0
+
+    def _limit(self, lane):
+        return min(self.max_concurrent, self.lane_limits.get(lane, self.max_concurrent))
+
+    def _can_run(self, lane):
+        return sum(self._running.values()) < self.max_concurrent and self._running[lane] < self._limit(lane)
+
+    def _charge(self, user, now):
+        """Take a token from user's bucket; returns the seconds to wait for it"""
+        if user is None or self.user_rate <= 0:
+            return 0.0
+        with self._lock:
+            bucket = self._buckets.get(user)
+            if bucket is None:
+                if len(self._buckets) >= 10000:
+                    # Forget users whose bucket has refilled; they would start full anyway
+                    for key, idle in list(self._buckets.items()):
+                        idle.refill(now)
+                        if idle.tokens >= idle.burst:
+                            del self._buckets[key]
+                bucket = self._buckets[user] = TokenBucket(self.user_rate, self.user_burst, now)
+            wait = bucket.reserve(now)
+            if wait > self.max_wait:
+                bucket.tokens += 1
+                self.rate_limited += 1
+                raise RateLimitedError(f"Too many requests, please try again in {wait:.0f}s")
+        return wait
+
+    def _enqueue_locked(self, lane, user, on_queue):
+        next_tags = self._next_tag[lane]
+        tag = max(self._virtual_time[lane], next_tags.get(user, 0))
+        next_tags[user] = tag + 1
+        waiter = _Waiter(lane, user, tag, next(self._order), on_queue)
+        self._waiting[lane].append(waiter)
+        self.queued += 1
+        return waiter
+
+    def _dispatch_locked(self):
+        """Grant free slots to the waiters next in line"""
+        for lane in LANES:
+            waiting = self._waiting[lane]
+            while waiting and self._can_run(lane):
+                waiter = min(waiting, key=lambda w: (w.tag, w.order))
+                waiting.remove(waiter)
+                self._virtual_time[lane] = waiter.tag
+                if not any(w.user == waiter.user for w in waiting):
+                    # No backlog left, so the user's next call starts level with everyone else
+                    self._next_tag[lane].pop(waiter.user, None)
+                waiter.granted = True
+                self._running[lane] += 1
+                self.admitted += 1
+                waiter.loop.call_soon_threadsafe(waiter.event.set)
+
+    def _positions_locked(self):
+        """
+        Waiters whose queue position changed since they were last told
+
+        Returns:
+            list: (on_queue, status) pairs to call once the lock is released
+        """
+        updates = []
+        ahead = 0
+        for lane in LANES:
+            ordered = sorted(self._waiting[lane], key=lambda w: (w.tag, w.order))
+            for index, waiter in enumerate(ordered, ahead + 1):
+                if waiter.on_queue is not None and waiter.position != index:
+                    waiter.position = index
+                    updates.append((waiter.on_queue, {"queued": True, "position": index, "lane": lane}))
+            ahead += len(ordered)
+        return updates
+
+    @staticmethod
+    def _notify(updates):
+        for on_queue, status in updates:
+            try:
+                on_queue(status)
+            except Exception as e:
+                print(f"Error sending queue status: {e}")
+
+    def _release(self, lane):
+        with self._lock:
+            self._running[lane] -= 1
+            self._dispatch_locked()
+            updates = self._positions_locked()
+        self._notify(updates)
+
+    async def _acquire(self, lane, user, on_queue):
+        wait = self._charge(user, time.monotonic())
+        if wait > 0:
+            if on_queue is not None:
+                self._notify([(on_queue, {"queued": True, "rateLimited": True, "retryIn": round(wait, 1),
+                                          "lane": lane})])
+            await asyncio.sleep(wait)
+
+        with self._lock:
+            if not self._waiting[lane] and self._can_run(lane):
+                self._running[lane] += 1
+                self.admitted += 1
+                return
+            waiter = self._enqueue_locked(lane, user, on_queue)
+            updates = self._positions_locked()
+        self._notify(updates)
+
+        try:
+            await waiter.event.wait()
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._waiting[lane].remove(waiter)
+                    updates = self._positions_locked()
+            if granted:
+                self._release(lane)
+            else:
+                self._notify(updates)
+            raise
+        if waiter.position and on_queue is not None:
+            self._notify([(on_queue, {"queued": False, "position": 0, "lane": lane})])
+
+    @asynccontextmanager
+    async def slot(self, lane, user=None, on_queue=None):
+        """
+        Hold one upstream LLM slot for the duration of the block
+
+        Args:
+            lane (str): One of LANES
+            user: Key whose token bucket and fair share the call counts against
+            on_queue (callable): Called with a status dict while the call waits
+                ({"queued": True, "position": n} or {"rateLimited": True, "retryIn": s})
+                and with {"queued": False, "position": 0} once a waiting call is admitted
+
+        Raises:
+            RateLimitedError: If user's budget would not allow the call within max_wait seconds
+        """
+        await self._acquire(lane, user, on_queue)
+        try:
+            yield
+        finally:
+            self._release(lane)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'running': dict(self._running),
+                'waiting': {lane: len(waiting) for lane, waiting in self._waiting.items()},
+                'max_concurrent': self.max_concurrent,
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'rate_limited': self.rate_limited,
+                'users': len(self._buckets),
+            }
@@ -0,0 +1,294 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms are created once at module level, e.g.
+
+    TRANSCRIPT_SECONDS = Histogram('transcript_fetch_seconds', 'Transcript fetch latency', ['strategy'])
+    TRANSCRIPT_SECONDS.labels('manual').observe(0.42)
+
+and render() produces the text served by the /metrics endpoint. Recording
+is a lock-protected increment or bisect, so it is cheap enough for the hot
+path; METRICS_ENABLED=0 turns every recording call into a no-op.
+"""
+import os
+import math
+import bisect
+import threading
+
+METRIC_PREFIX = 'recipechat_'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RATE_BUCKETS = (1, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300, 500, 1000)
+
+enabled = os.getenv('METRICS_ENABLED', '1') != '0'
+
+
+def set_enabled(flag):
+    """Turn metric recording on or off process-wide"""
+    global enabled
+    enabled = bool(flag)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class MetricsRegistry:
+    """All metrics of the process, rendered together"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """
+        Add a metric to the registry
+
+        Returns:
+            The metric already registered under the same name when it has the
+            same type, labels and buckets (e.g. a module imported twice), else metric
+
+        Raises:
+            ValueError: If the name is taken by a different metric
+        """
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is None:
+                self._metrics[metric.name] = metric
+                return metric
+        if (existing.kind, existing.labelnames, getattr(existing, 'buckets', None)) != \
+                (metric.kind, metric.labelnames, getattr(metric, 'buckets', None)):
+            raise ValueError(f"Duplicate metric {metric.name}")
+        return existing
+
+    def get(self, name):
+        return self._metrics.get(METRIC_PREFIX + name)
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+class _Value:
+    """Value of one labelled counter or gauge; set_function makes it computed at render time"""
+
+    __slots__ = ('value', 'function', 'lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        if enabled:
+            with self.lock:
+                self.value += amount
+
+    def dec(self, amount=1.0):
+        self.inc(-amount)
+
+    def set(self, value):
+        if enabled:
+            self.value = value
+
+    def set_function(self, function):
+        """Report function() instead of a stored value (e.g. a size sampled at scrape time)"""
+        self.function = function
+
+    def get(self):
+        if self.function is not None:
+            return self.function()
+        return self.value
+
+
+class _HistogramValue:
+    """Bucketed observations of one labelled histogram"""
+
+    __slots__ = ('bounds', 'counts', 'count', 'sum', 'lock')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        if not enabled:
+            return
+        index = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def percentile(self, pct):
+        """
+        Estimate a percentile by linear interpolation within its bucket
+
+        Returns:
+            float: The estimate, or None with no observations
+        """
+        with self.lock:
+            counts = list(self.counts)
+            total = self.count
+        if not total:
+            return None
+        rank = pct / 100 * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+    def snapshot(self):
+        """Return count, sum, mean and estimated p50/p95/p99"""
+        with self.lock:
+            count, total = self.count, self.sum
+        return {
+            'count': count,
+            'sum': total,
+            'mean': total / count if count else None,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+        }
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=(), registry=REGISTRY):
+        self.name = METRIC_PREFIX + name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children = {}  # label values as strings -> child
+        self._lookup = {}  # label values as passed to labels() -> child
+        self._lock = threading.Lock()
+        existing = registry.register(self)
+        if existing is not self:
+            # Defined again by a second copy of a module: record into the registered series
+            self._children, self._lookup, self._lock = existing._children, existing._lookup, existing._lock
+        # Unlabelled metrics are reported from the start and skip the label lookup
+        self._default = self.labels() if not self.labelnames else None
+
+    def _new_child(self):
+        return _Value()
+
+    def labels(self, *values):
+        """Return the child for one combination of label values"""
+        child = self._lookup.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(tuple(str(value) for value in values), self._new_child())
+                self._lookup[values] = child
+        return child
+
+    def _items(self):
+        with self._lock:
+            return list(self._children.items())
+
+    def render(self):
+        lines = []
+        for values, child in self._items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.get())}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1.0):
+        self._default.inc(amount)
+
+    def set_function(self, function):
+        self._default.set_function(function)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    kind = 'gauge'
+
+    def inc(self, amount=1.0):
+        self._default.inc(amount)
+
+    def dec(self, amount=1.0):
+        self._default.dec(amount)
+
+    def set(self, value):
+        self._default.set(value)
+
+    def set_function(self, function):
+        self._default.set_function(function)
+
+
+class Histogram(_Metric):
+    """Distribution of observations in fixed buckets"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def snapshot(self):
+        return self._default.snapshot()
+
+    def render(self):
+        lines = []
+        for values, child in self._items():
+            with child.lock:
+                counts = list(child.counts)
+                count, total = child.count, child.sum
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket
+                labels = _format_labels(self.labelnames, values, ('le', _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def render():
+    """Prometheus text for every registered metric"""
+    return REGISTRY.render()
@@ -0,0 +1,182 @@
+import os
+import math
+
+_encoding = None
+_encoding_loaded = False
+
+# Pre-tokenisation pattern of the Llama 3 tokenizer, used with its tiktoken-format vocabulary file
+LLAMA3_PATTERN = (r"(?i:'s|'t|'re|'ve|'m|'ll|'d)|[^\r\n\p{L}\p{N}]?\p{L}+|\p{N}{1,3}"
+                  r"| ?[^\s\p{L}\p{N}]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+")
+
+
+def get_encoding():
+    """
+    Return the tokenizer read from TOKENIZER_VOCAB_PATH, loading it on first use so imports stay fast
+
+    The path points at a local tiktoken-format BPE file such as Llama 3's
+    tokenizer.model. Nothing is ever downloaded: without the file (or
+    without tiktoken) token counts come from the estimator below.
+
+    Returns:
+        tiktoken.Encoding or None: None when no vocabulary is configured or it cannot be loaded
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        path = os.getenv('TOKENIZER_VOCAB_PATH')
+        if path:
+            try:
+                import tiktoken
+                from tiktoken.load import load_tiktoken_bpe
+                _encoding = tiktoken.Encoding(os.path.basename(path), pat_str=LLAMA3_PATTERN,
+                                              mergeable_ranks=load_tiktoken_bpe(path), special_tokens={})
+            except Exception as e:
+                print(f"Could not load tokenizer from {path}, estimating token counts: {e}")
+                _encoding = None
+        _encoding_loaded = True
+    return _encoding
+
+# Average characters per token for English text on Llama 3 style BPE vocabularies
+CHARS_PER_TOKEN = float(os.getenv('PROMPT_CHARS_PER_TOKEN', 3.8))
+
+DEFAULT_CONTEXT_BUDGET = int(os.getenv('PROMPT_CONTEXT_BUDGET', 2048))
+DEFAULT_ANSWER_TOKENS = int(os.getenv('ANSWER_MAX_TOKENS', 1500))
+
+# Turns shorter than this are dropped rather than cut to a useless stub
+MIN_HISTORY_TOKENS = 24
+
+
+def count_tokens(text):
+    """
+    Count tokens with the configured tokenizer, otherwise estimate them
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Number of tokens
+    """
+    if not text:
+        return 0
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text, tokens):
+    """Cut text to roughly the given number of tokens, on a line or word boundary where possible"""
+    if count_tokens(text) <= tokens:
+        return text
+    encoding = get_encoding()
+    if encoding is not None:
+        cut = encoding.decode(encoding.encode(text)[:tokens])
+    else:
+        cut = text[:int(tokens * CHARS_PER_TOKEN)]
+    boundary = max(cut.rfind('\n'), cut.rfind(' '))
+    if boundary > len(cut) // 2:
+        cut = cut[:boundary]
+    return cut.rstrip() + "..."
+
+
+class PromptBuilder:
+    """
+    Assemble question prompts within a token budget.
+
+    The budget is filled in a fixed priority order: the question first, then
+    the recipe sections in the order given, then the summary of earlier
+    conversation, then conversation history from the most recent turn
+    backwards.
+
+    The template and the recipe sections are the only parts that repeat from
+    turn to turn, so they are the only counts kept: the template's once, the
+    sections' for the current recipe only.
+    """
+
+    def __init__(self, template, context_budget=DEFAULT_CONTEXT_BUDGET, answer_tokens=DEFAULT_ANSWER_TOKENS):
+        self.template = template
+        self.context_budget = context_budget
+        self.answer_tokens = answer_tokens
+        # Tokens used by the template itself, counted once
+        self.template_tokens = count_tokens(template.format(recipe_data='', user_question=''))
+        self._section_recipe = None
+        self._section_tokens = {}  # section text -> tokens, for _section_recipe only
+
+    def section_tokens(self, recipe_key, section):
+        """Count the tokens of a recipe section, remembering the counts until the recipe changes"""
+        if recipe_key is None:
+            return count_tokens(section)
+        if recipe_key != self._section_recipe:
+            self._section_recipe = recipe_key
+            self._section_tokens = {}
+        tokens = self._section_tokens.get(section)
+        if tokens is None:
+            tokens = self._section_tokens[section] = count_tokens(section)
+        return tokens
+
+    def build(self, question, sections, history, summary=None, recipe_key=None):
+        """
+        Build the prompt for a question
+
+        Args:
+            question (str): The user's current question
+            sections (list): Recipe context strings, most important first
+            history (list): Conversation turns ({"role", "content"}), oldest first
+            summary (str): Rolling summary of the turns no longer in history
+            recipe_key (str): Identifies the recipe the sections come from; their counts are kept per recipe
+
+        Returns:
+            tuple: (prompt, prompt_tokens)
+        """
+        remaining = self.context_budget - self.template_tokens
+
+        question_text = f"Current Question: {question}"
+        question_text = truncate_to_tokens(question_text, max(remaining, 1))
+        remaining -= count_tokens(question_text)
+
+        recipe_parts = []
+        for section in sections:
+            if remaining <= 0:
+                break
+            tokens = self.section_tokens(recipe_key, section)
+            if tokens > remaining:
+                section = truncate_to_tokens(section, remaining)
+                tokens = count_tokens(section)
+            recipe_parts.append(section)
+            remaining -= tokens + 1
+
+        summary_context = ""
+        summary_header = "Earlier Conversation (summary):\n"
+        if summary and remaining > count_tokens(summary_header) + MIN_HISTORY_TOKENS:
+            remaining -= count_tokens(summary_header)
+            summary = truncate_to_tokens(summary, remaining)
+            remaining -= count_tokens(summary) + 1
+            summary_context = summary_header + summary + "\n\n"
+
+        history_lines = []
+        header = "Recent Conversation:\n"
+        if history and remaining > count_tokens(header) + MIN_HISTORY_TOKENS:
+            remaining -= count_tokens(header)
+            for turn in reversed(history):
+                role = "User" if turn["role"] == "user" else "Assistant"
+                line = f"{role}: {turn['content']}"
+                tokens = count_tokens(line)
+                if tokens > remaining:
+                    if remaining < MIN_HISTORY_TOKENS:
+                        break
+                    line = truncate_to_tokens(line, remaining)
+                    tokens = count_tokens(line)
+                history_lines.append(line)
+                remaining -= tokens
+                if remaining < MIN_HISTORY_TOKENS:
+                    break
+            history_lines.reverse()
+
+        history_context = ""
+        if history_lines:
+            history_context = header + '\n'.join(history_lines) + "\n\n"
+
+        prompt = self.template.format(
+            recipe_data='\n\n'.join(recipe_parts),
+            user_question=f"{summary_context}{history_context}{question_text}"
+        )
+        return prompt, self.context_budget - remaining
@@ -0,0 +1,180 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_CACHE_PATH = os.path.join(script_dir, 'recipe_cache.sqlite3')
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_DISK_BYTES = 64 * 1024 * 1024
+
+
+def make_cache_key(video_id, lang, prompt_version, model):
+    """
+    Build a content-addressed cache key for an extracted recipe
+
+    Args:
+        video_id (str): YouTube video ID
+        lang (str): Requested transcript language
+        prompt_version (str): Version hash of the extraction prompt
+        model (str): LLM model used for extraction
+
+    Returns:
+        str: Hex digest identifying the extraction
+    """
+    raw = '\x1f'.join([video_id, lang, prompt_version, model])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class RecipeCache:
+    """
+    Two-tier cache for extracted recipe markdown.
+
+    The first tier is an in-memory LRU, the second a local SQLite file with
+    TTL and size-based eviction. Passing path=None keeps the cache in memory only.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, memory_entries=DEFAULT_MEMORY_ENTRIES,
+                 ttl=DEFAULT_TTL_SECONDS, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.ttl = ttl
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()  # key -> (stored_at, markdown)
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS recipes ("
+                    "key TEXT PRIMARY KEY, markdown TEXT NOT NULL, size INTEGER NOT NULL, "
+                    "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS recipes_accessed ON recipes (accessed_at)")
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Recipe cache disk tier disabled: {e}")
+                self._db = None
+
+    def _expired(self, stored_at, now):
+        return self.ttl is not None and now - stored_at > self.ttl
+
+    def _remember(self, key, stored_at, markdown):
+        self._memory[key] = (stored_at, markdown)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """
+        Look up a cached recipe
+
+        Args:
+            key (str): Key from make_cache_key
+
+        Returns:
+            str or None: Cached recipe markdown, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT markdown, stored_at FROM recipes WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None:
+                        markdown, stored_at = row
+                        if not self._expired(stored_at, now):
+                            self._db.execute("UPDATE recipes SET accessed_at = ? WHERE key = ?", (now, key))
+                            self._db.commit()
+                            self._remember(key, stored_at, markdown)
+                            self.hits += 1
+                            self.disk_hits += 1
+                            return markdown
+                        self._db.execute("DELETE FROM recipes WHERE key = ?", (key,))
+                        self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"Recipe cache read failed: {e}")
+
+            self.misses += 1
+            return None
+
+    def set(self, key, markdown):
+        """
+        Store a recipe in both tiers and evict stale or excess disk entries
+
+        Args:
+            key (str): Key from make_cache_key
+            markdown (str): Extracted recipe markdown
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, markdown)
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO recipes (key, markdown, size, stored_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, markdown, len(markdown.encode('utf-8')), now, now)
+                )
+                if self.ttl is not None:
+                    self._db.execute("DELETE FROM recipes WHERE stored_at < ?", (now - self.ttl,))
+                self._evict_disk()
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Recipe cache write failed: {e}")
+
+    def _evict_disk(self):
+        """Drop least recently accessed rows until the disk tier fits max_disk_bytes"""
+        if not self.max_disk_bytes:
+            return
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM recipes").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM recipes ORDER BY accessed_at ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_disk_bytes:
+                break
+            self._db.execute("DELETE FROM recipes WHERE key = ?", (key,))
+            total -= size
+
+    def stats(self):
+        """Return hit/miss counters and tier sizes"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+            }
+
+    def clear(self):
+        """Remove every cached recipe from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM recipes")
+                self._db.commit()
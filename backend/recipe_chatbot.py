@@ -21,13 +21,23 @@ Maintain a respectful, supportive, and encouraging tone.
 import warnings
 import logging
 import asyncio
-from youtube_transcript_api import YouTubeTranscriptApi
 import re
 import os
-from dotenv import load_dotenv
-from together import Together
 import time
-import random
+import threading
+from dotenv import load_dotenv
+import hashlib
+from recipe_cache import RecipeCache, make_cache_key
+from transcripts import AsyncTranscriptFetcher, clean_subtitle_text, extract_video_id
+from recipe_model import IncrementalRecipeParser, Recipe
+from prompt_builder import PromptBuilder, get_encoding, truncate_to_tokens
+from llm_backends import DEFAULT_MODEL, get_backend, split_tokens
+from llm_pool import get_pool
+from answer_cache import AnswerCache, is_context_dependent, load_numpy
+from chunked_extraction import split_transcript, merge_recipes
+from single_flight import SingleFlight
+from llm_scheduler import LANES, LLMScheduler
+from metrics import Counter, Gauge, Histogram, RATE_BUCKETS
 
 # Suppress warnings and logging  cleaner output
 warnings.filterwarnings("ignore")
@@ -37,62 +47,14 @@ logging.getLogger("transformers").setLevel(logging.ERROR)
 script_dir = os.path.dirname(os.path.abspath(__file__))
 load_dotenv(os.path.join(script_dir, '.env'))
 
-# Initialize Together AI client
-api_key = os.getenv('TOGETHER_API_KEY')
-if not api_key:
-    raise ValueError("TOGETHER_API_KEY not found in environment variables")
-
-together_client = Together(api_key=api_key)
-
-def clean_subtitle_text(subtitle_data):
-    """
-    Thoroughly clean and format subtitle text
-    
-    Args:
-        subtitle_data (list or str): Subtitle data from youtube-transcript-api
-    
-    Returns:
-        str: Cleaned, formatted subtitle text
-    """
-    texts = []
-
-    # Handle list of dictionaries from youtube-transcript-api
-    if isinstance(subtitle_data, list):
-        for item in subtitle_data:
-            if isinstance(item, dict) and 'text' in item:
-                texts.append(item['text'])
-    # Handle string input
-    elif isinstance(subtitle_data, str):
-        texts = [subtitle_data]
-    else:
-        # Fallback for other formats
-        texts = [str(subtitle_data)]
-
-    # Combine texts
-    full_text = ' '.join(texts)
-
-    # Comprehensive cleaning
-    # Remove JSON-like syntax and brackets
-    full_text = re.sub(r'[\{\}\[\]\"]', '', full_text)
-    
-    # Remove timestamps and time-related markers
-    full_text = re.sub(r'\d+:\d+:\d+\.\d+ --> \d+:\d+:\d+\.\d+', '', full_text)
-    full_text = re.sub(r'"tStartMs":\d+,"dDurationMs":\d+', '', full_text)
-    
-    # Remove extra whitespace
-    full_text = re.sub(r'\s+', ' ', full_text)
-    
-    # Remove newline characters
-    full_text = full_text.replace('\n', ' ')
-    
-    # Remove extra spaces and trim
-    full_text = ' '.join(full_text.split())
-
-    return full_text
+# Shared transcript fetcher (bounded thread pool for the blocking YouTube calls)
+transcript_fetcher = AsyncTranscriptFetcher(max_workers=int(os.getenv('TRANSCRIPT_WORKERS', 4)))
 
 def get_youtube_subtitles(url, lang='en', retry_count=3, backoff_factor=1):
     """
-    Fetch YouTube subtitles as a clean, formatted string
+    Fetch YouTube subtitles as a clean, formatted string (blocking wrapper
+    around transcript_fetcher for scripts; async code should await
+    transcript_fetcher.fetch directly)
     
     Args:
         url (str): YouTube video URL
@@ -103,86 +65,8 @@ def get_youtube_subtitles(url, lang='en', retry_count=3, backoff_factor=1):
     Returns:
         dict: A dictionary containing subtitle information
     """
-    attempt = 0
-    delay = 1
-    while attempt < retry_count:
-        try:
-            # Extract the video ID from different YouTube URL formats
-            video_id = None
-            if "v=" in url:
-                video_id = url.split("v=")[1].split("&")[0]
-            elif "youtu.be/" in url:
-                video_id = url.split("youtu.be/")[1].split("?")[0]
-            elif "embed/" in url:
-                video_id = url.split("embed/")[1].split("?")[0]
-
-            if not video_id:
-                raise ValueError("Could not extract video ID from URL")
-
-            # Preferred languages for manual and auto transcripts
-            manual_priority = ['en', 'hi']
-            auto_priority = ['en', 'hi']
-
-            # 1. Try manual transcripts
-            try:
-                transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-                try:
-                    transcript = transcript_list.find_manually_created_transcript(manual_priority)
-                    transcript_data = YouTubeTranscriptApi.get_transcript(video_id, languages=[transcript.language_code])
-                    full_text = clean_subtitle_text(transcript_data)
-                    if full_text and len(full_text) > 10:
-                        return {
-                            'full_text': full_text,
-                            'languages': [transcript.language_code],
-                            'type': 'manual'
-                        }
-                except Exception as e:
-                    pass
-                # 2. Try auto-generated transcripts
-                try:
-                    transcript = transcript_list.find_generated_transcript(auto_priority)
-                    transcript_data = YouTubeTranscriptApi.get_transcript(video_id, languages=[transcript.language_code])
-                    full_text = clean_subtitle_text(transcript_data)
-                    if full_text and len(full_text) > 10:
-                        return {
-                            'full_text': full_text,
-                            'languages': [transcript.language_code],
-                            'type': 'auto-generated'
-                        }
-                except Exception as e:
-                    pass
-                # 3. Try any transcript that script API can fetch
-                try:
-                    transcript = transcript_list.find_transcript(transcript_list._langs)
-                    transcript_data = YouTubeTranscriptApi.get_transcript(video_id, languages=[transcript.language_code])
-                    full_text = clean_subtitle_text(transcript_data)
-                    if full_text and len(full_text) > 10:
-                        return {
-                            'full_text': full_text,
-                            'languages': [transcript.language_code],
-                            'type': 'fallback-any-transcript'
-                        }
-                except Exception as e:
-                    pass
-                # If nothing worked, return available langs
-                available_languages = [(tr.language_code, 'auto' if tr.is_generated else 'manual') for tr in
-                                       transcript_list]
-                raise Exception(f"Could not fetch transcript. Available: {available_languages}")
-            except Exception as e:
-                raise e
-        except Exception as e:
-            attempt += 1
-            if attempt < retry_count:
-                delay *= backoff_factor
-                delay_with_jitter = delay * (1 + random.uniform(0, 0.1))
-                print(f"Error fetching subtitles: {e}. Retrying in {delay_with_jitter} seconds...")
-                time.sleep(delay_with_jitter)
-            else:
-                return {
-                    'full_text': '',
-                    'languages': [],
-                    'error': str(e)
-                }
+    return asyncio.run(transcript_fetcher.fetch(url, lang=lang, retry_count=retry_count,
+                                                backoff_factor=backoff_factor))
 
 # Step 2: Recipe Extraction Prompt
 EXTRACTION_PROMPT = """
@@ -207,91 +91,401 @@ IMPORTANT: Every single ingredient and procedure step must begin with "- " (dash
 Recipe transcript: {transcript}
 """
 
+# Long transcripts are extracted window by window and the partial recipes merged
+PARTIAL_EXTRACTION_PROMPT = """
+This is part {part} of {parts} of a long recipe transcript. Extract only the ingredients and procedure steps mentioned in this part; the parts will be merged afterwards.
+""" + EXTRACTION_PROMPT
+
+EXTRACTION_WINDOW_TOKENS = int(os.getenv('EXTRACTION_WINDOW_TOKENS', 6000))
+EXTRACTION_WINDOW_OVERLAP = int(os.getenv('EXTRACTION_WINDOW_OVERLAP', 200))
+EXTRACTION_CONCURRENCY = int(os.getenv('EXTRACTION_CONCURRENCY', 4))
+
+# Bump automatically whenever the extraction prompts change so stale cache entries are ignored
+PROMPT_VERSION = hashlib.sha256((EXTRACTION_PROMPT + PARTIAL_EXTRACTION_PROMPT).encode('utf-8')).hexdigest()[:12]
+
+# Shared extraction cache (in-memory LRU + SQLite on disk)
+recipe_cache = RecipeCache(
+    path=os.getenv('RECIPE_CACHE_PATH', os.path.join(script_dir, 'recipe_cache.sqlite3')) or None,
+    ttl=float(os.getenv('RECIPE_CACHE_TTL', 7 * 24 * 3600)),
+)
+
+# Answers change whenever the question prompt does
+ANSWER_PROMPT_VERSION = hashlib.sha256(GENERAL_PROMPT.encode('utf-8')).hexdigest()[:12]
+
+# Shared per-recipe answer cache (exact + near-duplicate question matching)
+answer_cache = AnswerCache(
+    threshold=float(os.getenv('ANSWER_CACHE_THRESHOLD', 0.85)),
+    max_recipes=int(os.getenv('ANSWER_CACHE_RECIPES', 256)),
+    entries_per_recipe=int(os.getenv('ANSWER_CACHE_ENTRIES', 64)),
+)
+
+SUMMARY_PROMPT = """
+Update the running summary of a cooking conversation about the recipe "{title}".
+Keep what later questions may rely on: the user's preferences, allergies and equipment, substitutions or changes agreed on, and any quantities, times and temperatures given. Leave out greetings and anything that merely repeats the recipe. Write plain prose of at most {words} words.
+
+Summary so far:
+{summary}
+
+Conversation to add:
+{turns}
+
+Updated summary:
+"""
+
+# Long conversations keep their newest CONVERSATION_KEEP_ENTRIES history entries
+# verbatim; once there are more than CONVERSATION_SUMMARY_AFTER, the older ones
+# are folded into a rolling summary in the background. With
+# CONVERSATION_SUMMARY=0 only the last 6 entries are kept, as before
+CONVERSATION_SUMMARY = os.getenv('CONVERSATION_SUMMARY', '1') != '0'
+SUMMARY_AFTER_ENTRIES = int(os.getenv('CONVERSATION_SUMMARY_AFTER', 6))
+SUMMARY_KEEP_ENTRIES = int(os.getenv('CONVERSATION_KEEP_ENTRIES', 2))
+SUMMARY_MAX_TOKENS = int(os.getenv('CONVERSATION_SUMMARY_TOKENS', 200))
+# Each turn is cut to this many tokens in the summary prompt
+SUMMARY_TURN_TOKENS = 300
+# Entries kept while a summary is pending or failing, to bound memory
+MAX_HISTORY_ENTRIES = max(16, SUMMARY_AFTER_ENTRIES * 2) if CONVERSATION_SUMMARY else 6
+
+# LLM streaming latency and throughput per query_llm_stream call
+LLM_FIRST_TOKEN_SECONDS = Histogram('llm_time_to_first_token_seconds', 'Time to the first streamed chunk', ['model'])
+LLM_STREAM_SECONDS = Histogram('llm_stream_duration_seconds', 'Total duration of a streamed completion', ['model'])
+LLM_TOKENS_PER_SECOND = Histogram('llm_tokens_per_second', 'Streamed chunks per second after the first',
+                                  ['model'], buckets=RATE_BUCKETS)
+LLM_TOKENS = Counter('llm_stream_tokens_total', 'Streamed chunks received', ['model'])
+LLM_ERRORS = Counter('llm_stream_errors_total', 'Streamed completions that failed', ['model'])
+
+# Upstream HTTP connection pool utilisation, read from the pool when metrics are scraped
+Gauge('llm_pool_in_flight', 'LLM HTTP requests in flight').set_function(lambda: get_pool().stats()['in_flight'])
+Gauge('llm_pool_waiting_for_connection', 'LLM HTTP requests waiting for a pooled connection').set_function(
+    lambda: get_pool().stats()['waiting_for_connection'])
+Gauge('llm_pool_utilization', 'LLM HTTP requests in flight as a fraction of the pool size').set_function(
+    lambda: get_pool().stats()['utilization'])
+Counter('llm_pool_requests_total', 'LLM HTTP requests sent through the pool').set_function(
+    lambda: get_pool().stats()['requests'])
+Counter('llm_pool_connections_created_total', 'LLM HTTP connections opened').set_function(
+    lambda: get_pool().stats()['connections_created'])
+Counter('llm_pool_connections_reused_total', 'LLM HTTP requests that reused a kept-alive connection').set_function(
+    lambda: get_pool().stats()['connections_reused'])
+Counter('llm_pool_first_token_timeouts_total', 'LLM streams that timed out before the first token').set_function(
+    lambda: get_pool().stats()['first_token_timeouts'])
+
+# Every upstream LLM call goes through the scheduler: per-user token buckets, a
+# global concurrency cap, and chat ahead of extraction, which may only use
+# LLM_EXTRACTION_SLOTS of the LLM_MAX_CONCURRENCY slots so chat always has room
+# (background work such as conversation summaries gets LLM_BACKGROUND_SLOTS)
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 32))
+llm_scheduler = LLMScheduler(
+    max_concurrent=LLM_MAX_CONCURRENCY,
+    lane_limits={'extraction': int(os.getenv('LLM_EXTRACTION_SLOTS', max(1, LLM_MAX_CONCURRENCY // 2))),
+                 'background': int(os.getenv('LLM_BACKGROUND_SLOTS', max(1, LLM_MAX_CONCURRENCY // 4)))},
+    user_rate=float(os.getenv('LLM_USER_RATE', 1.0)),
+    user_burst=float(os.getenv('LLM_USER_BURST', 10)),
+    max_wait=float(os.getenv('LLM_RATE_LIMIT_MAX_WAIT', 30)),
+)
+SUMMARY_SECONDS = Histogram('conversation_summary_seconds', 'Time to update a conversation summary')
+SUMMARIES = Counter('conversation_summaries_total', 'Conversation summary updates', ['result'])
+LLM_QUEUE_SECONDS = Histogram('llm_queue_wait_seconds', 'Time an LLM call waited for admission', ['lane'])
+LLM_RUNNING = Gauge('llm_scheduler_running', 'Upstream LLM calls running', ['lane'])
+LLM_WAITING = Gauge('llm_scheduler_waiting', 'LLM calls waiting for a slot', ['lane'])
+for lane in LANES:
+    LLM_RUNNING.labels(lane).set_function(lambda lane=lane: llm_scheduler.stats()['running'][lane])
+    LLM_WAITING.labels(lane).set_function(lambda lane=lane: llm_scheduler.stats()['waiting'][lane])
+Counter('llm_rate_limited_total', 'LLM calls rejected by the per-user rate limit').set_function(
+    lambda: llm_scheduler.rate_limited)
+
+# Cache effectiveness, read from the caches when metrics are scraped
+Counter('recipe_cache_hits_total', 'Recipe cache hits').set_function(lambda: recipe_cache.hits)
+Counter('recipe_cache_misses_total', 'Recipe cache misses').set_function(lambda: recipe_cache.misses)
+Counter('answer_cache_hits_total', 'Answer cache hits').set_function(lambda: answer_cache.stats()['hits'])
+Counter('answer_cache_misses_total', 'Answer cache misses').set_function(lambda: answer_cache.misses)
+Counter('answer_cache_bypassed_total', 'Questions asked mid-conversation that skipped the answer cache').set_function(
+    lambda: answer_cache.bypassed)
+Gauge('answer_cache_hit_ratio', 'Answer cache hit ratio').set_function(lambda: answer_cache.stats()['hit_ratio'])
+
+# Concurrent fetches of the same uncached video share one transcript fetch and LLM stream
+recipe_flights = SingleFlight()
+Counter('recipe_flights_started_total', 'Recipe extractions started').set_function(
+    lambda: recipe_flights.stats()['started'])
+Counter('recipe_flights_joined_total', 'Recipe fetches that joined an extraction already running').set_function(
+    lambda: recipe_flights.stats()['joined'])
+
+
+def preload():
+    """
+    Import the lazily loaded dependencies (NumPy, the tokenizer vocabulary, youtube-transcript-api) ahead of the first request
+
+    Meant to run in the background after startup, so neither startup nor the first user pays for them.
+    """
+    if answer_cache.similarity:
+        load_numpy()
+    get_encoding()
+    try:
+        import youtube_transcript_api  # noqa: F401
+    except ImportError:
+        pass
+
+
+class TranscriptUnavailable(Exception):
+    """Raised when a video has no usable transcript; the message is shown to the user"""
+
+
+class LLMError(str):
+    """
+    Error message yielded by query_llm_stream (and returned by query_llm) when the call fails
+
+    It is a str so it can be shown to the user like any other chunk; callers
+    check isinstance(chunk, LLMError) so that output cut short by an error is
+    never cached, remembered or checkpointed as a complete response.
+    """
 
 
 # Step 3: Query LLAMA for Extraction
 
-def query_llm(prompt, model="meta-llama/Llama-3.3-70B-Instruct-Turbo-Free"):
+def query_llm(prompt, model=DEFAULT_MODEL, max_tokens=1500, backend=None):
     try:
-        response = together_client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=1500  # Add max_tokens to prevent exceeding limits
-        )
-        return response.choices[0].message.content.strip()
+        backend = backend or get_backend(model)
+        return backend.complete(prompt, model, max_tokens=max_tokens)
     except Exception as e:
-        return f"Error querying LLM: {e}"
+        return LLMError(f"Error querying LLM: {e}")
 
-async def query_llm_stream(prompt, model="meta-llama/Llama-3.3-70B-Instruct-Turbo-Free", websocket=None, stop_callback=None):
+async def query_llm_stream(prompt, model=DEFAULT_MODEL, websocket=None, stop_callback=None, max_tokens=1500, backend=None,
+                           lane='chat', user=None, on_queue=None):
+    """
+    Stream a completion once llm_scheduler admits the call
+
+    lane, user and on_queue are passed to LLMScheduler.slot(); the time spent
+    waiting for admission counts towards the time to first token.
+    """
+    start = time.perf_counter()
+    first_token_at = None
+    tokens = 0
     try:
-        stream = together_client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            stream=True,
-            max_tokens=1500  # Add max_tokens to prevent exceeding limits
-        )
-        
-        full_response = ""
-        for chunk in stream:
-            if stop_callback and stop_callback():
-                print("Stream stopped by callback")
-                break
-            chunk_text = chunk.choices[0].delta.content or ""
-            full_response += chunk_text
-            yield chunk_text
+        backend = backend or get_backend(model)
+        async with llm_scheduler.slot(lane, user, on_queue):
+            LLM_QUEUE_SECONDS.labels(lane).observe(time.perf_counter() - start)
+            stream = backend.stream(prompt, model, max_tokens=max_tokens)
+            try:
+                full_response = ""
+                async for chunk_text in stream:
+                    if stop_callback and stop_callback():
+                        print("Stream stopped by callback")
+                        break
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    tokens += 1
+                    full_response += chunk_text
+                    yield chunk_text
+            finally:
+                # Release the backend stream (and then the slot) even when the consumer stops early
+                await stream.aclose()
 
     except Exception as e:
-        error_msg = f"Error querying LLM: {e}"
-        yield error_msg
-
-async def extract_recipe(transcript, stop_callback=None):
-    prompt = EXTRACTION_PROMPT.format(transcript=transcript)
-    full_response = ""
-    async for chunk in query_llm_stream(prompt, stop_callback=stop_callback):
-        full_response += chunk
-    
-    yield full_response
+        LLM_ERRORS.labels(model).inc()
+        yield LLMError(f"Error querying LLM: {e}")
+    finally:
+        end = time.perf_counter()
+        LLM_STREAM_SECONDS.labels(model).observe(end - start)
+        if first_token_at is not None:
+            LLM_FIRST_TOKEN_SECONDS.labels(model).observe(first_token_at - start)
+            LLM_TOKENS.labels(model).inc(tokens)
+            if tokens > 1 and end > first_token_at:
+                LLM_TOKENS_PER_SECOND.labels(model).observe((tokens - 1) / (end - first_token_at))
+
+async def extract_recipe(transcript, stop_callback=None, model=DEFAULT_MODEL, backend=None, user=None, on_queue=None):
+    """
+    Extract a recipe from a cleaned transcript as a stream of markdown chunks.
+
+    A transcript that fits in one EXTRACTION_WINDOW_TOKENS window is streamed
+    from a single LLM call. A longer one is split into overlapping windows
+    that are extracted concurrently (at most EXTRACTION_CONCURRENCY at a
+    time), and the merged recipe is yielded once every window is done, so
+    extraction time grows with the number of windows divided by the
+    concurrency rather than with the transcript length. Every call runs in
+    the scheduler's extraction lane on behalf of user.
+    """
+    windows = split_transcript(transcript, EXTRACTION_WINDOW_TOKENS, EXTRACTION_WINDOW_OVERLAP)
+    if len(windows) == 1:
+        prompt = EXTRACTION_PROMPT.format(transcript=transcript)
+        async for chunk in query_llm_stream(prompt, model=model, stop_callback=stop_callback, backend=backend,
+                                            lane='extraction', user=user, on_queue=on_queue):
+            yield chunk
+        return
+
+    print(f"Extracting recipe from {len(windows)} transcript windows")
+    semaphore = asyncio.Semaphore(EXTRACTION_CONCURRENCY)
+
+    async def extract_window(part, window):
+        async with semaphore:
+            if stop_callback and stop_callback():
+                return ''
+            prompt = PARTIAL_EXTRACTION_PROMPT.format(part=part, parts=len(windows), transcript=window)
+            chunks = []
+            async for chunk in query_llm_stream(prompt, model=model, stop_callback=stop_callback, backend=backend,
+                                                lane='extraction', user=user, on_queue=on_queue):
+                if isinstance(chunk, LLMError):
+                    return chunk
+                chunks.append(chunk)
+            return ''.join(chunks)
+
+    partials = await asyncio.gather(*(extract_window(part, window) for part, window in enumerate(windows, 1)))
+    if stop_callback and stop_callback():
+        return
+    for partial in partials:
+        if isinstance(partial, LLMError):
+            yield partial
+            return
+    yield merge_recipes(Recipe.from_markdown(partial) for partial in partials).to_markdown() + "\n"
+
+# Words that tell us which recipe sections a question is about
+INGREDIENT_KEYWORDS = {
+    'ingredient', 'ingredients', 'substitute', 'substitutes', 'substitution', 'replace', 'instead',
+    'vegan', 'vegetarian', 'dairy', 'gluten', 'allergy', 'allergic', 'nut', 'nuts', 'egg', 'eggs',
+    'quantity', 'amount', 'much', 'many', 'grams', 'cups', 'calories', 'nutrition', 'protein',
+    'buy', 'shopping', 'spice', 'spices', 'halve', 'double', 'scale', 'servings', 'serves',
+}
+PROCEDURE_KEYWORDS = {
+    'step', 'steps', 'procedure', 'method', 'long', 'time', 'minutes', 'hours', 'temperature',
+    'oven', 'bake', 'cook', 'fry', 'boil', 'simmer', 'roast', 'grill', 'mix', 'stir', 'knead',
+    'before', 'after', 'next', 'first', 'then', 'until', 'done', 'rest', 'marinate', 'technique',
+    'store', 'storage', 'reheat', 'freeze', 'ahead',
+}
 
 # Recipe ChatBot Class
 class RecipeChatBot:
-    def __init__(self, model="meta-llama/Llama-3.3-70B-Instruct-Turbo-Free"):
+    def __init__(self, model=DEFAULT_MODEL, backend=None):
         self.model = model
+        self.backend = backend or get_backend(model)
         self.recipe_data = None
+        self.recipe = None  # Structured Recipe parsed from recipe_data
+        self.recipe_key = None  # Identifies the extracted recipe in the shared caches
         self.conversation_history = []
+        self.conversation_summary = ""  # Rolling summary of the turns dropped from conversation_history
+        self.prompt_builder = PromptBuilder(GENERAL_PROMPT)
+        self._summarizing = False
+        self._history_lock = threading.Lock()  # Summaries may finish on another runtime loop's thread
 
-    async def fetch_recipe(self, video_url, stop_callback=None):
+    def to_state(self):
+        """
+        Serialisable session state (recipe and conversation) for the session store.
+        """
+        return {
+            'model': self.model,
+            'recipe_data': self.recipe_data,
+            'recipe_key': self.recipe_key,
+            'conversation_history': self.conversation_history,
+            'conversation_summary': self.conversation_summary,
+        }
+
+    @classmethod
+    def from_state(cls, state, backend=None):
+        """
+        Rebuild a chatbot from state saved by to_state().
+        """
+        bot = cls(model=state.get('model') or DEFAULT_MODEL, backend=backend)
+        bot.recipe_data = state.get('recipe_data')
+        bot.recipe_key = state.get('recipe_key')
+        bot.conversation_history = list(state.get('conversation_history') or [])
+        bot.conversation_summary = state.get('conversation_summary') or ""
+        if bot.recipe_data:
+            bot.recipe = Recipe.from_markdown(bot.recipe_data)
+        return bot
+
+    async def _extract_from_video(self, video_url, lang, cache_key, user=None, on_queue=None):
+        """
+        Fetch a video's transcript and stream the extracted recipe, caching it under cache_key when complete
+
+        Raises:
+            TranscriptUnavailable: If the video has no usable transcript
+        """
+        print("Fetching transcript...")
+        transcript_data = await transcript_fetcher.fetch(video_url, lang=lang)
+        transcript_text = transcript_data['full_text']
+
+        if 'error' in transcript_data:
+            raise TranscriptUnavailable(f"Transcript extraction failed: {transcript_data['error']}")
+
+        if not transcript_text or len(transcript_text) < 50:
+            raise TranscriptUnavailable(f"Error: Could not extract sufficient transcript data from the video. Transcript length: {len(transcript_text)}. Please ensure the video has subtitles available.")
+
+        print("Extracting recipe...")
+        full_response = ""
+        failed = False
+        async for chunk in extract_recipe(transcript_text, model=self.model, backend=self.backend, user=user,
+                                          on_queue=on_queue):
+            failed = failed or isinstance(chunk, LLMError)
+            full_response += chunk
+            yield chunk
+        if cache_key and full_response and not failed:
+            recipe_cache.set(cache_key, full_response)
+
+    async def fetch_recipe(self, video_url, stop_callback=None, lang='en', on_section=None, user=None, on_queue=None):
         """
         Extract and process recipe details from a YouTube video.
+
+        The recipe is streamed chunk by chunk as the LLM produces it. If
+        on_section is given it is called with (name, content) as soon as each
+        of the Title, Ingredients and Procedure sections is complete. Callers
+        fetching the same video while it is being extracted share a single
+        transcript fetch and LLM stream, scheduled on behalf of the user who
+        started it; on_queue gets that extraction's queue status.
         """
+        sections = IncrementalRecipeParser()
+
+        def report_sections(closed):
+            if on_section:
+                for name, content in closed:
+                    on_section(name, content)
+
         try:
-            print("Fetching transcript...")
-            transcript_data = get_youtube_subtitles(video_url)
-            transcript_text = transcript_data['full_text']
-
-            if 'error' in transcript_data:
-                error_msg = f"Transcript extraction failed: {transcript_data['error']}"
-                print(error_msg)
-                yield error_msg
-                return
-
-            if not transcript_text or len(transcript_text) < 50:
-                error_msg = f"Error: Could not extract sufficient transcript data from the video. Transcript length: {len(transcript_text)}. Please ensure the video has subtitles available."
-                print(error_msg)
-                yield error_msg
-                return
-
-            print("Extracting recipe...")
+            video_id = extract_video_id(video_url)
+            cache_key = None
+            self.recipe_key = None
+            if video_id:
+                cache_key = make_cache_key(video_id, lang, PROMPT_VERSION, self.backend.output_model(self.model))
+                cached = recipe_cache.get(cache_key)
+                if cached is not None:
+                    print(f"Recipe cache hit for video {video_id} ({recipe_cache.stats()})")
+                    self.recipe_data = cached
+                    self.recipe_key = cache_key
+                    yield cached
+                    report_sections(sections.feed(cached) + sections.close())
+                    self.recipe = sections.recipe
+                    return
+
+            if cache_key is None:
+                chunks = self._extract_from_video(video_url, lang, None, user, on_queue)
+            else:
+                # Everyone asking for this video while it is being extracted follows the same stream
+                chunks = recipe_flights.subscribe(
+                    cache_key, lambda: self._extract_from_video(video_url, lang, cache_key, user, on_queue))
             full_response = ""
-            async for chunk in extract_recipe(transcript_text, stop_callback=stop_callback):
-                if stop_callback and stop_callback():
-                    break
-                full_response += chunk
-                yield chunk
-
+            stopped = False
+            failed = False
+            try:
+                async for chunk in chunks:
+                    if stop_callback and stop_callback():
+                        stopped = True
+                        break
+                    failed = failed or isinstance(chunk, LLMError)
+                    full_response += chunk
+                    yield chunk
+                    report_sections(sections.feed(chunk))
+            finally:
+                # Detach from the shared stream; it keeps running for any other subscriber
+                await chunks.aclose()
+
+            closed = sections.close()
+            if not stopped:
+                report_sections(closed)
             self.recipe_data = full_response
+            self.recipe = sections.recipe
+            if cache_key and full_response and not stopped and not failed:
+                self.recipe_key = cache_key
             print(f"Recipe Summary:\n{self.recipe_data}")  # Print cleaned recipe in log
             print("Recipe extraction completed")
 
+        except TranscriptUnavailable as e:
+            print(e)
+            yield str(e)
         except Exception as e:
             error_msg = f"Error processing video: {str(e)}"
             print(error_msg)
@@ -312,59 +506,150 @@ class RecipeChatBot:
         return f"{introduction}\n\n{self.recipe_data}\n\nFeel free to ask me any questions about the recipe!"
 
 
-    async def ask_question_stream(self, question, stop_callback=None):
+    def recipe_sections(self, question):
+        """
+        Pick the recipe context for a question from the structured recipe,
+        most relevant section first.
+        """
+        if self.recipe is None or self.recipe.is_empty():
+            # Unparseable extraction output: fall back to the raw markdown
+            return [self.recipe_data]
+
+        words = set(re.findall(r"[a-z]+", question.lower()))
+        sections = ['title']
+        if words & INGREDIENT_KEYWORDS:
+            sections.append('ingredients')
+        if words & PROCEDURE_KEYWORDS:
+            sections.append('procedure')
+        if len(sections) == 1:
+            sections = ['title', 'ingredients', 'procedure']
+        return [self.recipe.section_markdown(name) for name in sections]
+
+    async def ask_question_stream(self, question, stop_callback=None, user=None, on_queue=None):
         """
         Asynchronous method to generate a streaming response to the user's question (always uses the general prompt).
+
+        The LLM call runs in the scheduler's chat lane on behalf of user; on_queue gets its queue status.
         """
         if not self.recipe_data:
             yield "Please fetch a recipe first by providing a video URL."
             return
-        
-        # Improved conversation history management
-        history_context = ""
-        if self.conversation_history:
-            # Limit to last 2 turns to prevent token overflow
-            recent_history = self.conversation_history[-2:]
-            history_context = "Recent Conversation:\n"
-            for turn in recent_history:
-                role = "User" if turn["role"] == "user" else "Assistant"
-                # Truncate long responses to prevent token overflow
-                content = turn['content']
-                if len(content) > 300:
-                    content = content[:300] + "..."
-                history_context += f"{role}: {content}\n"
-            history_context += "\n"
-        
-        # Truncate recipe data if it's too long
-        recipe_data = self.recipe_data
-        if len(recipe_data) > 2000:
-            recipe_data = recipe_data[:2000] + "..."
-        
-        # Always use GENERAL_PROMPT
-        prompt = GENERAL_PROMPT.format(
-            recipe_data=recipe_data,
-            user_question=f"{history_context}Current Question: {question}"
+
+        # Answers are shared across sessions, but only when the prompt holds nothing of this session's
+        answer_key = None
+        if self.recipe_key:
+            if is_context_dependent(self.conversation_history, self.conversation_summary):
+                answer_cache.record_bypass()
+            else:
+                answer_key = f"{self.recipe_key}:{ANSWER_PROMPT_VERSION}"
+                cached = answer_cache.get(answer_key, question)
+                if cached is not None:
+                    answer, score = cached
+                    print(f"Answer cache hit (similarity {score:.2f})")
+                    async for chunk in self.replay_answer(question, answer, stop_callback):
+                        yield chunk
+                    return
+
+        # Question first, then recipe sections, then as much recent history as the budget allows
+        prompt, prompt_tokens = self.prompt_builder.build(
+            question,
+            self.recipe_sections(question),
+            self.conversation_history,
+            self.conversation_summary,
+            recipe_key=self.recipe_key
         )
+        print(f"Prompt tokens (approx.): {prompt_tokens}")
         
         full_response = ""
+        failed = False
         try:
-            async for chunk in query_llm_stream(prompt, model=self.model, stop_callback=stop_callback):
+            async for chunk in query_llm_stream(prompt, model=self.model, stop_callback=stop_callback,
+                                                max_tokens=self.prompt_builder.answer_tokens, backend=self.backend,
+                                                user=user, on_queue=on_queue):
+                failed = failed or isinstance(chunk, LLMError)
                 full_response += chunk
                 yield chunk
             
             # Only add to history if we got a successful response
-            if full_response and not full_response.startswith("Error querying LLM"):
-                self.conversation_history.append({"role": "user", "content": question})
-                self.conversation_history.append({"role": "assistant", "content": full_response})
-                
-                # Keep only last 6 turns (3 user + 3 assistant) to prevent   memory buildup
-                if len(self.conversation_history) > 6:
-                    self.conversation_history = self.conversation_history[-6:]
+            if full_response and not failed:
+                self.remember_turn(question, full_response)
+                if answer_key and not (stop_callback and stop_callback()):
+                    answer_cache.set(answer_key, question, full_response)
         
         except Exception as e:
             error_msg = f"Error in conversation: {str(e)}"
             yield error_msg
 
+    async def replay_answer(self, question, answer, stop_callback=None):
+        """
+        Stream a cached answer word by word, like a live LLM response
+        """
+        for chunk in split_tokens(answer):
+            if stop_callback and stop_callback():
+                break
+            yield chunk
+        self.remember_turn(question, answer)
+
+    def remember_turn(self, question, answer):
+        """
+        Add a question/answer pair to the conversation history.
+        """
+        with self._history_lock:
+            self.conversation_history.append({"role": "user", "content": question})
+            self.conversation_history.append({"role": "assistant", "content": answer})
+
+            # Older turns are folded into the summary by summarize_history(); this only bounds memory
+            if len(self.conversation_history) > MAX_HISTORY_ENTRIES:
+                self.conversation_history = self.conversation_history[-MAX_HISTORY_ENTRIES:]
+
+    def needs_summary(self):
+        """True when the history has grown past CONVERSATION_SUMMARY_AFTER entries and no summary is underway"""
+        return (CONVERSATION_SUMMARY and not self._summarizing
+                and len(self.conversation_history) > SUMMARY_AFTER_ENTRIES)
+
+    async def summarize_history(self):
+        """
+        Fold all but the newest CONVERSATION_KEEP_ENTRIES history entries into the rolling summary
+
+        Meant to run in the background once an answer has been delivered.
+        Turns added meanwhile are kept; if the history was reset or trimmed
+        while the summary was being written, the result is discarded.
+
+        Returns:
+            bool: True if the summary and history changed
+        """
+        if not self.needs_summary():
+            return False
+        history = self.conversation_history
+        folded = history[:len(history) - SUMMARY_KEEP_ENTRIES]
+        turns = '\n'.join(truncate_to_tokens(f"{'User' if turn['role'] == 'user' else 'Assistant'}: {turn['content']}",
+                                              SUMMARY_TURN_TOKENS) for turn in folded)
+        title = self.recipe.title if self.recipe is not None and self.recipe.title else "this recipe"
+        prompt = SUMMARY_PROMPT.format(title=title, words=int(SUMMARY_MAX_TOKENS * 0.7),
+                                       summary=self.conversation_summary or "(none yet)", turns=turns)
+        self._summarizing = True
+        start = time.perf_counter()
+        try:
+            chunks = [chunk async for chunk in query_llm_stream(
+                prompt, model=self.model, max_tokens=SUMMARY_MAX_TOKENS, backend=self.backend, lane='background')]
+        finally:
+            self._summarizing = False
+        SUMMARY_SECONDS.observe(time.perf_counter() - start)
+
+        summary = ''.join(chunks).strip()
+        if not summary or any(isinstance(chunk, LLMError) for chunk in chunks):
+            SUMMARIES.labels('failed').inc()
+            return False
+        with self._history_lock:
+            history = self.conversation_history
+            if len(history) < len(folded) or any(kept is not old for kept, old in zip(history, folded)):
+                SUMMARIES.labels('stale').inc()
+                return False
+            self.conversation_summary = truncate_to_tokens(summary, SUMMARY_MAX_TOKENS)
+            self.conversation_history = history[len(folded):]
+        SUMMARIES.labels('updated').inc()
+        return True
+
     def display_conversation(self):
         """
         Display the conversation history.
@@ -378,6 +663,7 @@ class RecipeChatBot:
         Reset conversation history for new chats.
         """
         self.conversation_history = []
+        self.conversation_summary = ""
 
 async def handle_user_question(user_question, stop_callback=None):
     async for chunk in bot.ask_question_stream(user_question, stop_callback=stop_callback):
@@ -388,6 +674,15 @@ async def handle_recipe_genrate(url, stop_callback=None):
         print(chunk,end='',flush=True)
 # Main Script
 if __name__ == "__main__":
+    import sys
+
+    # Batch mode: python recipe_chatbot.py batch urls.txt -o recipes.jsonl
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        # batch_ingest imports recipe_chatbot; hand it this module rather than a second copy
+        sys.modules.setdefault('recipe_chatbot', sys.modules[__name__])
+        from batch_ingest import main as batch_main
+        sys.exit(batch_main(sys.argv[2:]))
+
     bot = RecipeChatBot()
 
     print("Welcome to the Recipe ChatBot!")
@@ -0,0 +1,187 @@
+import re
+from dataclasses import dataclass, field
+
+from recipe_sections import RecipeSectionParser
+
+UNICODE_FRACTIONS = {
+    '¼': 0.25, '½': 0.5, '¾': 0.75, '⅓': 1 / 3, '⅔': 2 / 3,
+    '⅛': 0.125, '⅜': 0.375, '⅝': 0.625, '⅞': 0.875,
+}
+
+UNITS = {
+    'g': 'g', 'gm': 'g', 'gms': 'g', 'gram': 'g', 'grams': 'g',
+    'kg': 'kg', 'kgs': 'kg', 'kilogram': 'kg', 'kilograms': 'kg',
+    'mg': 'mg',
+    'ml': 'ml', 'millilitre': 'ml', 'milliliter': 'ml', 'millilitres': 'ml', 'milliliters': 'ml',
+    'l': 'l', 'litre': 'l', 'liter': 'l', 'litres': 'l', 'liters': 'l',
+    'tsp': 'tsp', 'tsps': 'tsp', 'teaspoon': 'tsp', 'teaspoons': 'tsp',
+    'tbsp': 'tbsp', 'tbsps': 'tbsp', 'tablespoon': 'tbsp', 'tablespoons': 'tbsp',
+    'cup': 'cup', 'cups': 'cup',
+    'oz': 'oz', 'ounce': 'oz', 'ounces': 'oz',
+    'lb': 'lb', 'lbs': 'lb', 'pound': 'lb', 'pounds': 'lb',
+    'pinch': 'pinch', 'pinches': 'pinch', 'dash': 'dash',
+    'clove': 'clove', 'cloves': 'clove',
+    'slice': 'slice', 'slices': 'slice',
+    'piece': 'piece', 'pieces': 'piece',
+    'can': 'can', 'cans': 'can',
+    'bunch': 'bunch', 'sprig': 'sprig', 'sprigs': 'sprig',
+    'inch': 'inch', 'inches': 'inch',
+}
+
+_NUMBER = r'(?:\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?|[¼½¾⅓⅔⅛⅜⅝⅞])'
+_UNIT = '|'.join(sorted((re.escape(unit) for unit in UNITS), key=len, reverse=True))
+
+# "2 cups flour", "1 1/2 tsp salt", "500g chicken", "2-3 cloves garlic"
+LEADING_QUANTITY = re.compile(
+    rf'^(?P<qty>{_NUMBER})(?:\s*(?:-|to)\s*{_NUMBER})?\s*(?:(?P<unit>{_UNIT})\.?\b)?\s*(?:of\s+)?(?P<name>.+)$',
+    re.IGNORECASE
+)
+# "Chicken - 500 g", "Salt: 1 tsp", "Butter (2 tbsp)"
+TRAILING_QUANTITY = re.compile(
+    rf'^(?P<name>.+?)\s*(?:[:\-–(,]\s*)(?P<qty>{_NUMBER})(?:\s*(?:-|to)\s*{_NUMBER})?\s*(?:(?P<unit>{_UNIT})\.?\b)?[^)]*\)?\s*$',
+    re.IGNORECASE
+)
+LIST_MARKER = re.compile(r'^\s*(?:[-*•]|\d+[.)])\s+')
+
+
+def parse_quantity(text):
+    """
+    Convert a quantity token such as "1 1/2", "3/4", "0.5" or "½" to a float
+
+    Returns:
+        float or None: The numeric value, or None if it cannot be parsed
+    """
+    text = text.strip()
+    if text in UNICODE_FRACTIONS:
+        return UNICODE_FRACTIONS[text]
+    try:
+        total = 0.0
+        for part in text.split():
+            if '/' in part:
+                numerator, denominator = part.split('/')
+                total += float(numerator) / float(denominator)
+            else:
+                total += float(part)
+        return total
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+@dataclass(slots=True)
+class Ingredient:
+    name: str
+    quantity: float | None = None
+    unit: str | None = None
+    raw: str = ''
+
+    @classmethod
+    def parse(cls, line):
+        """Parse one ingredient bullet into quantity, unit and name"""
+        raw = LIST_MARKER.sub('', line).strip()
+        for pattern in (LEADING_QUANTITY, TRAILING_QUANTITY):
+            match = pattern.match(raw)
+            if match:
+                unit = match.group('unit')
+                return cls(
+                    name=match.group('name').strip(' :-–,'),
+                    quantity=parse_quantity(match.group('qty')),
+                    unit=UNITS[unit.lower()] if unit else None,
+                    raw=raw,
+                )
+        return cls(name=raw, raw=raw)
+
+
+@dataclass(slots=True)
+class Recipe:
+    title: str = ''
+    ingredients: list = field(default_factory=list)
+    steps: list = field(default_factory=list)
+
+    def is_empty(self):
+        return not (self.title or self.ingredients or self.steps)
+
+    def section_markdown(self, name):
+        """Render a single section back to the EXTRACTION_PROMPT markdown layout"""
+        if name == 'title':
+            return f"**Title**: {self.title}"
+        if name == 'ingredients':
+            return "**Ingredients**:\n" + '\n'.join(f"- {item.raw or item.name}" for item in self.ingredients)
+        if name == 'procedure':
+            return "**Procedure**:\n" + '\n'.join(f"- {step}" for step in self.steps)
+        raise ValueError(f"Unknown recipe section: {name}")
+
+    def to_markdown(self, sections=('title', 'ingredients', 'procedure')):
+        return '\n\n'.join(self.section_markdown(name) for name in sections)
+
+    def to_dict(self):
+        return {
+            'title': self.title,
+            'ingredients': [
+                {'name': item.name, 'quantity': item.quantity, 'unit': item.unit, 'raw': item.raw}
+                for item in self.ingredients
+            ],
+            'steps': list(self.steps),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            title=data.get('title', ''),
+            ingredients=[Ingredient(**item) for item in data.get('ingredients', [])],
+            steps=list(data.get('steps', [])),
+        )
+
+    @classmethod
+    def from_markdown(cls, markdown):
+        parser = IncrementalRecipeParser()
+        parser.feed(markdown)
+        parser.close()
+        return parser.recipe
+
+
+def _list_items(content):
+    items = []
+    for line in content.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if LIST_MARKER.match(line) or not items:
+            items.append(LIST_MARKER.sub('', line).strip())
+        else:
+            # Wrapped continuation of the previous bullet
+            items[-1] = f"{items[-1]} {line}"
+    return items
+
+
+class IncrementalRecipeParser:
+    """
+    Build a Recipe from streamed EXTRACTION_PROMPT output.
+
+    Wraps RecipeSectionParser: feed() and close() return the sections that
+    closed, exactly like the section parser, while filling self.recipe as
+    each section completes.
+    """
+
+    def __init__(self):
+        self._sections = RecipeSectionParser()
+        self.recipe = Recipe()
+
+    def feed(self, chunk):
+        closed = self._sections.feed(chunk)
+        for name, content in closed:
+            self._apply(name, content)
+        return closed
+
+    def close(self):
+        closed = self._sections.close()
+        for name, content in closed:
+            self._apply(name, content)
+        return closed
+
+    def _apply(self, name, content):
+        if name == 'title':
+            self.recipe.title = content.strip().strip('*').strip()
+        elif name == 'ingredients':
+            self.recipe.ingredients = [Ingredient.parse(item) for item in _list_items(content)]
+        elif name == 'procedure':
+            self.recipe.steps = _list_items(content)
@@ -0,0 +1,82 @@
+import re
+
+# Section headings produced by EXTRACTION_PROMPT, tolerating the usual model variations
+# ("**Title**:", "**Title:**", "## Ingredients", "Procedure:")
+SECTION_HEADING = re.compile(
+    r'^\s*(?:#+\s*)?\*{0,2}\s*(title|ingredients|procedure)\s*(?:\*\*\s*:?|:\s*(?:\*\*)?|$)\s*(.*)$',
+    re.IGNORECASE
+)
+
+SECTION_NAMES = ('title', 'ingredients', 'procedure')
+
+
+class RecipeSectionParser:
+    """
+    Incrementally split streamed recipe markdown into its sections.
+
+    feed() takes chunks as they arrive from the LLM and returns the sections
+    that closed because of them as (name, content) tuples. A section closes
+    when the next heading starts; the title closes at the end of its line when
+    the value is inline. close() flushes whatever is still open at the end.
+    """
+
+    def __init__(self):
+        self._partial = ''
+        self._current = None
+        self._lines = []
+        self.sections = {}
+
+    def feed(self, chunk):
+        """
+        Consume a chunk of streamed markdown
+
+        Args:
+            chunk (str): Text produced by the LLM stream
+
+        Returns:
+            list: (name, content) tuples for sections completed by this chunk
+        """
+        closed = []
+        self._partial += chunk
+        if '\n' not in self._partial:
+            return closed
+        *lines, self._partial = self._partial.split('\n')
+        for line in lines:
+            self._consume_line(line, closed)
+        return closed
+
+    def close(self):
+        """
+        Finish parsing at the end of the stream
+
+        Returns:
+            list: (name, content) tuples for sections still open
+        """
+        closed = []
+        if self._partial:
+            self._consume_line(self._partial, closed)
+            self._partial = ''
+        self._close_section(closed)
+        return closed
+
+    def _consume_line(self, line, closed):
+        match = SECTION_HEADING.match(line)
+        if match:
+            self._close_section(closed)
+            self._current = match.group(1).lower()
+            inline = match.group(2).strip()
+            self._lines = [inline] if inline else []
+            if self._current == 'title' and inline:
+                self._close_section(closed)
+            return
+        if self._current is not None:
+            self._lines.append(line)
+
+    def _close_section(self, closed):
+        if self._current is None:
+            return
+        content = '\n'.join(self._lines).strip()
+        self.sections[self._current] = content
+        closed.append((self._current, content))
+        self._current = None
+        self._lines = []
@@ -0,0 +1,199 @@
+import time
+import threading
+from collections import OrderedDict
+
+DEFAULT_GRACE = 60
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+# Rough per-frame overhead of the payload keys, added to the size of its text
+FRAME_OVERHEAD = 64
+
+
+def frame_size(payload):
+    return FRAME_OVERHEAD + sum(len(value) for value in payload.values() if isinstance(value, str))
+
+
+class ReplayBuffer:
+    """
+    Sequence-numbered frames of one streamed message.
+
+    publish() numbers a frame, keeps it and sends it to the buffer's current
+    room while holding the buffer lock, and resume() sends the missed frames
+    to a new room under the same lock, so a resumed client sees every frame
+    exactly once and in order even while generation goes on.
+    """
+
+    def __init__(self, store, message_id, event, session_id, room, stream=None):
+        # stream is the StreamHandle generating into the buffer; it is stopped once abandoned
+        self.store = store
+        self.message_id = message_id
+        self.event = event  # Main event of the stream, e.g. 'response' or 'recipe_stream'
+        self.session_id = session_id
+        self.room = room
+        self.stream = stream
+        self.frames = []  # (seq, event, payload)
+        self.seq = 0
+        self.bytes = 0
+        self.done = False
+        self.evicted = False
+        self.created_at = time.monotonic()
+        self.finished_at = None
+        self.detached_at = None
+        self._lock = threading.Lock()
+
+    def publish(self, event, payload, send):
+        """
+        Number a frame, keep it for replay and send it
+
+        Args:
+            event (str): Socket.IO event name
+            payload (dict): Frame payload; a copy with "seq" added is sent and kept
+            send (callable): send(event, payload, room) delivers the frame
+        """
+        if self.stream is not None and self.abandoned(self.store.grace):
+            self.stream.stop('disconnected')
+        with self._lock:
+            self.seq += 1
+            frame = dict(payload, seq=self.seq)
+            if self.evicted:
+                self.frames = []
+            else:
+                self.frames.append((self.seq, event, frame))
+                self.store._account(self, frame_size(frame))
+            send(event, frame, self.room)
+
+    def finish(self):
+        with self._lock:
+            self.done = True
+            self.finished_at = time.monotonic()
+
+    def detach(self):
+        """Mark the client as gone; the stream keeps generating into the buffer"""
+        with self._lock:
+            self.detached_at = time.monotonic()
+
+    def abandoned(self, grace):
+        """True once the buffer has been detached for longer than grace seconds"""
+        detached_at = self.detached_at
+        return detached_at is not None and time.monotonic() - detached_at > grace
+
+    def resume(self, after_seq, room, send):
+        """
+        Send every frame after after_seq to room and keep streaming there
+
+        An acknowledgement frame with the buffer's state goes first.
+
+        Returns:
+            int: Number of frames replayed, or None if the frames were evicted
+        """
+        with self._lock:
+            if self.evicted:
+                return None
+            self.room = room
+            self.detached_at = None
+            missed = [(event, frame) for seq, event, frame in self.frames if seq > after_seq]
+            send(self.event, {"messageId": self.message_id, "resumed": True, "fromSeq": after_seq + 1,
+                              "lastSeq": self.seq, "done": self.done}, room)
+            for event, frame in missed:
+                send(event, frame, room)
+            self.store._count_resume()
+            return len(missed)
+
+
+class ReplayBuffers:
+    """
+    Replay buffers of recent streams, bounded in time and total bytes.
+
+    A buffer is kept while its stream runs and for grace seconds after it
+    finishes; a running stream whose client has been detached for longer
+    than grace is stopped. When the frames of all buffers exceed max_bytes, finished
+    buffers are dropped oldest first, then the oldest running ones; an
+    evicted running stream still reaches its client live but can no longer
+    be resumed.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, grace=DEFAULT_GRACE):
+        self.max_bytes = max_bytes
+        self.grace = grace
+        self._buffers = OrderedDict()  # message_id -> ReplayBuffer, oldest first
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.evicted = 0
+        self.resumed = 0
+
+    def open(self, message_id, event, session_id, room, stream=None):
+        """Create the buffer for a new stream"""
+        buffer = ReplayBuffer(self, message_id, event, session_id, room, stream)
+        with self._lock:
+            abandoned = self._prune_locked(time.monotonic())
+            self._buffers[message_id] = buffer
+        self._stop(abandoned)
+        return buffer
+
+    def get(self, message_id):
+        with self._lock:
+            abandoned = self._prune_locked(time.monotonic())
+            buffer = self._buffers.get(message_id)
+        self._stop(abandoned)
+        return buffer
+
+    @staticmethod
+    def _stop(buffers):
+        for buffer in buffers:
+            buffer.stream.stop('disconnected')
+
+    def _count_resume(self):
+        with self._lock:
+            self.resumed += 1
+
+    def _account(self, buffer, size):
+        with self._lock:
+            if buffer.evicted:
+                return
+            buffer.bytes += size
+            self.bytes += size
+            if self.bytes > self.max_bytes:
+                self._prune_locked(time.monotonic())
+
+    def _drop_locked(self, buffer):
+        del self._buffers[buffer.message_id]
+        self.bytes -= buffer.bytes
+        buffer.evicted = True
+        buffer.frames = []
+
+    def _prune_locked(self, now):
+        """
+        Drop expired buffers, then evict until under max_bytes (caller holds the lock)
+
+        Returns:
+            list: Running buffers whose client stayed detached past the grace period
+        """
+        abandoned = []
+        for buffer in list(self._buffers.values()):
+            if buffer.done and now - buffer.finished_at > self.grace:
+                self._drop_locked(buffer)
+            elif (not buffer.done and buffer.stream is not None and buffer.detached_at is not None
+                  and now - buffer.detached_at > self.grace):
+                abandoned.append(buffer)
+        if self.bytes <= self.max_bytes:
+            return abandoned
+        finished = [buffer for buffer in self._buffers.values() if buffer.done]
+        running = [buffer for buffer in self._buffers.values() if not buffer.done]
+        for buffer in finished + running:
+            if self.bytes <= self.max_bytes:
+                break
+            self._drop_locked(buffer)
+            self.evicted += 1
+        return abandoned
+
+    def stats(self):
+        with self._lock:
+            return {
+                'buffers': len(self._buffers),
+                'running': sum(1 for buffer in self._buffers.values() if not buffer.done),
+                'detached': sum(1 for buffer in self._buffers.values() if buffer.detached_at is not None),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'evicted': self.evicted,
+                'resumed': self.resumed,
+            }
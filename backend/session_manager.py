@@ -0,0 +1,267 @@
+import time
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_SESSIONS = 1000
+DEFAULT_IDLE_TTL = 30 * 60
+DEFAULT_SWEEP_INTERVAL = 60
+
+
+def state_bytes(state):
+    """Approximate memory held by a session: the text of its recipe and conversation"""
+    size = len(state.get('recipe_data') or '') + len(state.get('conversation_summary') or '')
+    for turn in state.get('conversation_history') or ():
+        size += len(turn.get('content') or '')
+    return size
+
+
+class SessionManager:
+    """
+    Bounded set of resident chatbot sessions in front of a session store.
+
+    Sessions idle for longer than idle_ttl are evicted by a background
+    sweeper, and the least recently used session is evicted whenever more
+    than max_sessions are resident. Sessions for which in_use(session_id)
+    is true (e.g. streaming) or that are pinned (e.g. by background work
+    on the instance) are never evicted; releasing a pinned session is
+    deferred until its last pin is dropped. With spill enabled an
+    evicted session is written to the store first and rehydrated from it
+    on the next get(), so eviction is invisible to the client.
+
+    With a shared store another worker may have saved a session since it
+    was loaded here; get() then reloads it unless it is held, so a client
+    moving between workers never continues from an outdated copy.
+    """
+
+    def __init__(self, store, factory, max_sessions=DEFAULT_MAX_SESSIONS, idle_ttl=DEFAULT_IDLE_TTL, spill=True,
+                 in_use=None):
+        self.store = store
+        self.factory = factory  # factory(state) builds a session; state is None for a new one
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.spill = spill
+        self.in_use = in_use or (lambda session_id: False)
+        # session_id -> [session, last_used, stored version], least recently used first
+        self._sessions = OrderedDict()
+        self._spilling = {}  # session_id -> session being written to the store after eviction
+        self._pins = {}  # session_id -> number of pins held
+        self._release_pending = set()  # Pinned sessions released meanwhile, dropped on their last unpin
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._stop_sweeper = threading.Event()
+        self.created = 0
+        self.rehydrated = 0
+        self.reloaded = 0
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+
+    def get(self, session_id):
+        """
+        Return the resident session, rehydrating it from the store or creating it if needed
+        """
+        with self._lock:
+            self._release_pending.discard(session_id)  # Wanted again
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                entry[1] = time.monotonic()
+                self._sessions.move_to_end(session_id)
+                if not self.store.shared:
+                    return entry[0]
+                resident = entry
+            else:
+                resident = None
+                session = self._spilling.get(session_id)
+
+        if resident is not None:
+            return self._reload_if_stale(session_id, resident)
+
+        rehydrated = True
+        version = None
+        if session is None:
+            # Version first: the state loaded after it is at least that new
+            version = self.store.version(session_id)
+            state = self.store.load(session_id)
+            session = self.factory(state)
+            rehydrated = state is not None
+
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                # Another thread got there first
+                session = entry[0]
+            else:
+                if rehydrated:
+                    self.rehydrated += 1
+                else:
+                    self.created += 1
+                self._sessions[session_id] = [session, time.monotonic(), version]
+            self._sessions.move_to_end(session_id)
+            victims = self._over_capacity()
+        self._evict(victims)
+        return session
+
+    def _reload_if_stale(self, session_id, entry):
+        """Replace a resident session with the store's copy if another worker saved a newer one"""
+        session, version = entry[0], entry[2]
+        stored = self.store.version(session_id)
+        if stored is None or (version is not None and stored <= version):
+            return session
+        with self._lock:
+            if self._held(session_id):
+                return session  # Work in progress here; its save will be the newest
+        state = self.store.load(session_id)
+        if state is None:
+            return session
+        fresh = self.factory(state)
+        with self._lock:
+            if self._sessions.get(session_id) is not entry or entry[0] is not session:
+                return entry[0]
+            entry[0], entry[2] = fresh, stored
+            self.reloaded += 1
+        return fresh
+
+    def peek(self, session_id):
+        """Return the resident session without loading or touching it"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            return entry[0] if entry is not None else None
+
+    def save(self, session_id):
+        """Write a resident session's state through to the store, remembering the version stored"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+        if entry is None:
+            return
+        session = entry[0]
+        version = self.store.save(session_id, session.to_state())
+        with self._lock:
+            if entry[0] is session:
+                entry[2] = version
+
+    def pin(self, session_id):
+        """Keep a resident session in memory until unpin(), so work on the instance is not lost to an eviction"""
+        with self._lock:
+            self._pins[session_id] = self._pins.get(session_id, 0) + 1
+
+    def unpin(self, session_id):
+        """Drop a pin taken with pin(), completing a release() that came in meanwhile"""
+        with self._lock:
+            pins = self._pins.pop(session_id, 0) - 1
+            if pins > 0:
+                self._pins[session_id] = pins
+                return
+            if session_id not in self._release_pending:
+                return
+            self._release_pending.discard(session_id)
+        self.release(session_id)
+
+    def _held(self, session_id):
+        """Whether a session must stay resident (caller holds the lock)"""
+        return session_id in self._pins or self.in_use(session_id)
+
+    def release(self, session_id):
+        """Spill a session and drop it from memory (e.g. after its last client disconnects)"""
+        with self._lock:
+            if session_id in self._pins:
+                self._release_pending.add(session_id)
+                return
+            entry = self._sessions.pop(session_id, None)
+            victims = [(session_id, entry[0])] if entry is not None else []
+        self._evict(victims)
+
+    def _over_capacity(self):
+        """Pop least recently used idle sessions beyond max_sessions (caller holds the lock)"""
+        victims = []
+        excess = len(self._sessions) - self.max_sessions
+        if excess <= 0:
+            return victims
+        for session_id in list(self._sessions):
+            if excess <= 0:
+                break
+            if self._held(session_id):
+                continue
+            victims.append((session_id, self._sessions.pop(session_id)[0]))
+            excess -= 1
+        self.evicted_lru += len(victims)
+        return victims
+
+    def evict_idle(self):
+        """
+        Evict sessions idle for longer than idle_ttl
+
+        Returns:
+            int: Number of sessions evicted
+        """
+        cutoff = time.monotonic() - self.idle_ttl
+        with self._lock:
+            victims = []
+            for session_id, (session, last_used, _) in list(self._sessions.items()):
+                if last_used >= cutoff:
+                    break  # Ordered by last use, so the rest are newer
+                if not self._held(session_id):
+                    victims.append((session_id, self._sessions.pop(session_id)[0]))
+            self.evicted_idle += len(victims)
+        self._evict(victims)
+        return len(victims)
+
+    def _evict(self, victims):
+        if not victims or not self.spill:
+            return
+        with self._lock:
+            for session_id, session in victims:
+                self._spilling[session_id] = session
+        for session_id, session in victims:
+            try:
+                self.store.save(session_id, session.to_state())
+            except Exception as e:
+                print(f"Error spilling session {session_id}: {e}")
+            finally:
+                with self._lock:
+                    if self._spilling.get(session_id) is session:
+                        del self._spilling[session_id]
+
+    def start_sweeper(self, interval=DEFAULT_SWEEP_INTERVAL):
+        """Evict idle sessions every interval seconds from a daemon thread"""
+        def sweep():
+            while not self._stop_sweeper.wait(interval):
+                try:
+                    evicted = self.evict_idle()
+                    if evicted:
+                        print(f"Evicted {evicted} idle sessions: {self.stats()}")
+                except Exception as e:
+                    print(f"Error evicting idle sessions: {e}")
+
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=sweep, name='session-sweeper', daemon=True)
+            self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop_sweeper.set()
+
+    def __contains__(self, session_id):
+        with self._lock:
+            return session_id in self._sessions
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self):
+        """Return resident session and byte gauges (including an in-process store's) plus eviction counters"""
+        with self._lock:
+            sessions = [entry[0] for entry in self._sessions.values()]
+            counters = {
+                'created': self.created,
+                'rehydrated': self.rehydrated,
+                'reloaded': self.reloaded,
+                'evicted_idle': self.evicted_idle,
+                'evicted_lru': self.evicted_lru,
+            }
+        return {
+            'resident_sessions': len(sessions),
+            'resident_bytes': sum(state_bytes(session.to_state()) for session in sessions),
+            'store_bytes': self.store.memory_bytes(),
+            'max_sessions': self.max_sessions,
+            'idle_ttl': self.idle_ttl,
+            **counters,
+        }
@@ -0,0 +1,288 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SESSION_TTL = 24 * 3600
+# Sessions spilled from memory go to disk unless a shared store is configured
+DEFAULT_STORE_URL = 'sqlite:///' + os.path.join(script_dir, 'sessions.sqlite3')
+DEFAULT_PREFIX = 'recipechat:'
+CONTROL_CHANNEL = 'control'
+
+
+class SessionStore:
+    """
+    Interface for storing chatbot session state outside the worker process.
+
+    State is a JSON-serialisable dict (see RecipeChatBot.to_state). Control
+    messages (e.g. stop signals) are broadcast to every worker through
+    publish() and delivered to the callbacks registered with subscribe().
+
+    A shared store is written by several workers, so a session one worker
+    holds in memory can go stale: save() returns the version it stored and
+    version() the latest one, for the worker to compare. Stores used by a
+    single worker do not track versions.
+    """
+
+    shared = False
+
+    def load(self, session_id):
+        raise NotImplementedError
+
+    def save(self, session_id, state):
+        """
+        Store a session's state
+
+        Returns:
+            int or None: Version of the stored state, if the store tracks versions
+        """
+        raise NotImplementedError
+
+    def version(self, session_id):
+        """Latest stored version of a session, or None if it is unknown or versions are not tracked"""
+        return None
+
+    def delete(self, session_id):
+        raise NotImplementedError
+
+    def publish(self, message):
+        raise NotImplementedError
+
+    def subscribe(self, callback):
+        raise NotImplementedError
+
+    def memory_bytes(self):
+        """Bytes of session state this store holds in the process's own memory"""
+        return 0
+
+    def close(self):
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Single-process store: a dict with TTL, and publish() calling local subscribers directly.
+
+    Everything saved stays in this process's memory until it expires, so
+    spilling to it does not bound memory; meant for tests and development.
+    """
+
+    def __init__(self, ttl=DEFAULT_SESSION_TTL):
+        self.ttl = ttl
+        self._sessions = {}  # session_id -> (expires_at, serialised state)
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def load(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] < time.time():
+                del self._sessions[session_id]
+                return None
+            return json.loads(entry[1])
+
+    def save(self, session_id, state):
+        expires_at = time.time() + self.ttl if self.ttl else None
+        data = json.dumps(state)  # Stored serialised so callers never share mutable state
+        with self._lock:
+            self._sessions[session_id] = (expires_at, data)
+            if len(self._sessions) % 1024 == 0:
+                self._purge_expired()
+
+    def _purge_expired(self):
+        now = time.time()
+        for session_id in [key for key, (expires_at, _) in self._sessions.items()
+                           if expires_at is not None and expires_at < now]:
+            del self._sessions[session_id]
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def memory_bytes(self):
+        with self._lock:
+            return sum(len(data) for _, data in self._sessions.values())
+
+    def publish(self, message):
+        for callback in list(self._subscribers):
+            callback(message)
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    Single-node store in a local SQLite file, so idle sessions cost disk
+    rather than memory. Control messages stay in-process, as with
+    MemorySessionStore.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_SESSION_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # Sessions are re-saved after every turn, so trade durability on power loss for cheap commits
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, state TEXT NOT NULL, expires_at REAL)"
+        )
+        self._db.commit()
+
+    def load(self, session_id):
+        with self._lock:
+            row = self._db.execute("SELECT state, expires_at FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return json.loads(row[0])
+
+    def save(self, session_id, state):
+        expires_at = time.time() + self.ttl if self.ttl else None
+        data = json.dumps(state)
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO sessions (id, state, expires_at) VALUES (?, ?, ?)",
+                             (session_id, data, expires_at))
+            self._writes += 1
+            if self._writes % 1024 == 0:
+                self._db.execute("DELETE FROM sessions WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+
+    def delete(self, session_id):
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._db.commit()
+
+    def publish(self, message):
+        for callback in list(self._subscribers):
+            callback(message)
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Store backed by any client speaking the redis-py API (GET/SET/DELETE and
+    PUBLISH/SUBSCRIBE), shared by every worker and node pointing at the same
+    server. Subscribers are served by one background listener thread.
+    Every save increments a per-session version counter kept next to the
+    state.
+    """
+
+    shared = True
+
+    def __init__(self, client, prefix=DEFAULT_PREFIX, ttl=DEFAULT_SESSION_TTL):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.channel = prefix + CONTROL_CHANNEL
+        self._subscribers = []
+        self._pubsub = None
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def _key(self, session_id):
+        return f"{self.prefix}session:{session_id}"
+
+    def _version_key(self, session_id):
+        return f"{self.prefix}version:{session_id}"
+
+    def load(self, session_id):
+        data = self.client.get(self._key(session_id))
+        return json.loads(data) if data is not None else None
+
+    def save(self, session_id, state):
+        ttl = int(self.ttl) if self.ttl else None
+        version = self.client.incr(self._version_key(session_id))
+        if ttl:
+            self.client.expire(self._version_key(session_id), ttl)
+        self.client.set(self._key(session_id), json.dumps(state), ex=ttl)
+        return version
+
+    def version(self, session_id):
+        version = self.client.get(self._version_key(session_id))
+        return int(version) if version is not None else None
+
+    def delete(self, session_id):
+        self.client.delete(self._key(session_id), self._version_key(session_id))
+
+    def publish(self, message):
+        self.client.publish(self.channel, json.dumps(message))
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+            if self._listener is None:
+                self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                self._pubsub.subscribe(self.channel)
+                self._listener = threading.Thread(target=self._listen, name='session-store-listener', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        try:
+            for message in self._pubsub.listen():
+                if message.get('type') != 'message':
+                    continue
+                try:
+                    payload = json.loads(message['data'])
+                except ValueError:
+                    print(f"Ignoring malformed control message: {message['data']!r}")
+                    continue
+                for callback in list(self._subscribers):
+                    try:
+                        callback(payload)
+                    except Exception as e:
+                        print(f"Error handling control message {payload}: {e}")
+        except Exception as e:
+            if self._pubsub is not None:
+                print(f"Session store listener stopped: {e}")
+
+    def close(self):
+        with self._lock:
+            pubsub, self._pubsub = self._pubsub, None
+        if pubsub is not None:
+            pubsub.close()
+
+
+def create_session_store(url=None, ttl=None):
+    """
+    Build the session store described by SESSION_STORE_URL
+
+    sqlite:///file.db keeps sessions in a local file (by default
+    backend/sessions.sqlite3), a redis:// or rediss:// URL shares them
+    between workers and requires the redis package, and "memory" keeps them
+    in this process, where evicted sessions still take up memory.
+
+    Args:
+        url (str): Store URL, defaults to the SESSION_STORE_URL environment variable
+        ttl (float): Seconds an idle session is kept, defaults to SESSION_TTL
+
+    Returns:
+        SessionStore: The configured store
+    """
+    url = url or os.getenv('SESSION_STORE_URL') or DEFAULT_STORE_URL
+    ttl = ttl if ttl is not None else float(os.getenv('SESSION_TTL', DEFAULT_SESSION_TTL))
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        import redis
+        return RedisSessionStore(redis.Redis.from_url(url), prefix=os.getenv('SESSION_STORE_PREFIX', DEFAULT_PREFIX),
+                                 ttl=ttl)
+    if url.startswith('sqlite:///'):
+        # SQLAlchemy-style paths: sqlite:///relative.db, sqlite:////absolute.db
+        return SqliteSessionStore(url[len('sqlite:///'):], ttl=ttl)
+    if url != 'memory':
+        raise ValueError(f"Unsupported SESSION_STORE_URL: {url}")
+    return MemorySessionStore(ttl=ttl)
@@ -0,0 +1,46 @@
+import os
+import hmac
+import uuid
+import hashlib
+
+
+class SessionTokens:
+    """
+    Server-issued session IDs and the signed tokens that prove ownership.
+
+    A session ID is a random UUID chosen by the server and the token is
+    "<session_id>.<HMAC-SHA256 of the ID>", so any worker holding the same
+    secret can check a token without a lookup. A client only ever gets a
+    session through issue(); a session ID it merely claims is worth nothing.
+    """
+
+    def __init__(self, secret=None):
+        if not secret:
+            print("SESSION_SECRET is not set; sessions will not survive a restart or move between workers")
+            secret = os.urandom(32)
+        self._secret = secret.encode('utf-8') if isinstance(secret, str) else secret
+
+    def _sign(self, session_id):
+        return hmac.new(self._secret, session_id.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def issue(self):
+        """
+        Start a new session
+
+        Returns:
+            tuple: (session_id, token)
+        """
+        session_id = uuid.uuid4().hex
+        return session_id, f"{session_id}.{self._sign(session_id)}"
+
+    def verify(self, token):
+        """
+        Check a token from a client
+
+        Returns:
+            str: The session ID the token was issued for, or None if it is missing or forged
+        """
+        if not isinstance(token, str) or '.' not in token:
+            return None
+        session_id, signature = token.rsplit('.', 1)
+        return session_id if hmac.compare_digest(signature, self._sign(session_id)) else None
@@ -0,0 +1,156 @@
+import asyncio
+import threading
+
+
+class Flight:
+    """
+    One shared upstream stream and everything it has produced so far.
+
+    The upstream runs as its own task on the loop of the caller that started
+    it, so it outlives that caller. Subscribers on any loop replay the
+    produced chunks and then follow live; they are woken with
+    call_soon_threadsafe, so no loop ever blocks on another.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self._waiters = set()  # (loop, asyncio.Event) of subscribers waiting for chunks
+        self._lock = threading.Lock()
+        self._task = None
+        self._loop = None
+
+    def _wake(self):
+        for loop, event in self._waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def publish(self, chunk):
+        with self._lock:
+            self.chunks.append(chunk)
+            self._wake()
+
+    def finish(self, error=None):
+        with self._lock:
+            self.done = True
+            self.error = error
+            self._wake()
+
+    def cancel(self):
+        """Cancel the upstream task from any thread"""
+        if self._task is not None:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+
+    async def follow(self):
+        """
+        Yield every chunk produced so far, then new ones as they arrive
+
+        Raises:
+            Exception: Whatever the upstream raised, once its chunks have been replayed
+        """
+        loop = asyncio.get_running_loop()
+        waiter = (loop, asyncio.Event())
+        index = 0
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            while True:
+                with self._lock:
+                    # Cleared under the lock, so a chunk published after the read below always sets it again
+                    waiter[1].clear()
+                    chunks = self.chunks[index:]
+                    done, error = self.done, self.error
+                index += len(chunks)
+                for chunk in chunks:
+                    yield chunk
+                if done:
+                    if error is not None:
+                        raise error
+                    return
+                await waiter[1].wait()
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical streaming jobs.
+
+    The first subscribe() for a key starts producer() and every later one
+    for the same key, while the first is still running, shares its output
+    instead of starting another. A subscriber that stops or is cancelled
+    only detaches itself; the upstream is cancelled once nobody is left
+    listening. Finished flights are forgotten, so results should be cached
+    by the producer for callers that come later.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.started = 0
+        self.joined = 0
+
+    async def _drive(self, flight, producer):
+        try:
+            async for chunk in producer:
+                flight.publish(chunk)
+        except asyncio.CancelledError:
+            flight.finish(asyncio.CancelledError())
+        except Exception as e:
+            flight.finish(e)
+        else:
+            flight.finish()
+        finally:
+            with self._lock:
+                if self._flights.get(flight.key) is flight:
+                    del self._flights[flight.key]
+
+    def _join(self, key, producer_factory):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = Flight(key)
+                self.started += 1
+                leader = True
+            else:
+                self.joined += 1
+                leader = False
+            flight.subscribers += 1
+        if leader:
+            flight._loop = asyncio.get_running_loop()
+            flight._task = flight._loop.create_task(self._drive(flight, producer_factory()))
+        return flight
+
+    def _leave(self, flight):
+        with self._lock:
+            flight.subscribers -= 1
+            abandoned = flight.subscribers == 0 and not flight.done
+            if abandoned and self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+        if abandoned:
+            flight.cancel()
+
+    async def subscribe(self, key, producer_factory):
+        """
+        Stream the output of the flight for key, starting it if none is running
+
+        Args:
+            key (str): Identifies identical jobs
+            producer_factory (callable): Returns the async generator to run when this call starts the flight
+
+        Yields:
+            str: Every chunk the upstream produced, from the first one
+        """
+        flight = self._join(key, producer_factory)
+        try:
+            async for chunk in flight.follow():
+                yield chunk
+        finally:
+            self._leave(flight)
+
+    def stats(self):
+        with self._lock:
+            return {'in_flight': len(self._flights), 'started': self.started, 'joined': self.joined}
@@ -0,0 +1,90 @@
+import os
+import time
+import asyncio
+
+import metrics
+from metrics import Histogram
+
+DEFAULT_FLUSH_INTERVAL = float(os.getenv('STREAM_FLUSH_INTERVAL_MS', 30)) / 1000
+DEFAULT_FLUSH_BYTES = int(os.getenv('STREAM_FLUSH_BYTES', 256))
+# Frame timings are recorded for the first frame of a stream and every Nth after it,
+# which keeps the histograms representative without timing every frame
+FRAME_SAMPLE_EVERY = max(1, int(os.getenv('STREAM_FRAME_SAMPLE_EVERY', 16)))
+
+EMIT_SECONDS = Histogram('socket_emit_seconds', 'Time spent handing one frame to Socket.IO')
+FRAME_DELAY_SECONDS = Histogram('stream_frame_delay_seconds',
+                                'Time the oldest chunk of a frame waited in the coalescing buffer')
+
+
+class ChunkCoalescer:
+    """
+    Coalesce streamed LLM tokens into larger frames before emitting them.
+
+    The first chunk is emitted straight away so time-to-first-token is not
+    delayed. After that, text is buffered and flushed once flush_bytes have
+    accumulated or flush_interval seconds have passed since the buffer started
+    filling, whichever comes first. A timer on the running loop makes sure a
+    quiet stream still flushes within flush_interval. Emit time and buffering
+    delay are recorded for one frame in FRAME_SAMPLE_EVERY.
+    """
+
+    def __init__(self, emit_frame, flush_interval=DEFAULT_FLUSH_INTERVAL, flush_bytes=DEFAULT_FLUSH_BYTES):
+        self.emit_frame = emit_frame
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.frames = 0
+        self._buffer = []
+        self._size = 0
+        self._timer = None
+        self._buffered_at = None
+
+    def add(self, text):
+        """
+        Buffer a chunk of text, flushing if a threshold is reached
+
+        Args:
+            text (str): Chunk produced by the LLM stream
+        """
+        if not text:
+            return
+        if not self._buffer:
+            self._buffered_at = time.perf_counter() if self._sampled() else None
+        self._buffer.append(text)
+        self._size += len(text.encode('utf-8'))
+
+        if self.frames == 0 or self._size >= self.flush_bytes or self.flush_interval <= 0:
+            self.flush()
+        elif self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.flush_interval, self.flush)
+
+    def _sampled(self):
+        """Whether the frame being buffered is one whose timings are recorded"""
+        return metrics.enabled and self.frames % FRAME_SAMPLE_EVERY == 0
+
+    def flush(self):
+        """Emit everything buffered so far as a single frame"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buffer:
+            return
+        text = ''.join(self._buffer)
+        self._buffer = []
+        self._size = 0
+        self.frames += 1
+        if self._buffered_at is None:
+            self.emit_frame(text)
+            return
+        start = time.perf_counter()
+        self.emit_frame(text)
+        EMIT_SECONDS.observe(time.perf_counter() - start)
+        FRAME_DELAY_SECONDS.observe(start - self._buffered_at)
+
+    def close(self):
+        """Drop any buffered text and cancel the pending flush timer"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._buffer = []
+        self._size = 0
@@ -0,0 +1,207 @@
+import threading
+
+
+class StreamHandle:
+    """
+    One active stream. stop() sets stop_event and cancels the attached task,
+    so a stream blocked on the LLM is interrupted without polling; code that
+    only needs a flag can call stopped() (e.g. as a stop_callback).
+    """
+
+    __slots__ = ('client_id', 'user_key', 'session_id', 'message_id', 'stop_event', 'reason', '_future',
+                 '_lock')
+
+    def __init__(self, client_id, user_key, session_id=None, message_id=None):
+        self.client_id = client_id
+        self.user_key = user_key
+        self.session_id = session_id
+        self.message_id = message_id
+        self.stop_event = threading.Event()
+        self.reason = None
+        self._future = None
+        self._lock = threading.Lock()
+
+    def stopped(self):
+        return self.stop_event.is_set()
+
+    def attach(self, future):
+        """Tie the task running this stream to the handle; it is cancelled at once if already stopped"""
+        with self._lock:
+            self._future = future
+            stopped = self.stop_event.is_set()
+        if stopped:
+            future.cancel()
+
+    def stop(self, reason='stopped'):
+        """
+        Stop the stream and cancel its task
+
+        Returns:
+            bool: False if the stream had already been stopped
+        """
+        with self._lock:
+            if self.stop_event.is_set():
+                return False
+            self.reason = reason
+            self.stop_event.set()
+            future = self._future
+        if future is not None:
+            future.cancel()
+        return True
+
+
+class StreamRegistry:
+    """
+    Thread-safe index of active streams by client, user and session.
+
+    Every operation takes one short lock to update the indexes; stopping the
+    affected streams (which cancels their tasks) happens after it is released.
+    Operations return the handles they stopped so callers can notify those
+    clients.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_client = {}   # client_id -> StreamHandle
+        self._by_user = {}     # user_key -> {client_id: StreamHandle}
+        self._by_session = {}  # session_id -> {client_id: StreamHandle}
+        self.registered = 0
+        self.stopped = 0
+
+    @staticmethod
+    def _index_add(index, key, handle):
+        if key is not None:
+            index.setdefault(key, {})[handle.client_id] = handle
+
+    @staticmethod
+    def _index_remove(index, key, handle):
+        streams = index.get(key)
+        if streams is not None and streams.get(handle.client_id) is handle:
+            del streams[handle.client_id]
+            if not streams:
+                del index[key]
+
+    def _unlink(self, handle):
+        """Remove a handle from every index (caller holds the lock)"""
+        if self._by_client.get(handle.client_id) is handle:
+            del self._by_client[handle.client_id]
+        self._index_remove(self._by_user, handle.user_key, handle)
+        self._index_remove(self._by_session, handle.session_id, handle)
+
+    def _stop_all(self, handles, reason):
+        stopped = [handle for handle in handles if handle.stop(reason)]
+        if stopped:
+            with self._lock:
+                self.stopped += len(stopped)
+        return stopped
+
+    def register(self, client_id, user_key, session_id=None, message_id=None, exclusive=True):
+        """
+        Register a new stream for a client
+
+        The client's previous stream is replaced and, when exclusive, every
+        other stream of the same user is stopped, all in one atomic step.
+
+        Returns:
+            tuple: (new StreamHandle, list of other clients' handles that were stopped)
+        """
+        handle = StreamHandle(client_id, user_key, session_id, message_id)
+        with self._lock:
+            previous = self._by_client.get(client_id)
+            displaced = []
+            if previous is not None:
+                self._unlink(previous)
+            if exclusive and user_key in self._by_user:
+                displaced = list(self._by_user[user_key].values())
+                for other in displaced:
+                    self._unlink(other)
+            self._by_client[client_id] = handle
+            self._index_add(self._by_user, user_key, handle)
+            self._index_add(self._by_session, session_id, handle)
+            self.registered += 1
+
+        if previous is not None:
+            self._stop_all([previous], 'replaced')
+        return handle, self._stop_all(displaced, 'new_session')
+
+    def move(self, handle, client_id, user_key):
+        """
+        Hand a running stream over to another client, e.g. one that reconnected
+
+        A stream the new client already had is replaced.
+
+        Returns:
+            bool: False if the stream had already finished or been replaced
+        """
+        with self._lock:
+            if self._by_client.get(handle.client_id) is not handle:
+                return False
+            self._unlink(handle)
+            previous = self._by_client.get(client_id)
+            if previous is not None:
+                self._unlink(previous)
+            handle.client_id = client_id
+            handle.user_key = user_key
+            self._by_client[client_id] = handle
+            self._index_add(self._by_user, user_key, handle)
+            self._index_add(self._by_session, handle.session_id, handle)
+
+        if previous is not None:
+            self._stop_all([previous], 'replaced')
+        return True
+
+    def get(self, client_id):
+        with self._lock:
+            return self._by_client.get(client_id)
+
+    def has_session(self, session_id):
+        with self._lock:
+            return session_id in self._by_session
+
+    def is_current(self, handle):
+        with self._lock:
+            return self._by_client.get(handle.client_id) is handle
+
+    def finish(self, handle):
+        """Drop a stream that has ended, unless a newer stream already replaced it"""
+        with self._lock:
+            self._unlink(handle)
+
+    def stop_client(self, client_id, reason='stopped'):
+        """
+        Stop and remove a client's stream
+
+        Returns:
+            StreamHandle: The stopped stream, or None if the client had none running
+        """
+        with self._lock:
+            handle = self._by_client.get(client_id)
+            if handle is None:
+                return None
+            self._unlink(handle)
+        return handle if self._stop_all([handle], reason) else None
+
+    def _stop_group(self, index, key, except_client, reason):
+        with self._lock:
+            handles = [handle for client_id, handle in index.get(key, {}).items() if client_id != except_client]
+            for handle in handles:
+                self._unlink(handle)
+        return self._stop_all(handles, reason)
+
+    def stop_user(self, user_key, except_client=None, reason='new_session'):
+        """Stop every stream of a user except except_client's; returns the stopped handles"""
+        return self._stop_group(self._by_user, user_key, except_client, reason)
+
+    def stop_session(self, session_id, except_client=None, reason='stopped'):
+        """Stop every stream of a session except except_client's; returns the stopped handles"""
+        return self._stop_group(self._by_session, session_id, except_client, reason)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'active': len(self._by_client),
+                'users': len(self._by_user),
+                'sessions': len(self._by_session),
+                'registered': self.registered,
+                'stopped': self.stopped,
+            }
@@ -0,0 +1,140 @@
+import asyncio
+import itertools
+import threading
+
+
+class RuntimeBusyError(Exception):
+    """Raised when the runtime already holds as many generations as it can queue"""
+
+
+class StreamRuntime:
+    """
+    Long-lived asyncio runtime shared by all Socket.IO handlers.
+
+    A fixed number of event loops run in daemon threads. Handlers submit
+    coroutines with submit(); at most max_concurrent of them run at once and
+    up to max_pending more wait for a slot. Anything beyond that is rejected
+    with RuntimeBusyError so callers can push back on the client.
+    """
+
+    def __init__(self, loops=1, max_concurrent=32, max_pending=128):
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._jobs = {}  # client_id -> concurrent.futures.Future
+        self._outstanding = 0
+        self._running = 0
+        self._loops = []
+        self._threads = []
+        self._semaphores = {}
+
+        # Split the concurrency cap across loops so no cross-loop locking is needed
+        per_loop = max(1, -(-max_concurrent // loops))
+        for index in range(loops):
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=self._run_loop, args=(loop,),
+                                      name=f"stream-runtime-{index}", daemon=True)
+            thread.start()
+            self._loops.append(loop)
+            self._threads.append(thread)
+            self._semaphores[loop] = asyncio.Semaphore(per_loop)
+        self._next_loop = itertools.cycle(self._loops)
+
+    @staticmethod
+    def _run_loop(loop):
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    async def _guarded(self, loop, coro):
+        semaphore = self._semaphores[loop]
+        try:
+            async with semaphore:
+                with self._lock:
+                    self._running += 1
+                try:
+                    return await coro
+                finally:
+                    with self._lock:
+                        self._running -= 1
+        finally:
+            # Closes the coroutine if it was cancelled before it got a slot
+            coro.close()
+
+    def submit(self, client_id, coro):
+        """
+        Schedule a coroutine on one of the runtime loops
+
+        Args:
+            client_id (str): Owner of the job, used by cancel()
+            coro (coroutine): The coroutine to run
+
+        Returns:
+            concurrent.futures.Future: Future of the scheduled task; cancelling
+            it cancels the task on its owning loop
+
+        Raises:
+            RuntimeBusyError: If the running and pending caps are both reached
+        """
+        with self._lock:
+            if self._outstanding >= self.max_concurrent + self.max_pending:
+                coro.close()
+                raise RuntimeBusyError("Too many concurrent generations")
+            self._outstanding += 1
+            loop = next(self._next_loop)
+
+        future = asyncio.run_coroutine_threadsafe(self._guarded(loop, coro), loop)
+        with self._lock:
+            self._jobs[client_id] = future
+
+        def _done(fut):
+            with self._lock:
+                self._outstanding -= 1
+                if self._jobs.get(client_id) is fut:
+                    del self._jobs[client_id]
+
+        future.add_done_callback(_done)
+        return future
+
+    def run_on_every_loop(self, factory):
+        """
+        Run factory() on each loop, outside the generation caps (e.g. to warm per-loop connection pools)
+
+        Returns:
+            list: concurrent.futures.Future per loop
+        """
+        return [asyncio.run_coroutine_threadsafe(factory(), loop) for loop in self._loops]
+
+    def cancel(self, client_id):
+        """
+        Cancel the job owned by a client, if any
+
+        Returns:
+            bool: True if a job was found and cancellation was requested
+        """
+        with self._lock:
+            future = self._jobs.get(client_id)
+        if future is None:
+            return False
+        return future.cancel()
+
+    def stats(self):
+        """Return the number of loops and the running/pending job counts"""
+        with self._lock:
+            return {
+                'loops': len(self._loops),
+                'running': self._running,
+                'pending': self._outstanding - self._running,
+                'max_concurrent': self.max_concurrent,
+                'max_pending': self.max_pending,
+            }
+
+    def shutdown(self):
+        """Cancel outstanding jobs and stop every loop"""
+        with self._lock:
+            futures = list(self._jobs.values())
+        for future in futures:
+            future.cancel()
+        for loop in self._loops:
+            loop.call_soon_threadsafe(loop.stop)
+        for thread in self._threads:
+            thread.join(timeout=5)
@@ -0,0 +1,302 @@
+import re
+import time
+import random
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import Histogram
+
+# Preferred transcript languages after the requested one
+DEFAULT_LANGUAGE_PRIORITY = ['en', 'hi']
+MIN_TRANSCRIPT_LENGTH = 10
+
+TRANSCRIPT_FETCH_SECONDS = Histogram(
+    'transcript_fetch_seconds', 'Transcript fetch latency by strategy and number of attempts',
+    ['strategy', 'attempts']
+)
+
+# Captions for non-speech audio, e.g. "[Music]" or "[Applause]"; they carry nothing for the recipe
+FILLER_PATTERN = (r'\[\s*(?:music(?: playing)?|(?:upbeat|background|soft) music|applause|laughter|laughs|'
+                  r'cheering|silence|inaudible|(?:background )?noise|sound effects?|no audio|foreign)\s*\]|[♪♫]+')
+# Caption timing left in some transcript dumps
+TIMING_PATTERN = r'\d+:\d+:\d+\.\d+ --> \d+:\d+:\d+\.\d+|"?tStartMs"?:\d+,"?dDurationMs"?:\d+'
+
+_NOISE = re.compile(f'{FILLER_PATTERN}|{TIMING_PATTERN}', re.IGNORECASE)
+_TIMING = re.compile(TIMING_PATTERN)
+# Characters from JSON-like syntax, deleted outright
+_STRIP_CHARS = str.maketrans('', '', '{}[]"')
+
+
+def _segment_text(item):
+    """Text of one transcript segment: a dict from to_raw_data(), a snippet object or a string"""
+    if isinstance(item, str):
+        return item
+    if isinstance(item, dict):
+        return item.get('text')
+    return getattr(item, 'text', None)
+
+
+def iter_clean_segments(segments, drop_fillers=True):
+    """
+    Clean transcript segments one at a time
+
+    Each segment is scanned for fillers and timing markers, stripped of
+    JSON-like characters and whitespace-normalized on its own, so a long
+    transcript is never copied as a whole and segments can be consumed as
+    they arrive.
+
+    Args:
+        segments (iterable): Segments as dicts with a 'text' key, objects with a text attribute, or strings
+        drop_fillers (bool): Remove non-speech captions such as "[Music]"
+
+    Yields:
+        str: Cleaned, non-empty segment text
+    """
+    noise = _NOISE if drop_fillers else _TIMING
+    for item in segments:
+        text = _segment_text(item)
+        if not text:
+            continue
+        # Most segments contain no markers at all, so skip the regex unless one may be present
+        if '[' in text or '♪' in text or '♫' in text or '-->' in text or 'tStartMs' in text:
+            text = noise.sub(' ', text)
+        text = ' '.join(text.translate(_STRIP_CHARS).split())
+        if text:
+            yield text
+
+
+def clean_subtitle_text(subtitle_data, drop_fillers=True):
+    """
+    Thoroughly clean and format subtitle text
+    
+    Args:
+        subtitle_data (iterable or str): Subtitle data from youtube-transcript-api (a FetchedTranscript or
+            its raw list of dicts), or plain text
+        drop_fillers (bool): Remove non-speech captions such as "[Music]"
+    
+    Returns:
+        str: Cleaned, formatted subtitle text
+    """
+    if isinstance(subtitle_data, str):
+        segments = [subtitle_data]
+    elif isinstance(subtitle_data, dict) or not hasattr(subtitle_data, '__iter__'):
+        # Fallback for other formats
+        segments = [str(subtitle_data)]
+    else:
+        segments = subtitle_data
+    return ' '.join(iter_clean_segments(segments, drop_fillers))
+
+def extract_video_id(url):
+    """
+    Extract the video ID from different YouTube URL formats
+
+    Args:
+        url (str): YouTube video URL
+
+    Returns:
+        str or None: The video ID, or None if the URL is not recognised
+    """
+    video_id = None
+    if "v=" in url:
+        video_id = url.split("v=")[1].split("&")[0]
+    elif "youtu.be/" in url:
+        video_id = url.split("youtu.be/")[1].split("?")[0]
+    elif "embed/" in url:
+        video_id = url.split("embed/")[1].split("?")[0]
+    return video_id or None
+
+class AsyncTranscriptFetcher:
+    """
+    Fetch and clean YouTube transcripts without blocking the event loop.
+
+    The transcript list is requested once per attempt and each candidate
+    transcript is fetched directly from that list. Blocking provider calls
+    run on a bounded thread pool, the manual and auto-generated lookups race
+    each other, and retries back off with asyncio.sleep.
+
+    provider is any object with a list(video_id) method returning a
+    youtube-transcript-api style TranscriptList; by default a
+    YouTubeTranscriptApi instance is created per worker thread.
+    """
+
+    def __init__(self, provider=None, max_workers=4, retry_count=3, backoff_factor=1):
+        self.provider = provider
+        self.retry_count = retry_count
+        self.backoff_factor = backoff_factor
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='transcripts')
+        self._local = threading.local()
+
+    def _list_transcripts(self, video_id):
+        provider = self.provider
+        if provider is None:
+            # YouTubeTranscriptApi holds a requests.Session, so keep one per thread
+            provider = getattr(self._local, 'provider', None)
+            if provider is None:
+                from youtube_transcript_api import YouTubeTranscriptApi
+                provider = self._local.provider = YouTubeTranscriptApi()
+        return provider.list(video_id)
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def _lookup(self, find, priority):
+        """Find a transcript with the given finder and fetch it; returns (transcript, text) or None"""
+        try:
+            transcript = find(priority)
+        except Exception:
+            return None
+        try:
+            fetched = await self._run(transcript.fetch)
+        except Exception as e:
+            print(f"Error fetching {transcript.language_code} transcript: {e}")
+            return None
+        # FetchedTranscript iterates its snippets, so they are cleaned without building to_raw_data() dicts
+        full_text = clean_subtitle_text(fetched)
+        if full_text and len(full_text) > MIN_TRANSCRIPT_LENGTH:
+            return transcript, full_text
+        return None
+
+    async def _fetch_once(self, video_id, priority):
+        transcript_list = await self._run(self._list_transcripts, video_id)
+
+        # 1 & 2. Race manual and auto-generated transcripts, preferring manual
+        manual = asyncio.ensure_future(self._lookup(transcript_list.find_manually_created_transcript, priority))
+        auto = asyncio.ensure_future(self._lookup(transcript_list.find_generated_transcript, priority))
+        try:
+            result = await manual
+            if result:
+                return self._result(result, 'manual')
+            result = await auto
+            if result:
+                return self._result(result, 'auto-generated')
+        finally:
+            manual.cancel()
+            auto.cancel()
+
+        # 3. Try any transcript the video has
+        available = list(transcript_list)
+        result = await self._lookup(transcript_list.find_transcript, [tr.language_code for tr in available])
+        if result:
+            return self._result(result, 'fallback-any-transcript')
+
+        available_languages = [(tr.language_code, 'auto' if tr.is_generated else 'manual') for tr in available]
+        raise Exception(f"Could not fetch transcript. Available: {available_languages}")
+
+    @staticmethod
+    def _result(result, kind):
+        transcript, full_text = result
+        return {
+            'full_text': full_text,
+            'languages': [transcript.language_code],
+            'type': kind
+        }
+
+    async def fetch(self, url, lang='en', retry_count=None, backoff_factor=None):
+        """
+        Fetch YouTube subtitles as a clean, formatted string
+
+        Args:
+            url (str): YouTube video URL
+            lang (str): Preferred language code (default: 'en')
+            retry_count (int): Number of attempts (default: the fetcher's retry_count)
+            backoff_factor (int): Exponential backoff factor (default: the fetcher's backoff_factor)
+
+        Returns:
+            dict: full_text, languages and type, or an 'error' key on failure
+        """
+        retry_count = self.retry_count if retry_count is None else retry_count
+        backoff_factor = self.backoff_factor if backoff_factor is None else backoff_factor
+        priority = [lang] + [code for code in DEFAULT_LANGUAGE_PRIORITY if code != lang]
+
+        start = time.perf_counter()
+        attempt = 0
+        delay = 1
+        while True:
+            try:
+                video_id = extract_video_id(url)
+                if not video_id:
+                    raise ValueError("Could not extract video ID from URL")
+                result = await self._fetch_once(video_id, priority)
+                TRANSCRIPT_FETCH_SECONDS.labels(result['type'], attempt + 1).observe(time.perf_counter() - start)
+                return result
+            except Exception as e:
+                attempt += 1
+                if attempt >= retry_count:
+                    TRANSCRIPT_FETCH_SECONDS.labels('error', attempt).observe(time.perf_counter() - start)
+                    return {
+                        'full_text': '',
+                        'languages': [],
+                        'error': str(e)
+                    }
+                delay *= backoff_factor
+                delay_with_jitter = delay * (1 + random.uniform(0, 0.1))
+                print(f"Error fetching subtitles: {e}. Retrying in {delay_with_jitter} seconds...")
+                await asyncio.sleep(delay_with_jitter)
+
+
+class StaticTranscript:
+    """Transcript entry served by StaticTranscriptProvider"""
+
+    def __init__(self, language_code, segments, is_generated=False, delay=0.0):
+        self.language_code = language_code
+        self.is_generated = is_generated
+        self._segments = segments
+        self._delay = delay
+
+    def fetch(self):
+        if self._delay:
+            threading.Event().wait(self._delay)
+        return [{'text': text} for text in self._segments]
+
+
+class StaticTranscriptList:
+    """Minimal stand-in for youtube-transcript-api's TranscriptList"""
+
+    def __init__(self, transcripts):
+        self._transcripts = transcripts
+
+    def __iter__(self):
+        return iter(self._transcripts)
+
+    def _find(self, language_codes, candidates):
+        for code in language_codes:
+            for transcript in candidates:
+                if transcript.language_code == code:
+                    return transcript
+        raise LookupError(f"No transcript found for {list(language_codes)}")
+
+    def find_transcript(self, language_codes):
+        manual = [tr for tr in self._transcripts if not tr.is_generated]
+        generated = [tr for tr in self._transcripts if tr.is_generated]
+        return self._find(language_codes, manual + generated)
+
+    def find_manually_created_transcript(self, language_codes):
+        return self._find(language_codes, [tr for tr in self._transcripts if not tr.is_generated])
+
+    def find_generated_transcript(self, language_codes):
+        return self._find(language_codes, [tr for tr in self._transcripts if tr.is_generated])
+
+
+class StaticTranscriptProvider:
+    """
+    Local transcript provider for tests and benchmarks.
+
+    transcripts maps video IDs to a list of StaticTranscript objects; unknown
+    IDs raise like a video without subtitles. delay simulates network latency
+    on list() calls.
+    """
+
+    def __init__(self, transcripts=None, delay=0.0):
+        self.transcripts = transcripts or {}
+        self.delay = delay
+        self.list_calls = 0
+
+    def list(self, video_id):
+        self.list_calls += 1
+        if self.delay:
+            threading.Event().wait(self.delay)
+        if video_id not in self.transcripts:
+            raise LookupError(f"No transcripts for video {video_id}")
+        return StaticTranscriptList(self.transcripts[video_id])
@@ -0,0 +1,115 @@
+"""
+Single-call versus map-reduce recipe extraction on long transcripts.
+
+Uses a stub model whose latency grows with the prompt (prefill at
+--prefill-tps) and the answer (decode at --decode-tps), and which answers
+each prompt with the ingredients and steps mentioned in its transcript.
+Synthetic transcripts mention one ingredient and one step per minute of
+video. For each length the whole transcript is extracted in one call (as
+before, capped at max_tokens=1500) and then map-reduced with several
+concurrency caps; the report shows wall time, windows, and how many of the
+expected ingredients and steps survived.
+
+    python benchmarks/bench_chunked_extraction.py --minutes 30 120 240 --concurrency 1 4 8
+"""
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+os.environ.setdefault('RECIPE_CACHE_PATH', '')
+
+import recipe_chatbot
+from recipe_model import Recipe
+from llm_backends import StubBackend
+from prompt_builder import count_tokens
+
+VERBS = ['stir', 'fold', 'whisk', 'simmer', 'roast', 'toast', 'grate', 'chop', 'knead', 'blanch', 'sear', 'glaze']
+FILLER = ("okay so now we're going to keep going here and honestly this is my favourite part "
+          "you can see it's starting to smell really good in the kitchen right now ")
+
+INGREDIENT = re.compile(r'add (\d+) grams of (spice\d+)')
+STEP = re.compile(r'now (\w+) the (spice\d+) for (\d+) minutes')
+
+
+def synthetic_transcript(minutes):
+    parts = []
+    for minute in range(minutes):
+        verb = VERBS[minute % len(VERBS)]
+        parts.append(f"{FILLER * 6}add {minute + 1} grams of spice{minute} and "
+                     f"now {verb} the spice{minute} for {minute % 9 + 1} minutes ")
+    return ''.join(parts)
+
+
+class PrefillStubBackend(StubBackend):
+    """Stub whose first token waits for the prompt to be 'read' and whose answer lists what the prompt mentions"""
+
+    def __init__(self, prefill_tps, decode_tps):
+        super().__init__(responses=self.recipe_for, tokens_per_second=decode_tps, first_token_delay=0)
+        self.prefill_tps = prefill_tps
+
+    @staticmethod
+    def recipe_for(prompt):
+        transcript = prompt.split("Recipe transcript:", 1)[-1]
+        ingredients = '\n'.join(f"- {qty} g {name}" for qty, name in INGREDIENT.findall(transcript))
+        steps = '\n'.join(f"- {verb.capitalize()} the {name} for {mins} minutes."
+                          for verb, name, mins in STEP.findall(transcript))
+        return f"**Title**: Spice Medley\n\n**Ingredients**:\n{ingredients}\n\n**Procedure**:\n{steps}\n"
+
+    async def stream(self, prompt, model, max_tokens=1500):
+        await asyncio.sleep(count_tokens(prompt) / self.prefill_tps)
+        async for token in super().stream(prompt, model, max_tokens):
+            yield token
+
+
+async def extract(transcript, backend):
+    markdown = ''.join([chunk async for chunk in recipe_chatbot.extract_recipe(transcript, model='stub',
+                                                                               backend=backend)])
+    return Recipe.from_markdown(markdown)
+
+
+def run(transcript, minutes, backend, window_tokens, concurrency):
+    recipe_chatbot.EXTRACTION_WINDOW_TOKENS = window_tokens
+    recipe_chatbot.EXTRACTION_CONCURRENCY = concurrency
+    calls = backend.calls
+    start = time.perf_counter()
+    recipe = asyncio.run(extract(transcript, backend))
+    elapsed = time.perf_counter() - start
+    return {
+        'seconds': round(elapsed, 2),
+        'llm_calls': backend.calls - calls,
+        'ingredients': f"{len(recipe.ingredients)}/{minutes}",
+        'steps': f"{len(recipe.steps)}/{minutes}",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=int, nargs='+', default=[30, 120, 240])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--window-tokens', type=int, default=6000)
+    parser.add_argument('--prefill-tps', type=float, default=20000)
+    parser.add_argument('--decode-tps', type=float, default=400)
+    args = parser.parse_args()
+
+    backend = PrefillStubBackend(args.prefill_tps, args.decode_tps)
+    results = []
+    for minutes in args.minutes:
+        transcript = synthetic_transcript(minutes)
+        result = {
+            'minutes': minutes,
+            'transcript_tokens': count_tokens(transcript),
+            'single_call': run(transcript, minutes, backend, 10 ** 9, 1),
+        }
+        for concurrency in args.concurrency:
+            result[f'map_reduce_x{concurrency}'] = run(transcript, minutes, backend, args.window_tokens, concurrency)
+        results.append(result)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Cold start of the backend: import cost and time until the first socket is accepted.
+
+Each repeat runs a fresh interpreter. `python -X importtime -c "import app"`
+gives the cumulative import time of app and its heaviest imports, and a
+second interpreter starts the Socket.IO server and is polled until
+/metrics answers. Medians are reported as JSON.
+
+    python benchmarks/bench_cold_start.py --repeats 5 --history benchmarks/cold_start_history.jsonl
+
+--history appends the result with a timestamp and the current git commit,
+so cold start can be tracked over time; --baseline compares with an
+earlier --output file and exits with status 1 on a regression beyond
+--tolerance percent.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+SERVE = ("import sys, app; app.socketio.run(app.app, host='127.0.0.1', port=int(sys.argv[1]), "
+         "log_output=False, allow_unsafe_werkzeug=True)")
+
+
+def child_env(directory):
+    return dict(os.environ,
+                RECIPE_CACHE_PATH=os.path.join(directory, 'recipe_cache.sqlite3'),
+                SESSION_STORE_URL='memory',
+                PYTHONDONTWRITEBYTECODE='1')
+
+
+def parse_importtime(stderr):
+    """
+    Parse -X importtime output
+
+    Returns:
+        dict: module -> (self microseconds, cumulative microseconds, nesting depth)
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def measure_imports(env):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    return parse_importtime(result.stderr)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def measure_ready(env, timeout=30):
+    """Seconds from spawning the server until /metrics answers"""
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', SERVE, str(port)], cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with socket.create_connection(('127.0.0.1', port), timeout=1) as sock:
+                    sock.sendall(b"GET /metrics HTTP/1.0\r\nHost: localhost\r\n\r\n")
+                    if sock.recv(12).startswith(b'HTTP/1.'):
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError("Server did not become ready")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help="Heaviest imports to list")
+    parser.add_argument('--output', help="Also write the JSON result to this file")
+    parser.add_argument('--history', help="Append the result as one JSON line to this file")
+    parser.add_argument('--baseline', help="JSON result of an earlier run to compare with")
+    parser.add_argument('--tolerance', type=float, default=20.0, help="Allowed regression in percent")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = child_env(directory)
+        runs = [measure_imports(env) for _ in range(args.repeats)]
+        ready = [measure_ready(env) for _ in range(args.repeats)]
+
+    def median_us(name):
+        return statistics.median(run.get(name, (0, 0, 0))[1] for run in runs)
+
+    # Direct imports of app and of the backend modules it pulls in, heaviest first
+    local = {name[:-3] for name in os.listdir(BACKEND_DIR) if name.endswith('.py')}
+    candidates = {name for run in runs for name, (_, _, depth) in run.items()
+                  if name != 'app' and (depth == 1 or (name.split('.')[0] in local and depth <= 2))}
+    heaviest = sorted(candidates, key=median_us, reverse=True)[:args.top]
+
+    result = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'python': sys.version.split()[0],
+        'repeats': args.repeats,
+        'import_app_ms': round(median_us('app') / 1000, 1),
+        'time_to_ready_ms': round(statistics.median(ready) * 1000, 1),
+        'heaviest_imports_ms': {name: round(median_us(name) / 1000, 1) for name in heaviest},
+    }
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = [f"{key}: {baseline[key]} ms -> {result[key]} ms"
+                       for key in ('import_app_ms', 'time_to_ready_ms')
+                       if baseline.get(key) and result[key] > baseline[key] * (1 + args.tolerance / 100)]
+        result['regressions'] = regressions
+        status = 1 if regressions else 0
+
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    if args.history:
+        with open(args.history, 'a') as f:
+            f.write(json.dumps(result) + '\n')
+    sys.exit(status)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Concurrent LLM streams per process against a local fake streaming server.
+
+Runs N query_llm_stream generators on a single shared event loop and reports
+wall time, completed streams per second and the peak number of client-side
+threads.
+
+    python benchmarks/bench_concurrent_streams.py --streams 10 50 200
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from fake_llm_server import FakeLLMServer
+
+
+def client_threads():
+    """Threads owned by the client side (the fake server's handler threads are excluded)"""
+    return sum(1 for t in threading.enumerate() if 'process_request' not in t.name)
+
+
+async def run_streams(query_llm_stream, pool, count):
+    from recipe_chatbot import LLMError
+
+    peak_threads = client_threads()
+
+    async def one():
+        nonlocal peak_threads
+        tokens = 0
+        async for chunk in query_llm_stream("benchmark prompt", model="fake-model"):
+            if isinstance(chunk, LLMError):
+                raise RuntimeError(chunk)
+            tokens += 1
+            peak_threads = max(peak_threads, client_threads())
+        return tokens
+
+    start = time.perf_counter()
+    try:
+        results = await asyncio.gather(*(one() for _ in range(count)))
+        elapsed = time.perf_counter() - start
+    finally:
+        # The pool keeps one HTTP session per event loop; close this run's before its loop goes away
+        await pool.aclose()
+    return {
+        'streams': count,
+        'tokens': sum(results),
+        'seconds': round(elapsed, 3),
+        'streams_per_second': round(count / elapsed, 2),
+        'peak_threads': peak_threads,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--streams', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--tokens', type=int, default=50)
+    parser.add_argument('--token-delay', type=float, default=0.01)
+    parser.add_argument('--first-token-delay', type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(tokens=args.tokens, token_delay=args.token_delay,
+                           first_token_delay=args.first_token_delay).start()
+    os.environ['TOGETHER_API_KEY'] = os.environ.get('TOGETHER_API_KEY', 'benchmark')
+    os.environ['TOGETHER_BASE_URL'] = server.base_url
+
+    from recipe_chatbot import query_llm_stream
+    from llm_pool import get_pool
+
+    try:
+        results = [asyncio.run(run_streams(query_llm_stream, get_pool(), count)) for count in args.streams]
+    finally:
+        server.stop()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
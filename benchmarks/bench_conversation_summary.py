@@ -0,0 +1,137 @@
+"""
+Prompt size and context retention over long conversations, with and without rolling summaries.
+
+Plays a --turns question conversation against one RecipeChatBot on a stub
+backend. The first question states a fact ("I'm allergic to garlic")
+that the last question relies on. As the app does, a summary is started
+in the background after each answer once the history is long enough. The
+stub summarizer keeps the user's statements, so the report shows whether
+the fact still reaches the final prompt. The report also shows answer
+prompt tokens early and late in the conversation, time to first token,
+and the summary calls made.
+
+    python benchmarks/bench_conversation_summary.py --turns 40
+"""
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+os.environ.setdefault('RECIPE_CACHE_PATH', '')
+
+import recipe_chatbot
+from recipe_chatbot import RecipeChatBot
+from recipe_model import Recipe
+from llm_backends import STUB_RECIPE, StubBackend
+from prompt_builder import count_tokens
+
+FACT = "I'm allergic to garlic, so please keep that in mind"
+QUESTIONS = [
+    "How long should the spaghetti boil for al dente?",
+    "Can I use fresh tomatoes instead of canned ones?",
+    "What pan works best for the sauce?",
+    "How much salt goes into the pasta water?",
+    "Could I add chilli flakes, and when?",
+    "How do I stop the sauce from splattering?",
+    "Can I make the sauce a day ahead?",
+    "What wine would go with this?",
+]
+ANSWER = ("Cook it in plenty of well salted water and taste a strand a minute before the packet time; "
+          "it should still have a slight bite in the centre. ") * 4
+
+
+def stub_response(prompt):
+    if "Updated summary:" in prompt:
+        # Keep the user's own statements, like a real summarizer would keep preferences and constraints
+        previous = prompt.split("Summary so far:\n", 1)[1].split("\n\nConversation to add:", 1)[0]
+        statements = re.findall(r"^User: (.*?)(?:[.?!]|$)", prompt, re.M)
+        kept = [] if previous == "(none yet)" else [previous]
+        kept += [f"The user said: {statement}." for statement in statements if statement.startswith("I'm")]
+        kept.append(f"Discussed {len(statements)} more questions about the recipe.")
+        return ' '.join(kept)
+    return ANSWER
+
+
+class RecordingStub(StubBackend):
+    """Stub that remembers the token count of every answer prompt"""
+
+    def __init__(self, tokens_per_second, first_token_delay):
+        super().__init__(responses=stub_response, tokens_per_second=tokens_per_second,
+                         first_token_delay=first_token_delay)
+        self.answer_prompts = []
+        self.summary_calls = 0
+
+    async def stream(self, prompt, model, max_tokens=1500):
+        if "Updated summary:" in prompt:
+            self.summary_calls += 1
+        else:
+            self.answer_prompts.append(prompt)
+        async for token in super().stream(prompt, model, max_tokens):
+            yield token
+
+
+async def conversation(args, summaries):
+    recipe_chatbot.CONVERSATION_SUMMARY = summaries
+    recipe_chatbot.MAX_HISTORY_ENTRIES = max(16, recipe_chatbot.SUMMARY_AFTER_ENTRIES * 2) if summaries else 6
+    backend = RecordingStub(args.tokens_per_second, args.first_token_delay)
+    bot = RecipeChatBot(model='stub', backend=backend)
+    bot.recipe_data = STUB_RECIPE
+    bot.recipe = Recipe.from_markdown(STUB_RECIPE)
+
+    ttft, background = [], set()
+    for turn in range(args.turns):
+        if turn == 0:
+            question = f"{FACT}. {QUESTIONS[0]}"
+        elif turn == args.turns - 1:
+            question = "Given what I told you at the start, what should I swap in the sauce?"
+        else:
+            question = QUESTIONS[turn % len(QUESTIONS)]
+        start = time.perf_counter()
+        first = None
+        async for _ in bot.ask_question_stream(question):
+            if first is None:
+                first = time.perf_counter() - start
+        ttft.append(first)
+        if bot.needs_summary():
+            task = asyncio.get_running_loop().create_task(bot.summarize_history())
+            background.add(task)
+            task.add_done_callback(background.discard)
+        await asyncio.sleep(args.think)
+    await asyncio.gather(*background)
+
+    tokens = [count_tokens(prompt) for prompt in backend.answer_prompts]
+    return {
+        'prompt_tokens_first_5': round(statistics.mean(tokens[:5])),
+        'prompt_tokens_last_5': round(statistics.mean(tokens[-5:])),
+        'prompt_tokens_max': max(tokens),
+        'answer_ttft_p50_ms': round(statistics.median(ttft) * 1000, 1),
+        'answer_calls': len(backend.answer_prompts),
+        'summary_calls': backend.summary_calls,
+        'history_entries': len(bot.conversation_history),
+        'summary_tokens': count_tokens(bot.conversation_summary),
+        'fact_in_last_prompt': 'allergic to garlic' in backend.answer_prompts[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=40)
+    parser.add_argument('--think', type=float, default=0.05, help="Seconds between an answer and the next question")
+    parser.add_argument('--tokens-per-second', type=float, default=2000)
+    parser.add_argument('--first-token-delay', type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(json.dumps({
+        'turns': args.turns,
+        'recent_history_only': asyncio.run(conversation(args, False)),
+        'rolling_summary': asyncio.run(conversation(args, True)),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
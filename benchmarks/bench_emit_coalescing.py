@@ -0,0 +1,79 @@
+"""
+Time-to-first-token and total delivery time of the Socket.IO emit loop.
+
+Compares the old per-chunk sleep loop (emit, then asyncio.sleep(0.1)) with
+ChunkCoalescer against a stub LLM that produces tokens at a fixed rate.
+
+    python benchmarks/bench_emit_coalescing.py --tokens 400 --tokens-per-second 80
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from stream_emitter import ChunkCoalescer
+
+
+async def stub_llm(tokens, tokens_per_second, first_token_delay):
+    await asyncio.sleep(first_token_delay)
+    for i in range(tokens):
+        yield f"tok{i} "
+        await asyncio.sleep(1 / tokens_per_second)
+
+
+async def legacy_loop(stream, emit, sleep):
+    async for word in stream:
+        emit(word)
+        await asyncio.sleep(sleep)
+
+
+async def coalesced_loop(stream, emit, flush_interval, flush_bytes):
+    coalescer = ChunkCoalescer(emit, flush_interval=flush_interval, flush_bytes=flush_bytes)
+    async for word in stream:
+        coalescer.add(word)
+    coalescer.flush()
+    return coalescer.frames
+
+
+def measure(name, runner, args):
+    frames = []
+    start = time.perf_counter()
+
+    def emit(text):
+        frames.append((time.perf_counter() - start, len(text)))
+
+    stream = stub_llm(args.tokens, args.tokens_per_second, args.first_token_delay)
+    asyncio.run(runner(stream, emit))
+    total = time.perf_counter() - start
+    return {
+        'mode': name,
+        'ttft_ms': round(frames[0][0] * 1000, 1) if frames else None,
+        'total_s': round(total, 3),
+        'frames': len(frames),
+        'bytes': sum(size for _, size in frames),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tokens', type=int, default=400)
+    parser.add_argument('--tokens-per-second', type=float, default=80)
+    parser.add_argument('--first-token-delay', type=float, default=0.3)
+    parser.add_argument('--legacy-sleep', type=float, default=0.1)
+    parser.add_argument('--flush-interval-ms', type=float, default=30)
+    parser.add_argument('--flush-bytes', type=int, default=256)
+    args = parser.parse_args()
+
+    results = [
+        measure('legacy_sleep', lambda s, e: legacy_loop(s, e, args.legacy_sleep), args),
+        measure('coalesced', lambda s, e: coalesced_loop(s, e, args.flush_interval_ms / 1000, args.flush_bytes), args),
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,356 @@
+"""
+End-to-end load test of the Socket.IO backend.
+
+Starts app.py's socketio server in a subprocess with the stub LLM backend
+and a static transcript provider, then drives N concurrent python-socketio
+clients through one session each: fetch_recipe_stream, several
+generate_text turns, and a final generate_text interrupted by stop_stream.
+Reports p50/p95/p99 time to first token and full-response latency per
+phase, stop latency, messages per second, and the server's CPU time and
+RSS, as JSON.
+
+    python benchmarks/bench_end_to_end.py --clients 20 --turns 3 --output run.json
+    python benchmarks/bench_end_to_end.py --clients 20 --baseline run.json --tolerance 20
+
+With --baseline the run is compared with a previous --output file and the
+script exits with status 1 if a latency percentile or messages per second
+regressed by more than --tolerance percent. Clients use long-polling unless
+websocket-client is installed. Server CPU and RSS are read from /proc, so
+they are only reported on Linux.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import argparse
+import threading
+import subprocess
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+TRANSCRIPT_SEGMENTS = [
+    "today we're making a simple tomato pasta",
+    "bring a large pot of salted water to the boil",
+    "add two hundred grams of spaghetti and cook for ten minutes",
+    "meanwhile heat two tablespoons of olive oil in a pan",
+    "add three cloves of garlic, thinly sliced, and cook until golden",
+    "pour in a can of crushed tomatoes and a pinch of salt",
+    "simmer the sauce for fifteen minutes, stirring now and then",
+    "drain the pasta, keeping a cup of the cooking water",
+    "toss the pasta with the sauce and a splash of pasta water",
+    "finish with torn basil and grated parmesan",
+] * 20
+
+QUESTIONS = [
+    "How long should I boil the spaghetti?",
+    "Can I use fresh tomatoes instead of canned?",
+    "What can I substitute for parmesan?",
+    "How do I keep the garlic from burning?",
+    "How should I store leftovers?",
+]
+
+# Latency keys compared against a baseline (lower is better), plus throughput (higher is better)
+LATENCY_KEYS = ('recipe_ttft', 'recipe_total', 'answer_ttft', 'answer_total', 'stop_latency')
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(values):
+    """p50/p95/p99 in milliseconds"""
+    return {
+        'count': len(values),
+        **{f'p{pct}': round(percentile(values, pct) * 1000, 1) if values else None for pct in (50, 95, 99)},
+    }
+
+
+def video_id(index):
+    return f"bench{index:06d}"
+
+
+def serve(args):
+    """Run app.py's socketio server with stubbed transcripts (the --serve child process)"""
+    sys.path.insert(0, BACKEND_DIR)
+    from werkzeug.middleware.proxy_fix import ProxyFix
+
+    import app as app_module
+    import recipe_chatbot
+    from transcripts import StaticTranscript, StaticTranscriptProvider
+
+    transcript = [StaticTranscript('en', TRANSCRIPT_SEGMENTS)]
+    recipe_chatbot.transcript_fetcher.provider = StaticTranscriptProvider(
+        {video_id(index): transcript for index in range(args.clients)}, delay=args.transcript_delay)
+
+    # Each client sends its own X-Forwarded-For so the one-stream-per-user rule treats them as different users
+    app_module.app.wsgi_app = ProxyFix(app_module.app.wsgi_app, x_for=1)
+    app_module.socketio.run(app_module.app, host='127.0.0.1', port=args.port, log_output=False,
+                            allow_unsafe_werkzeug=True)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, port):
+    env = dict(os.environ,
+               LLM_BACKEND='stub',
+               LLM_STUB_MODEL=f"stub:{args.tokens_per_second}:{args.first_token_delay}",
+               RECIPE_CACHE_PATH='',
+               SESSION_STORE_URL='memory',
+               PYTHONUNBUFFERED='1')
+    command = [sys.executable, os.path.abspath(__file__), '--serve', '--port', str(port),
+               '--clients', str(args.clients), '--transcript-delay', str(args.transcript_delay)]
+    log = open(args.server_log, 'w') if args.server_log else subprocess.DEVNULL
+    process = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    import requests
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/metrics", timeout=1).ok:
+                return process
+        except requests.RequestException:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Server did not start within 30 seconds")
+
+
+def process_usage(pid):
+    """CPU seconds, RSS and peak RSS in MB of a process, from /proc (None elsewhere)"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open(f'/proc/{pid}/status') as f:
+            status = dict(line.split(':', 1) for line in f if ':' in line)
+    except OSError:
+        return None
+    ticks = os.sysconf('SC_CLK_TCK')
+    return {
+        'cpu_seconds': (int(fields[11]) + int(fields[12])) / ticks,  # utime + stime
+        'rss_mb': int(status['VmRSS'].split()[0]) / 1024,
+        'peak_rss_mb': int(status['VmHWM'].split()[0]) / 1024,
+    }
+
+
+def client_transports():
+    try:
+        import websocket  # noqa: F401 (websocket-client)
+        return ['polling', 'websocket']
+    except ImportError:
+        return ['polling']
+
+
+class BenchClient:
+    """One simulated user; every received event goes to a queue with its arrival time"""
+
+    def __init__(self, index, url, timeout):
+        import socketio
+
+        self.index = index
+        self.url = url
+        self.timeout = timeout
+        self.events = queue.Queue()
+        self.messages = 0
+        self.errors = []
+        self.samples = {key: [] for key in LATENCY_KEYS}
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on('*', lambda event, data=None: self.events.put((time.perf_counter(), event, data)))
+
+    def connect(self):
+        self.sio.connect(self.url, headers={'X-Forwarded-For': f'10.1.{self.index // 256}.{self.index % 256}'},
+                         transports=client_transports(), wait_timeout=self.timeout)
+        self.next_event(lambda event, data: event == 'session')
+
+    def next_event(self, match):
+        """Wait for the next event satisfying match(event, data); returns (arrival time, data)"""
+        deadline = time.perf_counter() + self.timeout
+        while True:
+            try:
+                at, event, data = self.events.get(timeout=max(deadline - time.perf_counter(), 0))
+            except queue.Empty:
+                raise TimeoutError("Timed out waiting for the server")
+            self.messages += 1
+            if match(event, data):
+                return at, data
+
+    def request(self, event, payload, reply_event, stop_after_first=False):
+        """
+        Send one streaming request and time it
+
+        Returns:
+            tuple: (time to first chunk, time to completion or stop) in seconds, either None if not reached
+        """
+        sent = time.perf_counter()
+        self.sio.emit(event, payload)
+        _, started = self.next_event(lambda name, data: name == reply_event and data and
+                                     ('messageId' in data or 'error' in data))
+        if 'error' in started:
+            raise RuntimeError(started['error'])
+        message_id = started['messageId']
+        first = None
+        stop_sent = None
+        while True:
+            at, data = self.next_event(lambda name, data: name == reply_event and data and
+                                       data.get('messageId') == message_id)
+            if 'error' in data:
+                raise RuntimeError(data['error'])
+            if data.get('data') and first is None:
+                first = at - sent
+                if stop_after_first:
+                    stop_sent = time.perf_counter()
+                    self.sio.emit('stop_stream')
+            if data.get('stopped'):
+                return first, at - stop_sent if stop_sent else None
+            if data.get('complete'):
+                return first, None if stop_after_first else at - sent
+
+    def run(self, turns, start_barrier):
+        try:
+            self.connect()
+            start_barrier.wait()
+            url = f"https://www.youtube.com/watch?v={video_id(self.index)}"
+            ttft, total = self.request('fetch_recipe_stream', {'video_url': url}, 'recipe_stream')
+            self.samples['recipe_ttft'].append(ttft)
+            self.samples['recipe_total'].append(total)
+            for turn in range(turns):
+                question = QUESTIONS[turn % len(QUESTIONS)]
+                ttft, total = self.request('generate_text', {'prompt': question}, 'response')
+                self.samples['answer_ttft'].append(ttft)
+                self.samples['answer_total'].append(total)
+            _, stop_latency = self.request('generate_text', {'prompt': "Walk me through the whole recipe"},
+                                           'response', stop_after_first=True)
+            if stop_latency is not None:
+                self.samples['stop_latency'].append(stop_latency)
+        except threading.BrokenBarrierError:
+            self.errors.append("Another client failed to connect")
+        except Exception as e:
+            self.errors.append(f"{type(e).__name__}: {e}")
+            start_barrier.abort()
+        finally:
+            if self.sio.connected:
+                self.sio.disconnect()
+
+
+def run(args, url, server_pid):
+    clients = [BenchClient(index, url, args.timeout) for index in range(args.clients)]
+    start_barrier = threading.Barrier(args.clients + 1)
+    threads = [threading.Thread(target=client.run, args=(args.turns, start_barrier), daemon=True)
+               for client in clients]
+    for thread in threads:
+        thread.start()
+
+    start_barrier.wait()  # Every client connected
+    usage_before = process_usage(server_pid)
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    usage_after = process_usage(server_pid)
+
+    samples = {key: [value for client in clients for value in client.samples[key] if value is not None]
+               for key in LATENCY_KEYS}
+    messages = sum(client.messages for client in clients)
+    server = None
+    if usage_before and usage_after:
+        cpu = usage_after['cpu_seconds'] - usage_before['cpu_seconds']
+        server = {
+            'cpu_seconds': round(cpu, 2),
+            'cpu_percent': round(cpu / elapsed * 100, 1),
+            'rss_mb': round(usage_after['rss_mb'], 1),
+            'peak_rss_mb': round(usage_after['peak_rss_mb'], 1),
+        }
+    return {
+        'config': {
+            'clients': args.clients,
+            'turns': args.turns,
+            'tokens_per_second': args.tokens_per_second,
+            'first_token_delay': args.first_token_delay,
+            'transcript_delay': args.transcript_delay,
+        },
+        'seconds': round(elapsed, 2),
+        'messages': messages,
+        'messages_per_second': round(messages / elapsed, 1),
+        'latency_ms': {key: summarize(values) for key, values in samples.items()},
+        'server': server,
+        'errors': [error for client in clients for error in client.errors],
+    }
+
+
+def compare(result, baseline, tolerance):
+    """
+    List regressions of result against baseline beyond tolerance percent
+
+    Returns:
+        list: Human-readable descriptions, empty if nothing regressed
+    """
+    regressions = []
+    for key in LATENCY_KEYS:
+        for pct in ('p50', 'p95', 'p99'):
+            old = baseline['latency_ms'].get(key, {}).get(pct)
+            new = result['latency_ms'][key][pct]
+            if old and new is not None and new > old * (1 + tolerance / 100):
+                regressions.append(f"{key} {pct}: {old} ms -> {new} ms")
+    old, new = baseline['messages_per_second'], result['messages_per_second']
+    if old and new < old * (1 - tolerance / 100):
+        regressions.append(f"messages_per_second: {old} -> {new}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=20)
+    parser.add_argument('--turns', type=int, default=3, help="generate_text turns per client after the recipe")
+    parser.add_argument('--tokens-per-second', type=float, default=100.0, help="Stub LLM streaming rate")
+    parser.add_argument('--first-token-delay', type=float, default=0.2, help="Stub LLM latency in seconds")
+    parser.add_argument('--transcript-delay', type=float, default=0.1, help="Stub transcript latency in seconds")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Seconds to wait for any single reply")
+    parser.add_argument('--output', help="Also write the JSON result to this file")
+    parser.add_argument('--baseline', help="JSON result of an earlier run to compare with")
+    parser.add_argument('--tolerance', type=float, default=20.0, help="Allowed regression in percent")
+    parser.add_argument('--server-log', help="Write the server's output to this file")
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    port = free_port()
+    server = start_server(args, port)
+    try:
+        result = run(args, f"http://127.0.0.1:{port}", server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        result['regressions'] = regressions
+        status = 1 if regressions else 0
+    if result['errors']:
+        status = 1
+
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    sys.exit(status)
+
+
+if __name__ == '__main__':
+    main()
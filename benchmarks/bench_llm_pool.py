@@ -0,0 +1,100 @@
+"""
+Request latency with and without the shared keep-alive connection pool.
+
+Sends N streaming chat requests (C at a time) to a local fake LLM server that
+charges a fixed delay per new connection, first through the Together SDK's
+async client (a new HTTP session per request) and then through the pooled
+TogetherBackend. Reports p50/p95/p99 latency and connections opened.
+
+    python benchmarks/bench_llm_pool.py --requests 200 --concurrency 20
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from fake_llm_server import FakeLLMServer
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def sdk_stream(client, prompt):
+    stream = await client.chat.completions.create(
+        model="fake-model", messages=[{"role": "user", "content": prompt}], stream=True, max_tokens=64
+    )
+    async for _ in stream:
+        pass
+
+
+async def pooled_stream(backend, prompt):
+    async for _ in backend.stream(prompt, "fake-model", max_tokens=64):
+        pass
+
+
+async def run(name, stream_once, server, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    connections_before = server.connection_count
+
+    async def one(index):
+        async with semaphore:
+            start = time.perf_counter()
+            await stream_once(f"request {index}")
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        'client': name,
+        'requests': requests,
+        'seconds': round(elapsed, 3),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'connections_opened': server.connection_count - connections_before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--tokens', type=int, default=20)
+    parser.add_argument('--connection-delay', type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(tokens=args.tokens, token_delay=0.002, first_token_delay=0.01,
+                           connection_delay=args.connection_delay).start()
+    os.environ['TOGETHER_API_KEY'] = os.environ.get('TOGETHER_API_KEY', 'benchmark')
+
+    from together import AsyncTogether
+    from llm_backends import TogetherBackend
+
+    async def compare():
+        client = AsyncTogether(api_key='benchmark', base_url=server.base_url)
+        backend = TogetherBackend(api_key='benchmark', base_url=server.base_url)
+        results = [
+            await run('together_sdk', lambda p: sdk_stream(client, p), server, args.requests, args.concurrency),
+            await run('pooled', lambda p: pooled_stream(backend, p), server, args.requests, args.concurrency),
+        ]
+        results[-1]['pool'] = backend.pool.stats()
+        await backend.pool.aclose()
+        return results
+
+    try:
+        print(json.dumps(asyncio.run(compare()), indent=2))
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
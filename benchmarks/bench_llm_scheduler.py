@@ -0,0 +1,146 @@
+"""
+Chat latency under mixed load, with and without the LLM scheduler.
+
+One heavy user starts --extractions long extraction calls at once (many
+pasted URLs) while --chat-users users each ask a short question every
+--think seconds for --duration seconds. The stub upstream serves
+--capacity calls at full speed and slows down in proportion beyond that,
+like a saturated provider. Each run goes through query_llm_stream, first
+with an unlimited scheduler (every call goes straight upstream, as before)
+and then with the configured one. The report has chat time to first token
+(queueing included), extraction completion times, and rate-limit counts.
+
+    python benchmarks/bench_llm_scheduler.py --extractions 30 --chat-users 20 --capacity 8
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+os.environ.setdefault('RECIPE_CACHE_PATH', '')
+
+import recipe_chatbot
+from llm_backends import StubBackend
+from llm_scheduler import LLMScheduler
+
+CHAT_ANSWER = "Simmer the sauce for about ten minutes, until it thickens and coats a spoon. " * 2
+RECIPE = "Stir the tomatoes into the garlic oil and let them cook down slowly while you boil the pasta. " * 20
+
+
+class ContendedStubBackend(StubBackend):
+    """Stub whose calls slow down once more than capacity of them stream at the same time"""
+
+    def __init__(self, capacity, tokens_per_second, first_token_delay):
+        super().__init__(responses=lambda prompt: RECIPE if prompt.startswith('extract') else CHAT_ANSWER,
+                         tokens_per_second=tokens_per_second, first_token_delay=first_token_delay)
+        self.capacity = capacity
+        self.active = 0
+        self.peak = 0
+
+    def slowdown(self):
+        return max(1.0, self.active / self.capacity)
+
+    async def stream(self, prompt, model, max_tokens=1500):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.first_token_delay * self.slowdown())
+            for token in self.tokens_for(prompt)[:max_tokens]:
+                yield token
+                await asyncio.sleep(self.slowdown() / self.tokens_per_second)
+        finally:
+            self.active -= 1
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return round(ordered[index] * 1000, 1)
+
+
+async def run(args, scheduler):
+    recipe_chatbot.llm_scheduler = scheduler
+    backend = ContendedStubBackend(args.capacity, args.tokens_per_second, args.first_token_delay)
+    chat_ttft, extraction_seconds, errors = [], [], []
+    max_position = 0
+
+    async def call(prompt, lane, user, ttft=None):
+        nonlocal max_position
+
+        def on_queue(status):
+            nonlocal max_position
+            max_position = max(max_position, status.get('position', 0))
+
+        start = time.perf_counter()
+        first = None
+        async for chunk in recipe_chatbot.query_llm_stream(prompt, model='stub', backend=backend, lane=lane,
+                                                           user=user, on_queue=on_queue):
+            if isinstance(chunk, recipe_chatbot.LLMError):
+                errors.append(lane)
+                return
+            if first is None:
+                first = time.perf_counter() - start
+        if ttft is not None:
+            ttft.append(first)
+        else:
+            extraction_seconds.append(time.perf_counter() - start)
+
+    async def chat_user(index):
+        rng = random.Random(index)
+        deadline = time.perf_counter() + args.duration
+        await asyncio.sleep(rng.uniform(0, args.think))
+        while time.perf_counter() < deadline:
+            await call("question: how long do I simmer?", 'chat', f"chat-{index}", chat_ttft)
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * args.think)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[call("extract: recipe", 'extraction', 'heavy') for _ in range(args.extractions)],
+                         *[chat_user(index) for index in range(args.chat_users)])
+    return {
+        'seconds': round(time.perf_counter() - start, 2),
+        'chat_calls': len(chat_ttft),
+        'chat_ttft_ms': {'p50': percentile(chat_ttft, 50), 'p95': percentile(chat_ttft, 95),
+                         'p99': percentile(chat_ttft, 99)},
+        'extractions_done': len(extraction_seconds),
+        'extraction_ms': {'p50': percentile(extraction_seconds, 50), 'max': percentile(extraction_seconds, 100)},
+        'rate_limited': len(errors),
+        'peak_upstream_calls': backend.peak,
+        'max_queue_position': max_position,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--extractions', type=int, default=30)
+    parser.add_argument('--chat-users', type=int, default=20)
+    parser.add_argument('--think', type=float, default=2.0, help="Mean seconds between a user's questions")
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--capacity', type=int, default=8, help="Calls the stub upstream serves at full speed")
+    parser.add_argument('--tokens-per-second', type=float, default=100)
+    parser.add_argument('--first-token-delay', type=float, default=0.2)
+    parser.add_argument('--max-concurrent', type=int, default=8, help="Scheduler slots (LLM_MAX_CONCURRENCY)")
+    parser.add_argument('--extraction-slots', type=int, default=4)
+    parser.add_argument('--user-rate', type=float, default=1.0)
+    parser.add_argument('--user-burst', type=float, default=10)
+    parser.add_argument('--max-wait', type=float, default=30)
+    args = parser.parse_args()
+
+    unlimited = LLMScheduler(max_concurrent=10 ** 6, user_rate=0)
+    scheduled = LLMScheduler(max_concurrent=args.max_concurrent, lane_limits={'extraction': args.extraction_slots},
+                             user_rate=args.user_rate, user_burst=args.user_burst, max_wait=args.max_wait)
+    print(json.dumps({
+        'config': vars(args),
+        'unscheduled': asyncio.run(run(args, unlimited)),
+        'scheduled': asyncio.run(run(args, scheduled)),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
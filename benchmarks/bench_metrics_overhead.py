@@ -0,0 +1,105 @@
+"""
+CPU overhead of the built-in metrics on the streaming hot path.
+
+Streams answers from a zero-latency StubBackend through query_llm_stream and
+a ChunkCoalescer emitting to a connected Socket.IO test client, i.e. the
+server's streaming path minus network waits, so CPU time is the cost that
+matters. Runs alternate between metrics on and off and the median CPU time
+of each is compared, also as CPU time per token: a real model streams well
+under 1000 tokens/s, so a per-token cost in nanoseconds is what decides
+whether the metrics matter. --no-emit drops the Socket.IO emit to show the
+worst case of a bare generator loop.
+
+    python benchmarks/bench_metrics_overhead.py --streams 200 --tokens 500 --repeats 7
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+os.environ.setdefault('RECIPE_CACHE_PATH', '')
+
+import metrics
+from llm_backends import StubBackend
+from recipe_chatbot import query_llm_stream
+from stream_emitter import ChunkCoalescer
+
+
+def socket_emitter():
+    """Return an emit function delivering frames to a connected Socket.IO test client, and the client"""
+    from flask import Flask
+    from flask_socketio import SocketIO
+
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode='threading')
+    client = socketio.test_client(app)
+    sid = client.eio_sid and socketio.server.manager.sid_from_eio_sid(client.eio_sid, '/')
+
+    def emit_frame(text):
+        socketio.emit('response', {"data": text, "streaming": True, "messageId": "benchmark"}, room=sid)
+
+    return emit_frame, client
+
+
+async def run_streams(backend, streams, concurrency, emit_frame):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            coalescer = ChunkCoalescer(emit_frame)
+            async for chunk in query_llm_stream("benchmark prompt", model="stub", backend=backend):
+                coalescer.add(chunk)
+            coalescer.flush()
+
+    await asyncio.gather(*(one() for _ in range(streams)))
+
+
+def timed_run(enabled, backend, args, emit_frame, client):
+    metrics.set_enabled(enabled)
+    start = time.process_time()
+    asyncio.run(run_streams(backend, args.streams, args.concurrency, emit_frame))
+    elapsed = time.process_time() - start
+    if client is not None:
+        client.get_received()  # Drop delivered frames between runs
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--streams', type=int, default=200)
+    parser.add_argument('--tokens', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--repeats', type=int, default=7)
+    parser.add_argument('--no-emit', action='store_true', help="Discard frames instead of emitting them")
+    args = parser.parse_args()
+
+    emit_frame, client = (lambda text: None, None) if args.no_emit else socket_emitter()
+
+    backend = StubBackend(responses=[f"tok{i} " for i in range(args.tokens)], tokens_per_second=0,
+                          first_token_delay=0)
+    timed_run(True, backend, args, emit_frame, client)  # Warm up
+    samples = {True: [], False: []}
+    for _ in range(args.repeats):
+        for enabled in (False, True):
+            samples[enabled].append(timed_run(enabled, backend, args, emit_frame, client))
+
+    disabled = statistics.median(samples[False])
+    enabled = statistics.median(samples[True])
+    print(json.dumps({
+        'streams': args.streams,
+        'tokens_per_stream': args.tokens,
+        'emit': not args.no_emit,
+        'cpu_seconds_disabled': round(disabled, 4),
+        'cpu_seconds_enabled': round(enabled, 4),
+        'overhead_percent': round((enabled - disabled) / disabled * 100, 2),
+        'overhead_ns_per_token': round((enabled - disabled) / (args.streams * args.tokens) * 1e9, 1),
+        'ttft': metrics.REGISTRY.get('llm_time_to_first_token_seconds').labels('stub').snapshot(),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Throughput of the incremental recipe parser on large synthetic recipes.
+
+Streams a synthetic EXTRACTION_PROMPT-style recipe through
+IncrementalRecipeParser in small chunks (roughly one LLM token each) and
+reports MB/s and parsed items per second.
+
+    python benchmarks/bench_recipe_parser.py --ingredients 2000 --steps 2000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from recipe_model import IncrementalRecipeParser, Recipe
+
+UNITS = ['g', 'kg', 'ml', 'cups', 'tbsp', 'tsp', 'cloves', '']
+NAMES = ['flour', 'butter', 'chicken thighs', 'garlic', 'cumin seeds', 'whole milk', 'basmati rice', 'salt']
+
+
+def synthetic_recipe(ingredients, steps, seed=7):
+    rng = random.Random(seed)
+    lines = ["**Title**: Synthetic Feast", "", "**Ingredients**:"]
+    for _ in range(ingredients):
+        quantity = rng.choice(['1', '2', '1 1/2', '3/4', '250', '½'])
+        lines.append(f"- {quantity} {rng.choice(UNITS)} {rng.choice(NAMES)}".replace('  ', ' '))
+    lines += ["", "**Procedure**:"]
+    for index in range(steps):
+        lines.append(f"- Step {index}: stir the {rng.choice(NAMES)} over medium heat for {rng.randint(1, 20)} minutes")
+    return '\n'.join(lines) + '\n'
+
+
+def bench(markdown, chunk_size, repeat):
+    chunks = [markdown[i:i + chunk_size] for i in range(0, len(markdown), chunk_size)]
+    best = None
+    recipe = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser = IncrementalRecipeParser()
+        for chunk in chunks:
+            parser.feed(chunk)
+        parser.close()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        recipe = parser.recipe
+    items = len(recipe.ingredients) + len(recipe.steps)
+    return {
+        'bytes': len(markdown.encode('utf-8')),
+        'chunk_size': chunk_size,
+        'chunks': len(chunks),
+        'items': items,
+        'seconds': round(best, 4),
+        'mb_per_second': round(len(markdown) / best / 1e6, 2),
+        'items_per_second': round(items / best),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ingredients', type=int, default=2000)
+    parser.add_argument('--steps', type=int, default=2000)
+    parser.add_argument('--chunk-sizes', type=int, nargs='+', default=[4, 64, 4096])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    markdown = synthetic_recipe(args.ingredients, args.steps)
+    results = [bench(markdown, size, args.repeat) for size in args.chunk_sizes]
+
+    recipe = Recipe.from_markdown(markdown)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        Recipe.from_dict(recipe.to_dict())
+    results.append({'dict_round_trip_seconds': round((time.perf_counter() - start) / args.repeat, 4)})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
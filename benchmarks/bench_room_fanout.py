@@ -0,0 +1,88 @@
+"""
+Per-client bytes received as the number of connected clients grows.
+
+Connects N Socket.IO test clients to app.py, has every client ask one
+question against a stubbed chatbot, and reports the average bytes each
+client received. With room-scoped emits this stays constant in N; with
+broadcast emits it grows linearly.
+
+    python benchmarks/bench_room_fanout.py --clients 1 10 50
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+os.environ.setdefault('TOGETHER_API_KEY', 'benchmark')
+os.environ.setdefault('RECIPE_CACHE_PATH', '')
+
+
+def run(app_module, client_count):
+    clients = [app_module.socketio.test_client(app_module.app) for _ in range(client_count)]
+    for index, client in enumerate(clients):
+        # Distinct addresses so the one-stream-per-user rule does not stop the other clients
+        app_module.socketio.server.environ[client.eio_sid]['REMOTE_ADDR'] = f'10.0.{index // 256}.{index % 256}'
+        client.get_received()
+
+    for client in clients:
+        client.emit('generate_text', {'prompt': 'How long should I bake it?'})
+
+    deadline = time.time() + 30
+    received = [[] for _ in clients]
+    while time.time() < deadline:
+        for index, client in enumerate(clients):
+            received[index].extend(client.get_received())
+        completed = sum(
+            1 for packets in received
+            for packet in packets
+            if packet['args'] and (packet['args'][0].get('complete') or packet['args'][0].get('error'))
+        )
+        if completed >= client_count and not app_module.streams.stats()['active']:
+            break
+        time.sleep(0.05)
+
+    sizes = [sum(len(json.dumps(packet['args'])) for packet in packets) for packets in received]
+    errors = [
+        packet['args'][0]['error']
+        for packets in received
+        for packet in packets
+        if packet['args'] and isinstance(packet['args'][0], dict) and packet['args'][0].get('error')
+    ]
+    for client in clients:
+        client.disconnect()
+    if errors:
+        raise RuntimeError(f"{len(errors)} error frames with {client_count} clients, first: {errors[0]}")
+    return {
+        'clients': client_count,
+        'avg_bytes_per_client': round(sum(sizes) / len(sizes), 1),
+        'max_bytes_per_client': max(sizes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--tokens', type=int, default=50)
+    args = parser.parse_args()
+
+    import app as app_module
+    from recipe_chatbot import RecipeChatBot
+
+    async def stub_answer(self, question, stop_callback=None, **kwargs):
+        for i in range(args.tokens):
+            yield f"word{i} "
+
+    RecipeChatBot.ask_question_stream = stub_answer
+    try:
+        results = [run(app_module, count) for count in args.clients]
+    except RuntimeError as e:
+        sys.exit(f"Benchmark failed: {e}")
+    finally:
+        app_module.runtime.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
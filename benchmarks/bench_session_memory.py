@@ -0,0 +1,104 @@
+"""
+Memory held by chatbot sessions whose clients vanished without disconnecting.
+
+Creates N sessions, each with a recipe and a few conversation turns, and
+never releases them, first in a plain dict (the old chatbot_instances) and
+then in a SessionManager capped at --max-sessions that spills evicted
+sessions to a session store: SQLite (the default) or, with --store memory,
+an in-process store, where spilled state stays on the heap. Reports traced
+Python heap growth, resident sessions and the bytes the store keeps in
+memory, then rehydrates a sample of evicted sessions to check nothing was
+lost.
+
+    python benchmarks/bench_session_memory.py --sessions 20000 --max-sessions 1000
+    python benchmarks/bench_session_memory.py --store memory
+"""
+import os
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+os.environ.setdefault('LLM_BACKEND', 'stub')
+os.environ.setdefault('RECIPE_CACHE_PATH', '')
+
+from recipe_chatbot import RecipeChatBot
+from recipe_model import Recipe
+from llm_backends import STUB_RECIPE, STUB_ANSWER
+from session_manager import SessionManager
+from session_store import MemorySessionStore, SqliteSessionStore
+
+
+def new_session(state=None):
+    if state:
+        return RecipeChatBot.from_state(state)
+    bot = RecipeChatBot(model='stub')
+    bot.recipe_data = STUB_RECIPE
+    bot.recipe = Recipe.from_markdown(STUB_RECIPE)
+    for turn in range(3):
+        bot.remember_turn(f"question {turn} {random.random()}", STUB_ANSWER)
+    return bot
+
+
+def measure(name, get_session, count, resident):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    for index in range(count):
+        get_session(f"session-{index}")
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'sessions': name,
+        'created': count,
+        'resident': resident(),
+        'heap_mb': round(current / 1024 / 1024, 2),
+        'peak_heap_mb': round(peak / 1024 / 1024, 2),
+        'seconds': round(elapsed, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=20000)
+    parser.add_argument('--max-sessions', type=int, default=1000)
+    parser.add_argument('--store', choices=['sqlite', 'memory'], default='sqlite')
+    args = parser.parse_args()
+
+    unbounded = {}
+
+    def dict_session(session_id):
+        if session_id not in unbounded:
+            unbounded[session_id] = new_session()
+        return unbounded[session_id]
+
+    results = [measure('dict', dict_session, args.sessions, lambda: len(unbounded))]
+    unbounded.clear()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.store == 'memory':
+            store = MemorySessionStore()
+        else:
+            store = SqliteSessionStore(os.path.join(directory, 'sessions.sqlite3'))
+        manager = SessionManager(store, new_session, max_sessions=args.max_sessions)
+        results.append(measure(f'session_manager_{args.store}', manager.get, args.sessions, lambda: len(manager)))
+
+        sample = random.sample(range(args.sessions - args.max_sessions), 100)
+        restored = [manager.get(f"session-{index}") for index in sample]
+        results[-1]['rehydrated_ok'] = all(bot.recipe_data == STUB_RECIPE and len(bot.conversation_history) == 6
+                                           for bot in restored)
+        results[-1]['stats'] = manager.stats()
+        store.close()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
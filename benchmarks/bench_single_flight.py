@@ -0,0 +1,95 @@
+"""
+LLM calls and latency when many clients fetch the same video at once.
+
+Runs N concurrent fetch_recipe calls on the stream runtime against the stub
+backend and a static transcript provider, once for N different videos (no
+sharing possible, the old cost of a spike) and once for a single video
+shared by all N, and reports transcript fetches, LLM calls and p50/p99
+completion time. A few of the shared subscribers, including the first,
+are cancelled midway to show the upstream survives them.
+
+    python benchmarks/bench_single_flight.py --clients 10 50 100
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+os.environ.setdefault('LLM_BACKEND', 'stub')
+os.environ.setdefault('LLM_STUB_MODEL', 'stub:100:0.3')
+os.environ.setdefault('RECIPE_CACHE_PATH', '')
+
+import recipe_chatbot
+from recipe_chatbot import RecipeChatBot, get_backend
+from stream_runtime import StreamRuntime
+from transcripts import StaticTranscript, StaticTranscriptProvider
+
+SEGMENTS = ["heat the olive oil, add the garlic and then the crushed tomatoes and simmer"] * 40
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run(runtime, provider, video_ids, cancel_every):
+    backend = get_backend(recipe_chatbot.DEFAULT_MODEL)
+    calls, lists = backend.calls, provider.list_calls
+    durations = []
+
+    async def client(video_id):
+        start = time.perf_counter()
+        bot = RecipeChatBot()
+        async for _ in bot.fetch_recipe(f"https://www.youtube.com/watch?v={video_id}"):
+            pass
+        durations.append(time.perf_counter() - start)
+        if bot.recipe_key is None:
+            raise RuntimeError(f"Extraction failed: {bot.recipe_data}")
+
+    futures = [runtime.submit(f"client-{index}", client(video_id)) for index, video_id in enumerate(video_ids)]
+    cancelled = 0
+    if cancel_every:
+        time.sleep(0.5)
+        for future in futures[::cancel_every]:
+            cancelled += future.cancel()
+    for future in futures:
+        if not future.cancelled():
+            future.result(timeout=60)
+    return {
+        'transcript_fetches': provider.list_calls - lists,
+        'llm_calls': backend.calls - calls,
+        'cancelled_subscribers': cancelled,
+        'p50_seconds': round(percentile(durations, 50), 3),
+        'p99_seconds': round(percentile(durations, 99), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, nargs='+', default=[10, 50, 100])
+    parser.add_argument('--transcript-delay', type=float, default=0.5)
+    args = parser.parse_args()
+
+    runtime = StreamRuntime(loops=2, max_concurrent=max(args.clients), max_pending=max(args.clients))
+    results = []
+    for round_index, count in enumerate(args.clients):
+        distinct = [f"d{round_index:02d}{index:08d}" for index in range(count)]
+        shared = f"s{round_index:02d}shared00"
+        transcript = [StaticTranscript('en', SEGMENTS)]
+        provider = StaticTranscriptProvider({video_id: transcript for video_id in distinct + [shared]},
+                                            delay=args.transcript_delay)
+        recipe_chatbot.transcript_fetcher.provider = provider
+        results.append({
+            'clients': count,
+            'distinct_videos': run(runtime, provider, distinct, 0),
+            'same_video': run(runtime, provider, [shared] * count, 10),
+        })
+    runtime.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Resuming recipe streams after the client's socket drops mid-answer.
+
+N Socket.IO test clients, each with its own session, start a recipe stream
+against the stub backend and disconnect after --drop-after seconds. After
+--offline seconds each reconnects with its session token and sends
+resume_stream with the last sequence number it saw. The report shows how
+many streams completed with every frame exactly once, the resume latency,
+LLM calls, and the peak bytes held in replay buffers against the cap.
+
+    python benchmarks/bench_stream_resume.py --clients 50 --offline 1.0
+    python benchmarks/bench_stream_resume.py --grace 0   # old behaviour: dropped streams are lost
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+VIDEO_ID = 'resumeBench'
+SEGMENTS = ["add the garlic to the olive oil and simmer the crushed tomatoes"] * 40
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def frames_of(client):
+    return [packet['args'][0] for packet in client.get_received()
+            if packet['name'] in ('recipe_stream', 'recipe_section', 'response')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--drop-after', type=float, default=0.8, help="Seconds of streaming before the drop")
+    parser.add_argument('--offline', type=float, default=1.0, help="Seconds before reconnecting")
+    parser.add_argument('--grace', type=float, default=60)
+    parser.add_argument('--max-bytes', type=int, default=16 * 1024 * 1024)
+    parser.add_argument('--stub-model', default='stub:40:0.2')
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+
+    os.environ.update(LLM_BACKEND='stub', LLM_STUB_MODEL=args.stub_model, RECIPE_CACHE_PATH='',
+                      SESSION_STORE_URL='memory', STREAM_RESUME_GRACE=str(args.grace),
+                      REPLAY_BUFFER_MAX_BYTES=str(args.max_bytes),
+                      MAX_CONCURRENT_GENERATIONS=str(args.clients), MAX_PENDING_GENERATIONS=str(args.clients))
+    import app as server
+    import recipe_chatbot
+    from llm_backends import get_backend
+    from transcripts import StaticTranscript, StaticTranscriptProvider
+
+    # Distinct videos so single-flight does not merge the streams
+    videos = [f"{VIDEO_ID}{index:04d}" for index in range(args.clients)]
+    recipe_chatbot.transcript_fetcher.provider = StaticTranscriptProvider(
+        {video_id: [StaticTranscript('en', SEGMENTS)] for video_id in videos})
+    backend = get_backend(recipe_chatbot.DEFAULT_MODEL)
+    calls = backend.calls
+
+    peak_bytes = 0
+    sampling = threading.Event()
+
+    def sample():
+        nonlocal peak_bytes
+        while not sampling.wait(0.01):
+            peak_bytes = max(peak_bytes, server.replays.stats()['bytes'])
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+
+    tokens, clients, seen = [], [], []
+    for video_id in videos:
+        client = server.socketio.test_client(server.app)
+        tokens.append(next(packet['args'][0]['session_token'] for packet in client.get_received()
+                           if packet['name'] == 'session'))
+        client.emit('fetch_recipe_stream', {'video_url': f"https://www.youtube.com/watch?v={video_id}"})
+        clients.append(client)
+    time.sleep(args.drop_after)
+    for client in clients:
+        seen.append(frames_of(client))
+        client.disconnect()
+    message_ids = [frames[0]['messageId'] for frames in seen]
+    time.sleep(args.offline)
+
+    resumed, latencies = [], []
+    for token, message_id, frames in zip(tokens, message_ids, seen):
+        client = server.socketio.test_client(server.app, auth={'session_token': token})
+        client.get_received()
+        last_seq = max((frame['seq'] for frame in frames if 'seq' in frame), default=0)
+        start = time.perf_counter()
+        client.emit('resume_stream', {'messageId': message_id, 'lastSeq': last_seq})
+        latencies.append(time.perf_counter() - start)
+        resumed.append(client)
+
+    complete = lost = gaps = 0
+    deadline = time.perf_counter() + args.timeout
+    pending = set(range(args.clients))
+    while pending and time.perf_counter() < deadline:
+        for index in list(pending):
+            seen[index] += frames_of(resumed[index])
+            frames = seen[index]
+            if any('error' in frame or frame.get('stopped') or frame.get('resumed') is False for frame in frames):
+                lost += 1
+                pending.discard(index)
+            elif any(frame.get('complete') for frame in frames):
+                seqs = [frame['seq'] for frame in frames if 'seq' in frame]
+                if seqs == list(range(1, len(seqs) + 1)):
+                    complete += 1
+                else:
+                    gaps += 1
+                pending.discard(index)
+        time.sleep(0.02)
+    sampling.set()
+    sampler.join()
+
+    print(json.dumps({
+        'clients': args.clients,
+        'grace_seconds': args.grace,
+        'completed_intact': complete,
+        'completed_with_gaps': gaps,
+        'lost': lost,
+        'timed_out': len(pending),
+        'llm_calls': backend.calls - calls,
+        'resume_p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'resume_p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'peak_buffer_bytes': peak_bytes,
+        'max_buffer_bytes': args.max_bytes,
+        'replay_buffers': server.replays.stats(),
+    }, indent=2))
+    for client in resumed:
+        client.disconnect()
+    server.runtime.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Throughput and allocations of transcript cleaning on long synthetic transcripts.
+
+Compares the previous clean_subtitle_text (four re.sub passes, a replace
+and a split/join over the whole joined transcript, kept here verbatim as
+legacy_clean) with the current per-segment cleaner, on transcripts of
+--minutes of speech with the occasional [Music]/[Applause] caption and
+timing marker. Reports MB/s of input text and the tracemalloc peak, and
+checks that both produce the same text when fillers are kept.
+
+    python benchmarks/bench_transcript_cleaning.py --minutes 10 60 180
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from transcripts import clean_subtitle_text
+
+WORDS = ("add the onions and stir until they soften then season with salt pepper and a little "
+         "cumin while the oil heats up keep the flame on medium so nothing burns").split()
+FILLERS = ["[Music]", "[Applause]", "[Laughter]", "♪♪", "[ Music ]"]
+SEGMENTS_PER_MINUTE = 20
+
+
+def legacy_clean(subtitle_data):
+    texts = []
+    if isinstance(subtitle_data, list):
+        for item in subtitle_data:
+            if isinstance(item, dict) and 'text' in item:
+                texts.append(item['text'])
+    elif isinstance(subtitle_data, str):
+        texts = [subtitle_data]
+    else:
+        texts = [str(subtitle_data)]
+    full_text = ' '.join(texts)
+    full_text = re.sub(r'[\{\}\[\]\"]', '', full_text)
+    full_text = re.sub(r'\d+:\d+:\d+\.\d+ --> \d+:\d+:\d+\.\d+', '', full_text)
+    full_text = re.sub(r'"tStartMs":\d+,"dDurationMs":\d+', '', full_text)
+    full_text = re.sub(r'\s+', ' ', full_text)
+    full_text = full_text.replace('\n', ' ')
+    full_text = ' '.join(full_text.split())
+    return full_text
+
+
+def synthetic_transcript(minutes, seed=0):
+    rng = random.Random(seed)
+    segments = []
+    for index in range(minutes * SEGMENTS_PER_MINUTE):
+        roll = rng.random()
+        if roll < 0.05:
+            text = rng.choice(FILLERS)
+        else:
+            text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 14)))
+            if roll < 0.08:
+                text = f"00:{index // 60 % 60:02d}:{index % 60:02d}.000 --> 00:{index // 60 % 60:02d}:{index % 60:02d}.900\n{text}"
+            elif roll < 0.15:
+                text = f'  {text}\n'
+        segments.append({'text': text, 'start': index * 3.0, 'duration': 3.0})
+    return segments
+
+
+def measure(clean, segments, repeats):
+    size = sum(len(item['text'].encode('utf-8')) for item in segments)
+    elapsed = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        clean(segments)
+        elapsed.append(time.perf_counter() - start)
+    tracemalloc.start()
+    clean(segments)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    best = min(elapsed)
+    return {
+        'ms': round(best * 1000, 2),
+        'mb_per_second': round(size / best / 1024 / 1024, 1),
+        'peak_alloc_kb': round(peak / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=int, nargs='+', default=[10, 60, 180])
+    parser.add_argument('--repeats', type=int, default=7)
+    args = parser.parse_args()
+
+    results = []
+    for minutes in args.minutes:
+        segments = synthetic_transcript(minutes)
+        legacy = legacy_clean(segments)
+        kept = clean_subtitle_text(segments, drop_fillers=False)
+        dropped = clean_subtitle_text(segments)
+        results.append({
+            'minutes': minutes,
+            'input_kb': round(sum(len(item['text'].encode('utf-8')) for item in segments) / 1024, 1),
+            'legacy': measure(legacy_clean, segments, args.repeats),
+            'single_pass': measure(clean_subtitle_text, segments, args.repeats),
+            'matches_legacy': kept == legacy,
+            'chars_saved_by_dropping_fillers': len(kept) - len(dropped),
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Local OpenAI-compatible streaming server used by the benchmarks.
+
+Serves POST /chat/completions (and /v1/chat/completions) as server-sent
+events, emitting a fixed number of tokens with a configurable first-token
+delay and inter-token delay. connection_delay adds a fixed cost to every new
+connection to stand in for TLS handshakes. Runs in a background thread.
+"""
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        # Simulated per-connection cost (e.g. a TLS handshake); kept-alive connections pay it once
+        self.server.connection_count += 1
+        if self.server.connection_delay:
+            time.sleep(self.server.connection_delay)
+        super().setup()
+
+    def do_HEAD(self):
+        # Connection warm-up requests
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        server = self.server
+        server.request_count += 1
+
+        if not body.get('stream'):
+            text = ' '.join(['token'] * server.tokens)
+            payload = json.dumps({
+                'id': 'fake', 'object': 'chat.completion', 'model': body.get('model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+            }).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        time.sleep(server.first_token_delay)
+        for i in range(server.tokens):
+            chunk = {
+                'id': 'fake', 'object': 'chat.completion.chunk', 'model': body.get('model'),
+                'choices': [{'index': 0, 'delta': {'content': f'token{i} '}}],
+            }
+            self._write_chunk(f'data: {json.dumps(chunk)}\n\n'.encode('utf-8'))
+            if server.token_delay:
+                time.sleep(server.token_delay)
+        self._write_chunk(b'data: [DONE]\n\n')
+        self._write_chunk(b'')
+
+    def _write_chunk(self, data):
+        self.wfile.write(f'{len(data):x}\r\n'.encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 makes bursts of new connections wait for SYN retries
+    request_queue_size = 256
+
+    def __init__(self, host='127.0.0.1', port=0, tokens=50, token_delay=0.01, first_token_delay=0.05,
+                 connection_delay=0.0):
+        super().__init__((host, port), FakeLLMHandler)
+        self.tokens = tokens
+        self.connection_delay = connection_delay
+        self.connection_count = 0
+        self.token_delay = token_delay
+        self.first_token_delay = first_token_delay
+        self.request_count = 0
+        self._thread = None
+
+    def handle_error(self, request, client_address):
+        # Clients that drop the connection mid-stream are expected, not errors
+        pass
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,183 @@
+"""
+Concurrency stress test for the stream registry.
+
+Thousands of simulated clients (several tabs per user, two tabs per session)
+connect, start streams on a real StreamRuntime, and stop them from worker
+threads at random: stop_stream, a new stream in another tab of the same
+user, a stop for the whole session, or a disconnect. A checker thread
+snapshots the registry indexes while this runs.
+
+Checks that every indexed stream is live and that each user has at most one
+stream, and, once everything has drained, that the registry is empty and
+every task has finished. Reports stop-to-task-exit latency and exits
+non-zero on any violation.
+
+    python benchmarks/stress_stream_registry.py --clients 5000 --threads 32
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from stream_registry import StreamRegistry
+from stream_runtime import StreamRuntime, RuntimeBusyError
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Stress:
+    def __init__(self, args):
+        self.args = args
+        self.registry = StreamRegistry()
+        self.runtime = StreamRuntime(loops=args.loops, max_concurrent=args.max_concurrent,
+                                     max_pending=args.clients * args.streams)
+        self.lock = threading.Lock()
+        self.stop_requested = {}  # handle -> perf_counter of the stop
+        self.stop_latencies = []
+        self.futures = []
+        self.violations = []
+        self.counts = {'streams': 0, 'completed': 0, 'cancelled': 0, 'stopped_early': 0, 'rejected': 0}
+
+    async def fake_stream(self, handle):
+        try:
+            for _ in range(self.args.tokens):
+                if handle.stopped():
+                    with self.lock:
+                        self.counts['stopped_early'] += 1
+                    break
+                await asyncio.sleep(self.args.token_delay)
+            else:
+                with self.lock:
+                    self.counts['completed'] += 1
+        except asyncio.CancelledError:
+            with self.lock:
+                self.counts['cancelled'] += 1
+            raise
+        finally:
+            self.registry.finish(handle)
+            with self.lock:
+                stopped_at = self.stop_requested.pop(handle, None)
+                if stopped_at is not None:
+                    self.stop_latencies.append(time.perf_counter() - stopped_at)
+
+    def record_stops(self, handles):
+        now = time.perf_counter()
+        with self.lock:
+            for handle in handles:
+                self.stop_requested[handle] = now
+
+    def client(self, index):
+        rng = random.Random(index)
+        client_id = f"client-{index}"
+        user = f"user-{index % self.args.users}"
+        session = f"session-{index // 2}"
+        for _ in range(self.args.streams):
+            handle, displaced = self.registry.register(client_id, user, session)
+            self.record_stops(displaced)
+            try:
+                future = self.runtime.submit(client_id, self.fake_stream(handle))
+            except RuntimeBusyError:
+                self.registry.finish(handle)
+                with self.lock:
+                    self.counts['rejected'] += 1
+                continue
+            handle.attach(future)
+            with self.lock:
+                self.counts['streams'] += 1
+                self.futures.append(future)
+
+            time.sleep(rng.random() * self.args.think_time)
+            action = rng.random()
+            if action < 0.3:
+                stopped = self.registry.stop_client(client_id)
+                self.record_stops([stopped] if stopped else [])
+            elif action < 0.45:
+                self.record_stops(self.registry.stop_session(session, except_client=client_id))
+            elif action < 0.55:
+                self.record_stops(self.registry.stop_user(user, except_client=client_id))
+        stopped = self.registry.stop_client(client_id, reason='disconnected')
+        self.record_stops([stopped] if stopped else [])
+
+    def check_indexes(self, done):
+        while not done.is_set():
+            registry = self.registry
+            with registry._lock:
+                for user, handles in registry._by_user.items():
+                    if len(handles) > 1:
+                        self.violations.append(f"user {user} has {len(handles)} live streams")
+                for client_id, handle in registry._by_client.items():
+                    if handle.stopped():
+                        self.violations.append(f"stopped stream still indexed for {client_id}")
+            time.sleep(0.001)
+
+    def run(self):
+        done = threading.Event()
+        checker = threading.Thread(target=self.check_indexes, args=(done,), daemon=True)
+        checker.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(self.args.threads) as pool:
+            list(pool.map(self.client, range(self.args.clients)))
+        for future in list(self.futures):
+            try:
+                future.result(timeout=30)
+            except BaseException:
+                pass  # Cancelled streams
+        elapsed = time.perf_counter() - start
+        done.set()
+        checker.join()
+
+        stats = self.registry.stats()
+        if stats['active'] or stats['users'] or stats['sessions']:
+            self.violations.append(f"registry not empty after drain: {stats}")
+        unfinished = sum(1 for future in self.futures if not future.done())
+        if unfinished:
+            self.violations.append(f"{unfinished} tasks still running after drain")
+        self.runtime.shutdown()
+
+        return {
+            'clients': self.args.clients,
+            'users': self.args.users,
+            'seconds': round(elapsed, 3),
+            'streams_per_second': round(self.counts['streams'] / elapsed, 1),
+            **self.counts,
+            'stop_latency_p50_ms': round(percentile(self.stop_latencies, 50) * 1000, 3),
+            'stop_latency_p99_ms': round(percentile(self.stop_latencies, 99) * 1000, 3),
+            'registry': stats,
+            'violations': len(self.violations),
+            'first_violations': self.violations[:5],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=1000, help="Clients share users round-robin (tabs)")
+    parser.add_argument('--streams', type=int, default=3, help="Streams started per client")
+    parser.add_argument('--threads', type=int, default=32, help="Handler threads driving the clients")
+    parser.add_argument('--loops', type=int, default=2)
+    parser.add_argument('--max-concurrent', type=int, default=256)
+    parser.add_argument('--tokens', type=int, default=20)
+    parser.add_argument('--token-delay', type=float, default=0.002)
+    parser.add_argument('--think-time', type=float, default=0.05, help="Max pause before a client acts")
+    args = parser.parse_args()
+
+    result = Stress(args).run()
+    print(json.dumps(result, indent=2))
+    return 1 if result['violations'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
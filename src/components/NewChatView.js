@@ -1,7 +1,7 @@
 import React, { useState, useRef, useEffect, useContext } from 'react';
 import { useParams } from 'react-router-dom';
 import ChatMessage from './ChatMessage';
-import { ChatContext } from '../context/chatContext';
+import { ChatContext, BACKEND_URL, sessionAuth, rememberSession } from '../context/chatContext';
 import { MdSend, MdStop } from 'react-icons/md';
 import { io } from 'socket.io-client';
 
@@ -22,6 +22,8 @@ const NewChatView = () => {
   const [hasVideoUrlError, setHasVideoUrlError] = useState(false);
   const [processedVideoUrl, setProcessedVideoUrl] = useState(null); // Track processed URLs
   const [isStoppingStream, setIsStoppingStream] = useState(false); // Track stop request
+  // Stream in progress and the last frame seen of it, to resume from after a reconnect
+  const activeStreamRef = useRef({ messageId: null, lastSeq: 0 });
 
   // Function to clean text formatting
   const cleanText = (text) => {
@@ -58,14 +60,24 @@ const NewChatView = () => {
         transports: ['websocket', 'polling'],
         forceNew: true, // Force a new connection for each tab
         timeout: 5000,
+        auth: sessionAuth,
       };
 
-      socketRef.current = io('http://192.168.1.203:5000', socketOptions);
+      socketRef.current = io(BACKEND_URL, socketOptions);
 
       socketRef.current.on('connect', () => {
         console.log('Connected to backend from NewChatView with ID:', socketRef.current.id);
+        // After a dropped connection, pick the stream up where it left off; the backend
+        // replays the frames after lastSeq and keeps streaming to this socket
+        const { messageId, lastSeq } = activeStreamRef.current;
+        if (messageId) {
+          console.log(`Resuming stream ${messageId} after frame ${lastSeq}`);
+          socketRef.current.emit('resume_stream', { messageId, lastSeq });
+        }
       });
 
+      socketRef.current.on('session', rememberSession);
+
       socketRef.current.on('connect_error', (error) => {
         console.error('Connection error:', error);
       });
@@ -219,6 +231,24 @@ const NewChatView = () => {
     const handleResponse = (data) => {
       console.log('Received response:', data);
 
+      const activeStream = activeStreamRef.current;
+      if (data.messageId && (!activeStream.messageId || activeStream.messageId === data.messageId)) {
+        if (data.seq) {
+          // A resumed stream replays from lastSeq + 1; skip anything already shown
+          if (data.seq <= activeStream.lastSeq) return;
+          activeStreamRef.current = { messageId: data.messageId, lastSeq: data.seq };
+        } else if (data.status === 'started') {
+          activeStreamRef.current = { messageId: data.messageId, lastSeq: activeStream.lastSeq };
+        }
+      }
+      if (data.resumed) {
+        console.log(`Resumed stream ${data.messageId} from frame ${data.fromSeq}`);
+        return;
+      }
+      if (data.stopped || data.error || data.complete) {
+        activeStreamRef.current = { messageId: null, lastSeq: 0 };
+      }
+
       if (data.stopped) {
         // Stream was stopped by user
         console.log('Stream stopped:', data.reason || 'user request');
@@ -431,6 +461,7 @@ const NewChatView = () => {
 
   const handleStopStream = async () => {
     setIsStoppingStream(true);
+    activeStreamRef.current = { messageId: null, lastSeq: 0 };
     if (socketRef.current) {
       socketRef.current.emit('stop_stream');
     }
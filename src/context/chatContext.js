@@ -6,6 +6,48 @@ const ChatContext = createContext({});
 
 const BASE_STORAGE_KEY = 'recipe-chat-history';
 const MAX_STORAGE_SIZE = 4 * 1024 * 1024; // 4MB limit for safety
+const SESSION_TOKEN_KEY = 'recipe-chat-session-token';
+const BACKEND_URL = 'http://192.168.1.203:5000';
+
+// Per-tab session token issued by the backend, sent on every (re)connect so the backend can
+// restore this tab's chat on any worker. Both sockets of the tab wait for the same request.
+let sessionRequest = null;
+
+const getSessionToken = () => {
+  const token = sessionStorage.getItem(SESSION_TOKEN_KEY);
+  if (token) {
+    return Promise.resolve(token);
+  }
+  if (!sessionRequest) {
+    sessionRequest = fetch(`${BACKEND_URL}/session`, { method: 'POST' })
+      .then((response) => response.json())
+      .then((data) => {
+        sessionStorage.setItem(SESSION_TOKEN_KEY, data.session_token);
+        return data.session_token;
+      })
+      .finally(() => {
+        sessionRequest = null;
+      });
+  }
+  return sessionRequest;
+};
+
+// socket.io `auth` callback, called before every connection attempt
+const sessionAuth = (callback) => {
+  getSessionToken()
+    .then((token) => callback({ session_token: token }))
+    .catch((error) => {
+      console.error('Could not get a session token:', error);
+      callback({});
+    });
+};
+
+// Keep the token the backend confirmed on connect (a new one if ours was not accepted)
+const rememberSession = (data) => {
+  if (data?.session_token) {
+    sessionStorage.setItem(SESSION_TOKEN_KEY, data.session_token);
+  }
+};
 
 const ChatContextProvider = (props) => {
   const [messages, setMessages] = useState([]);
@@ -45,14 +87,17 @@ const ChatContextProvider = (props) => {
         transports: ['websocket', 'polling'],
         forceNew: true, // Force a new connection for each tab
         timeout: 5000,
+        auth: sessionAuth,
       };
 
-      socketRef.current = io('http://192.168.1.203:5000', socketOptions);
+      socketRef.current = io(BACKEND_URL, socketOptions);
 
       socketRef.current.on('connect', () => {
         console.log('Connected to backend from ChatContext with ID:', socketRef.current.id);
       });
 
+      socketRef.current.on('session', rememberSession);
+
       socketRef.current.on('connect_error', (error) => {
         console.error('Connection error from ChatContext:', error);
       });
@@ -261,4 +306,4 @@ const ChatContextProvider = (props) => {
   );
 };
 
-export { ChatContext, ChatContextProvider };
+export { ChatContext, ChatContextProvider, BACKEND_URL, sessionAuth, rememberSession };
@@ -0,0 +1,7 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+# Keep the on-disk recipe cache and remote session stores out of test runs
+os.environ.setdefault('RECIPE_CACHE_PATH', '')
+os.environ.setdefault('SESSION_STORE_URL', 'memory')
@@ -0,0 +1,120 @@
+import time
+import queue
+import fnmatch
+import threading
+
+
+class FakeRedisServer:
+    """In-process stand-in for a Redis server, shared by the FakeRedis clients connected to it"""
+
+    def __init__(self):
+        self.data = {}  # key -> (expires_at, value)
+        self.channels = {}  # channel -> set of FakePubSub
+        self.lock = threading.Lock()
+
+
+class FakePubSub:
+    """Minimal redis-py PubSub: subscribe(), listen(), get_message() and close()"""
+
+    def __init__(self, server, ignore_subscribe_messages=False):
+        self._server = server
+        self._ignore_subscribe_messages = ignore_subscribe_messages
+        self._messages = queue.Queue()
+        self._channels = set()
+        self._closed = False
+
+    def subscribe(self, *channels):
+        with self._server.lock:
+            for channel in channels:
+                self._server.channels.setdefault(channel, set()).add(self)
+                self._channels.add(channel)
+        if not self._ignore_subscribe_messages:
+            for channel in channels:
+                self._messages.put({'type': 'subscribe', 'channel': channel.encode(), 'data': 1})
+
+    def get_message(self, timeout=0.0):
+        try:
+            return self._messages.get(timeout=timeout) if timeout else self._messages.get_nowait()
+        except queue.Empty:
+            return None
+
+    def listen(self):
+        while not self._closed:
+            message = self._messages.get()
+            if message is None:
+                return
+            yield message
+
+    def close(self):
+        self._closed = True
+        with self._server.lock:
+            for channel in self._channels:
+                self._server.channels.get(channel, set()).discard(self)
+        self._messages.put(None)
+
+
+class FakeRedis:
+    """
+    Local fake of the redis-py client subset RedisSessionStore uses, for tests.
+
+    Clients created with the same FakeRedisServer see the same keys and
+    channels, so several FakeRedis instances behave like workers sharing
+    one Redis. Values come back as bytes, as with redis-py.
+    """
+
+    def __init__(self, server=None):
+        self.server = server or FakeRedisServer()
+
+    def get(self, name):
+        with self.server.lock:
+            entry = self.server.data.get(name)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] < time.time():
+                del self.server.data[name]
+                return None
+            return entry[1]
+
+    def set(self, name, value, ex=None):
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        with self.server.lock:
+            self.server.data[name] = (time.time() + ex if ex else None, value)
+        return True
+
+    def incr(self, name, amount=1):
+        with self.server.lock:
+            expires_at, value = self.server.data.get(name, (None, b'0'))
+            if expires_at is not None and expires_at < time.time():
+                expires_at, value = None, b'0'
+            value = int(value) + amount
+            self.server.data[name] = (expires_at, str(value).encode('utf-8'))
+            return value
+
+    def expire(self, name, seconds):
+        with self.server.lock:
+            entry = self.server.data.get(name)
+            if entry is None:
+                return False
+            self.server.data[name] = (time.time() + seconds, entry[1])
+            return True
+
+    def delete(self, *names):
+        with self.server.lock:
+            return sum(1 for name in names if self.server.data.pop(name, None) is not None)
+
+    def keys(self, pattern='*'):
+        with self.server.lock:
+            return [key.encode('utf-8') for key in self.server.data if fnmatch.fnmatchcase(key, pattern)]
+
+    def publish(self, channel, message):
+        if isinstance(message, str):
+            message = message.encode('utf-8')
+        with self.server.lock:
+            subscribers = list(self.server.channels.get(channel, ()))
+        for pubsub in subscribers:
+            pubsub._messages.put({'type': 'message', 'channel': channel.encode('utf-8'), 'data': message})
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self.server, ignore_subscribe_messages=ignore_subscribe_messages)
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+import recipe_chatbot
+from answer_cache import AnswerCache
+from llm_backends import STUB_RECIPE, StubBackend
+from recipe_chatbot import RecipeChatBot
+from recipe_model import Recipe
+
+RECIPE = 'recipe:test'
+
+
+@pytest.mark.parametrize('asked, cached', [
+    ("can I use oil instead of butter", "can I use butter instead of oil"),
+    ("substitute tofu with chicken", "substitute chicken with tofu"),
+    ("can I replace the cream with milk", "can I replace the milk with cream"),
+])
+def test_swapped_ingredients_do_not_match(asked, cached):
+    cache = AnswerCache()
+    cache.set(RECIPE, cached, "answer")
+    assert cache.get(RECIPE, asked) is None
+
+
+@pytest.mark.parametrize('asked, cached', [
+    ("Can I make this vegan?", "make it vegan"),
+    ("could I use butter instead of oil", "can I use butter instead of oil"),
+    ("How long should I boil the pasta?", "how long do I boil the pasta"),
+])
+def test_rephrased_questions_match(asked, cached):
+    cache = AnswerCache()
+    cache.set(RECIPE, cached, "answer")
+    hit = cache.get(RECIPE, asked)
+    assert hit is not None and hit[0] == "answer"
+
+
+def make_bot(backend):
+    bot = RecipeChatBot(model='stub', backend=backend)
+    bot.recipe_data = STUB_RECIPE
+    bot.recipe = Recipe.from_markdown(STUB_RECIPE)
+    bot.recipe_key = RECIPE
+    return bot
+
+
+async def ask(bot, question):
+    return ''.join([chunk async for chunk in bot.ask_question_stream(question)])
+
+
+@pytest.mark.parametrize('history, summary', [
+    ([{"role": "user", "content": "I'm allergic to peanuts"},
+      {"role": "assistant", "content": "Noted, I'll leave them out."}], ""),
+    ([], "The user is allergic to peanuts."),
+])
+def test_answers_using_a_conversation_are_not_shared(monkeypatch, history, summary):
+    monkeypatch.setattr(recipe_chatbot, 'answer_cache', AnswerCache())
+    backend = StubBackend(responses=lambda prompt: "Use sunflower seed butter instead." if "peanuts" in prompt
+                          else "Use peanut butter.", tokens_per_second=10000, first_token_delay=0)
+
+    allergic = make_bot(backend)
+    allergic.conversation_history = list(history)
+    allergic.conversation_summary = summary
+    question = "What can I use for the sauce?"
+    assert asyncio.run(ask(allergic, question)) == "Use sunflower seed butter instead."
+
+    other = make_bot(backend)
+    assert asyncio.run(ask(other, question)) == "Use peanut butter."
+    assert backend.calls == 2
+    assert recipe_chatbot.answer_cache.stats()['bypassed'] == 1
+
+
+def test_first_question_answers_are_shared(monkeypatch):
+    monkeypatch.setattr(recipe_chatbot, 'answer_cache', AnswerCache())
+    backend = StubBackend(responses="Ten minutes.", tokens_per_second=10000, first_token_delay=0)
+    question = "How long should the sauce simmer?"
+    assert asyncio.run(ask(make_bot(backend), question)) == "Ten minutes."
+    assert asyncio.run(ask(make_bot(backend), question)) == "Ten minutes."
+    assert backend.calls == 1
+
+
+class FailingBackend(StubBackend):
+    """Streams a few tokens and then loses the connection"""
+
+    async def stream(self, prompt, model, max_tokens=1500):
+        self.calls += 1
+        yield "Ten "
+        yield "min"
+        raise ConnectionError("connection reset")
+
+
+def test_answers_cut_short_by_an_error_are_not_kept(monkeypatch):
+    monkeypatch.setattr(recipe_chatbot, 'answer_cache', AnswerCache())
+    backend = FailingBackend()
+    bot = make_bot(backend)
+    question = "How long should the sauce simmer?"
+    answer = asyncio.run(ask(bot, question))
+    assert answer.startswith("Ten min") and "connection reset" in answer
+    assert bot.conversation_history == []
+    assert asyncio.run(ask(make_bot(backend), question)) == answer
+    assert backend.calls == 2
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+# The app builds its default backend on import; keep it off the network
+backend = os.environ.get('LLM_BACKEND')
+os.environ['LLM_BACKEND'] = 'stub'
+try:
+    app_module = pytest.importorskip('app')
+finally:
+    if backend is None:
+        del os.environ['LLM_BACKEND']
+    else:
+        os.environ['LLM_BACKEND'] = backend
+
+
+def connect(auth=None):
+    client = app_module.socketio.test_client(app_module.app, auth=auth)
+    session = next(packet['args'][0] for packet in client.get_received() if packet['name'] == 'session')
+    return client, session
+
+
+def test_session_endpoint_issues_a_usable_token():
+    issued = app_module.app.test_client().post('/session').get_json()
+    client, session = connect({'session_token': issued['session_token']})
+    assert session['session_id'] == issued['session_id']
+    client.disconnect()
+
+
+def test_reconnect_with_token_restores_the_session():
+    first, session = connect()
+    first.disconnect()
+    second, restored = connect({'session_token': session['session_token']})
+    assert restored['session_id'] == session['session_id']
+    second.disconnect()
+
+
+@pytest.mark.parametrize('auth', [
+    lambda victim: {'session_id': victim['session_id']},
+    lambda victim: {'session_token': victim['session_id']},
+    lambda victim: {'session_token': victim['session_id'] + '.' + '0' * 64},
+])
+def test_claimed_or_forged_sessions_get_a_fresh_one(auth):
+    victim_client, victim = connect()
+    attacker, session = connect(auth(victim))
+    assert session['session_id'] != victim['session_id']
+    attacker.disconnect()
+    victim_client.disconnect()
+
+
+def test_conversation_rooms_are_limited_to_the_own_session():
+    victim_client, victim = connect()
+    attacker, _ = connect()
+    attacker.emit('join_conversation', {'conversation_id': victim['session_id']})
+    assert any(packet['args'][0].get('error') for packet in attacker.get_received())
+    assert f"conversation:{victim['session_id']}" not in app_module.client_conversations.values()
+
+    tab, _ = connect({'session_token': victim['session_token']})
+    tab.emit('join_conversation', {'conversation_id': victim['session_id']})
+    assert not [packet for packet in tab.get_received() if packet['args'][0].get('error')]
+    for client in (victim_client, attacker, tab):
+        client.disconnect()
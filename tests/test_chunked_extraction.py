@@ -0,0 +1,47 @@
+import hashlib
+
+import pytest
+
+from chunked_extraction import split_transcript
+
+
+def unspaced_text(blocks=200):
+    # No spaces at all, and no repeated substrings long enough to confuse find()
+    return ''.join(hashlib.sha256(str(index).encode()).hexdigest() for index in range(blocks))
+
+
+def spans(text, windows):
+    positions, offset = [], 0
+    for window in windows:
+        start = text.find(window, offset)
+        assert start != -1, "window is not a piece of the text"
+        positions.append((start, start + len(window)))
+        offset = start + 1
+    return positions
+
+
+def test_unspaced_text_without_overlap_loses_nothing():
+    text = unspaced_text()
+    windows = split_transcript(text, window_tokens=100, overlap_tokens=0)
+    assert len(windows) > 1
+    assert ''.join(windows) == text
+
+
+def test_unspaced_text_with_overlap_covers_every_character():
+    text = unspaced_text()
+    windows = split_transcript(text, window_tokens=100, overlap_tokens=20)
+    positions = spans(text, windows)
+    assert positions[0][0] == 0 and positions[-1][1] == len(text)
+    for (_, end), (next_start, _) in zip(positions, positions[1:]):
+        assert next_start < end, "consecutive windows should overlap"
+
+
+@pytest.mark.parametrize('overlap', [0, 20])
+def test_spaced_text_keeps_every_word(overlap):
+    words = [f"word{index}" for index in range(3000)]
+    windows = split_transcript(' '.join(words), window_tokens=200, overlap_tokens=overlap)
+    assert len(windows) > 1
+    seen = {word for window in windows for word in window.split()}
+    assert seen == set(words)
+    if not overlap:
+        assert sum(len(window.split()) for window in windows) == len(words)
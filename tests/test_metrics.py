@@ -0,0 +1,33 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+from metrics import Counter, Gauge, MetricsRegistry
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+
+def test_redefined_metric_records_into_registered_series():
+    registry = MetricsRegistry()
+    first = Counter('requests_total', 'Requests', ['route'], registry=registry)
+    second = Counter('requests_total', 'Requests', ['route'], registry=registry)
+    first.labels('/').inc()
+    second.labels('/').inc(2)
+    assert first.labels('/').get() == 3
+    assert registry.render().count('recipechat_requests_total{route="/"}') == 1
+
+
+def test_conflicting_metric_is_rejected():
+    registry = MetricsRegistry()
+    Counter('requests_total', 'Requests', registry=registry)
+    with pytest.raises(ValueError):
+        Gauge('requests_total', 'Requests', registry=registry)
+
+
+def test_batch_subcommand_starts():
+    result = subprocess.run([sys.executable, 'recipe_chatbot.py', 'batch', '--help'], cwd=BACKEND,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert 'usage' in result.stdout
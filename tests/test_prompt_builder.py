@@ -0,0 +1,27 @@
+import prompt_builder
+from prompt_builder import PromptBuilder
+
+TEMPLATE = "Recipe:\n{recipe_data}\n\n{user_question}\nAnswer:"
+
+
+def test_token_counts_are_estimated_without_a_local_vocabulary(monkeypatch):
+    monkeypatch.delenv('TOKENIZER_VOCAB_PATH', raising=False)
+    monkeypatch.setattr(prompt_builder, '_encoding_loaded', False)
+    assert prompt_builder.get_encoding() is None
+    assert prompt_builder.count_tokens("x" * 38) == 10
+
+
+def test_section_counts_are_kept_for_the_current_recipe_only(monkeypatch):
+    counted = []
+    count_tokens = prompt_builder.count_tokens
+    monkeypatch.setattr(prompt_builder, 'count_tokens', lambda text: counted.append(text) or count_tokens(text))
+    builder = PromptBuilder(TEMPLATE)
+    sections = ["# Pasta", "## Ingredients\n- 200 g spaghetti"]
+
+    builder.build("How long?", sections, [], recipe_key='recipe:a')
+    builder.build("How much salt?", sections, [], recipe_key='recipe:a')
+    assert sum(text in sections for text in counted) == 2
+
+    builder.build("How long?", sections, [], recipe_key='recipe:b')
+    assert sum(text in sections for text in counted) == 4
+    assert list(builder._section_tokens) == sections
@@ -0,0 +1,55 @@
+import asyncio
+
+import recipe_chatbot
+from llm_backends import StubBackend, get_backend
+from recipe_cache import RecipeCache
+from recipe_chatbot import PROMPT_VERSION, RecipeChatBot, make_cache_key
+from transcripts import StaticTranscript, StaticTranscriptProvider
+
+MODEL = 'meta-llama/Llama-3.3-70B-Instruct-Turbo'
+VIDEO_ID = 'stubCache01'
+
+
+def test_stub_output_is_keyed_apart_from_the_real_model(monkeypatch):
+    monkeypatch.setenv('LLM_BACKEND', 'stub')
+    monkeypatch.setenv('LLM_STUB_MODEL', 'stub:10000:0')
+    monkeypatch.setattr(recipe_chatbot, 'recipe_cache', RecipeCache(path=None))
+    monkeypatch.setattr(recipe_chatbot.transcript_fetcher, 'provider', StaticTranscriptProvider(
+        {VIDEO_ID: [StaticTranscript('en', ["boil the spaghetti and simmer the tomato sauce with garlic"] * 5)]}))
+
+    bot = RecipeChatBot(model=MODEL)
+    assert isinstance(bot.backend, StubBackend)
+    asyncio.run(_fetch(bot))
+    assert "Ingredients" in bot.recipe_data
+
+    assert recipe_chatbot.recipe_cache.get(make_cache_key(VIDEO_ID, 'en', PROMPT_VERSION, MODEL)) is None
+    assert recipe_chatbot.recipe_cache.get(
+        make_cache_key(VIDEO_ID, 'en', PROMPT_VERSION, f"stub:{MODEL}")) == bot.recipe_data
+
+
+async def _fetch(bot):
+    return ''.join([chunk async for chunk in bot.fetch_recipe(f"https://www.youtube.com/watch?v={VIDEO_ID}")])
+
+
+def test_real_backend_keys_by_model_name():
+    assert get_backend(MODEL).output_model(MODEL) == MODEL
+
+
+class TruncatingBackend(StubBackend):
+    """Streams the start of a recipe and then fails"""
+
+    async def stream(self, prompt, model, max_tokens=1500):
+        self.calls += 1
+        yield "# Spaghetti\n\n## Ingredients\n"
+        raise ConnectionError("connection reset")
+
+
+def test_recipes_cut_short_by_an_error_are_not_cached(monkeypatch):
+    monkeypatch.setattr(recipe_chatbot, 'recipe_cache', RecipeCache(path=None))
+    monkeypatch.setattr(recipe_chatbot.transcript_fetcher, 'provider', StaticTranscriptProvider(
+        {VIDEO_ID: [StaticTranscript('en', ["boil the spaghetti and simmer the tomato sauce with garlic"] * 5)]}))
+
+    bot = RecipeChatBot(model=MODEL, backend=TruncatingBackend())
+    assert "connection reset" in asyncio.run(_fetch(bot))
+    assert bot.recipe_key is None
+    assert recipe_chatbot.recipe_cache.stats()['memory_entries'] == 0
@@ -0,0 +1,49 @@
+from session_manager import SessionManager
+from session_store import MemorySessionStore
+
+
+class Session:
+    def __init__(self, state=None):
+        self.summary = (state or {}).get('conversation_summary', '')
+
+    def to_state(self):
+        return {'conversation_summary': self.summary}
+
+
+def make_manager(store, max_sessions=10):
+    return SessionManager(store, Session, max_sessions=max_sessions, idle_ttl=0)
+
+
+def test_pinned_session_is_not_evicted():
+    manager = make_manager(MemorySessionStore(), max_sessions=1)
+    pinned = manager.get('a')
+    manager.pin('a')
+    manager.get('b')  # Over capacity: the least recently used session that can go is b
+    assert manager.peek('a') is pinned
+    assert manager.evict_idle() == 0
+    assert manager.peek('a') is pinned
+
+
+def test_release_waits_for_the_last_pin():
+    store = MemorySessionStore()
+    manager = make_manager(store)
+    session = manager.get('a')
+    manager.pin('a')
+    manager.pin('a')
+    manager.release('a')
+    session.summary = "The user is allergic to peanuts."
+    manager.unpin('a')
+    assert manager.peek('a') is session
+    manager.unpin('a')
+    assert manager.peek('a') is None
+    assert store.load('a')['conversation_summary'] == "The user is allergic to peanuts."
+
+
+def test_get_cancels_a_deferred_release():
+    manager = make_manager(MemorySessionStore())
+    session = manager.get('a')
+    manager.pin('a')
+    manager.release('a')
+    assert manager.get('a') is session  # The client came back while the session was pinned
+    manager.unpin('a')
+    assert manager.peek('a') is session
@@ -0,0 +1,128 @@
+import time
+import threading
+
+import pytest
+
+import session_store
+from fake_redis import FakeRedis, FakeRedisServer
+from session_manager import SessionManager
+from session_store import MemorySessionStore, RedisSessionStore, SqliteSessionStore, create_session_store
+from session_tokens import SessionTokens
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def make_store(request, tmp_path):
+    """Factory of stores; stores made by one factory share their sessions where the backend allows"""
+    server = FakeRedisServer()
+    stores = []
+
+    def make(ttl=3600):
+        if request.param == 'memory':
+            store = MemorySessionStore(ttl=ttl)
+        elif request.param == 'sqlite':
+            store = SqliteSessionStore(str(tmp_path / 'sessions.db'), ttl=ttl)
+        else:
+            store = RedisSessionStore(FakeRedis(server), ttl=ttl)
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+def test_save_load_delete(make_store):
+    store = make_store()
+    state = {'recipe_data': 'Pasta', 'conversation_history': [{'role': 'user', 'content': 'Hi'}]}
+    assert store.load('a') is None
+    store.save('a', state)
+    assert store.load('a') == state
+    state['recipe_data'] = 'changed'
+    assert store.load('a')['recipe_data'] == 'Pasta'  # Stored by value
+    store.delete('a')
+    assert store.load('a') is None
+
+
+def test_expired_sessions_are_gone(make_store):
+    store = make_store(ttl=1)
+    store.save('a', {'recipe_data': 'Pasta'})
+    time.sleep(1.1)
+    assert store.load('a') is None
+
+
+def test_published_messages_reach_subscribers(make_store):
+    store = make_store()
+    received = []
+    delivered = threading.Event()
+    store.subscribe(lambda message: (received.append(message), delivered.set()))
+    store.publish({'type': 'stop_session', 'session': 'a'})
+    assert delivered.wait(2)
+    assert received == [{'type': 'stop_session', 'session': 'a'}]
+
+
+def test_redis_stores_share_sessions_and_messages():
+    server = FakeRedisServer()
+    first, second = RedisSessionStore(FakeRedis(server)), RedisSessionStore(FakeRedis(server))
+    received = threading.Event()
+    second.subscribe(lambda message: received.set())
+    first.save('a', {'recipe_data': 'Pasta'})
+    first.publish({'type': 'stop_session', 'session': 'a'})
+    assert second.load('a') == {'recipe_data': 'Pasta'}
+    assert received.wait(2)
+    first.close()
+    second.close()
+
+
+def test_session_tokens():
+    tokens = SessionTokens('secret')
+    session_id, token = tokens.issue()
+    assert tokens.verify(token) == session_id
+    assert SessionTokens('secret').verify(token) == session_id  # Another worker with the same secret
+    assert SessionTokens('other').verify(token) is None
+    assert tokens.verify(session_id) is None
+    assert tokens.verify(f"{tokens.issue()[0]}.{token.rsplit('.', 1)[1]}") is None
+    assert tokens.verify(None) is None
+
+
+def test_sessions_spill_to_disk_by_default(monkeypatch, tmp_path):
+    monkeypatch.delenv('SESSION_STORE_URL', raising=False)
+    monkeypatch.setattr(session_store, 'DEFAULT_STORE_URL', f"sqlite:///{tmp_path / 'sessions.sqlite3'}")
+    store = create_session_store()
+    assert isinstance(store, SqliteSessionStore) and store.memory_bytes() == 0
+    store.close()
+
+
+def test_in_process_store_bytes_are_counted():
+    class Session:
+        def to_state(self):
+            return {'recipe_data': 'x' * 1000}
+
+    manager = SessionManager(MemorySessionStore(), lambda state: Session(), max_sessions=1)
+    manager.get('a')
+    manager.get('b')  # Spills a into the store
+    stats = manager.stats()
+    assert stats['resident_bytes'] == 1000
+    assert stats['store_bytes'] > 1000
+
+
+def test_workers_reload_sessions_saved_by_another_worker():
+    class Session:
+        def __init__(self, state=None):
+            self.history = list((state or {}).get('conversation_history', []))
+
+        def to_state(self):
+            return {'conversation_history': self.history}
+
+    server = FakeRedisServer()
+    first = SessionManager(RedisSessionStore(FakeRedis(server)), Session)
+    second = SessionManager(RedisSessionStore(FakeRedis(server)), Session)
+
+    first.get('a').history.append({'role': 'user', 'content': 'first'})
+    first.save('a')
+    second.get('a').history.append({'role': 'user', 'content': 'second'})  # The client moved to the second worker
+    second.save('a')
+
+    assert first.get('a').history == [{'role': 'user', 'content': 'first'}, {'role': 'user', 'content': 'second'}]
+    assert first.stats()['reloaded'] == 1
+    assert second.get('a').history == [{'role': 'user', 'content': 'first'}, {'role': 'user', 'content': 'second'}]
+    assert second.stats()['reloaded'] == 0